@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Measure the number of `TGTableModel.data()` calls per second.
+
+The roles are requested in the same mix a `QTableView` uses when it paints
+a cell. Run it with:
+
+    python benchmarks/model_data.py [--rows N] [--columns N]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
+sys.path.insert(0, str(package_dir))
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import Qt
+
+from textgrid_explorer.models import TGTableModel
+
+# Roles requested by the default item delegate for each painted cell
+PAINT_ROLES = [
+    Qt.ItemDataRole.DisplayRole,
+    Qt.ItemDataRole.FontRole,
+    Qt.ItemDataRole.TextAlignmentRole,
+    Qt.ItemDataRole.ForegroundRole,
+    Qt.ItemDataRole.CheckStateRole,
+    Qt.ItemDataRole.DecorationRole,
+    Qt.ItemDataRole.BackgroundRole,
+]
+
+class FakeTier:
+    def __init__(self, index):
+        self.index = index
+
+class FakeItem:
+    def __init__(self, tier, index, text):
+        self.parent = tier
+        self.index = index
+        self.xmin = index
+        self.xmax = index + 1
+        self.text = text
+
+def build_rows(nrows, ncolumns):
+    tiers = [FakeTier(i) for i in range(ncolumns)]
+    rows = []
+    for i in range(nrows):
+        row = [Path(f'/corpus/file{i // 100:05d}.TextGrid')]
+        for c, tier in enumerate(tiers):
+            # Leave some cells empty to exercise the missing-cell branches
+            if c and i % 7 == 0:
+                row.append(None)
+            else:
+                row.append(FakeItem(tier, i % 100, f'label{i % 50}'))
+        rows.append(row)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--columns', type=int, default=3)
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    headers = ['filename'] + [f'tier{i}' for i in range(args.columns)]
+    model = TGTableModel()
+    model.set_full_dataset(headers, build_rows(args.rows, args.columns))
+    ncolumns = model.columnCount()
+    indexes = [
+        model.index(row, column)
+        for row in range(0, model.rowCount(), 97)
+        for column in range(ncolumns)
+    ]
+
+    # Views pass the roles as plain integers
+    roles = [int(role) for role in PAINT_ROLES]
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        for index in indexes:
+            for role in roles:
+                model.data(index, role)
+        calls += len(indexes) * len(PAINT_ROLES)
+    elapsed = time.perf_counter() - start
+    print(f'{args.rows} rows x {ncolumns} columns: {calls/elapsed:,.0f} data() calls/s')
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,7 @@
 # nuitka-project: --enable-plugin=pyside6
 # nuitka-project: --include-package-data=textgrid_explorer:*.praat
 # nuitka-project: --include-package-data=mytextgrid
+import multiprocessing
 import sys
 from pathlib import Path
 
@@ -28,4 +29,5 @@ sys.path.insert(0, str(package_dir))
 import textgrid_explorer
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     textgrid_explorer.main()
@@ -13,6 +13,7 @@
 #
 #   You should have received a copy of the GNU General Public License along
 #   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import argparse
 import sys
 import platform
 
@@ -20,6 +21,7 @@ from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import QSettings
 
 from textgrid_explorer.explorer_window import TGExplorer
+from textgrid_explorer import cache
 
 def init_preferences():
     settings = QSettings('Gilgamesh', 'textgrid_explorer')
@@ -47,7 +49,25 @@ def init_preferences():
     if not settings.contains('praat_activate_plugins'):
         settings.setValue('praat_activate_plugins', 0)
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(prog='textgrid_explorer')
+    parser.add_argument(
+        '--clear-cache',
+        action='store_true',
+        help='remove the cache of parsed TextGrid files and exit',
+    )
+    # Leave the rest of the arguments to Qt
+    args, _ = parser.parse_known_args()
+    return args
+
 def main():
+    args = parse_arguments()
+    if args.clear_cache:
+        parse_cache = cache.default_cache()
+        parse_cache.clear()
+        print(f'Removed {parse_cache.cache_dir}')
+        return
+
     init_preferences()
     app = QApplication(sys.argv)
     # cli_arguments = app.arguments()
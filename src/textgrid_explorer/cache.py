@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import hashlib
+import os
+import pickle
+import platform
+import shutil
+import tempfile
+from pathlib import Path
+
+# Bump this value whenever the layout of the cached objects changes, so that
+# entries written by older versions are ignored.
+CACHE_VERSION = 4
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_default_cache = None
+
+def user_cache_dir():
+    """
+    Return the per-user cache directory of the application.
+    """
+    system = platform.system()
+    if system == 'Windows':
+        base = os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+        return Path(base) / 'Gilgamesh' / 'textgrid_explorer' / 'cache'
+    elif system == 'Darwin':
+        return Path.home() / 'Library' / 'Caches' / 'textgrid_explorer'
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'textgrid_explorer'
+
+def file_fingerprint(path):
+    """
+    Return the (path, size, mtime_ns) key of a file. A file whose key has
+    changed is read again, by the parse cache and by the projects alike.
+
+    Raises
+    ------
+    OSError
+        If the file does not exist.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    return (path, st.st_size, st.st_mtime_ns)
+
+def default_cache():
+    """
+    Return the parse cache shared by the whole process.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache(user_cache_dir() / 'textgrids')
+    return _default_cache
+
+class ParseCache:
+    """
+    A persistent cache of parsed TextGrid files.
+
+    Each entry is stored in its own file and is valid as long as the path,
+    size and modification time of the source file do not change. Reading an
+    entry updates its modification time, so `prune` evicts the least
+    recently used entries first.
+
+    An entry file holds two pickles: the version and the fingerprint, then
+    the object, so that an entry can be checked without loading it.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, path):
+        digest = hashlib.sha1(str(path).encode('utf-8')).hexdigest()
+        return self.cache_dir / f'{digest}.pickle'
+
+    fingerprint = staticmethod(file_fingerprint)
+
+    def get(self, path, key=None):
+        """
+        Return the cached object of a file or None if there is no valid entry.
+        `key` is the fingerprint of the file, if already taken.
+        """
+        try:
+            if key is None:
+                key = self.fingerprint(path)
+            entry_path = self._entry_path(key[0])
+            with open(entry_path, 'rb') as f:
+                if pickle.load(f) != (CACHE_VERSION, key):
+                    return None
+                obj = pickle.load(f)
+            os.utime(entry_path)
+            return obj
+        except Exception:
+            return None
+
+    def has(self, path, key=None):
+        """
+        Tell whether there is a valid entry for a file, without loading it.
+        `key` is the fingerprint of the file, if already taken.
+        """
+        try:
+            if key is None:
+                key = self.fingerprint(path)
+            with open(self._entry_path(key[0]), 'rb') as f:
+                return pickle.load(f) == (CACHE_VERSION, key)
+        except Exception:
+            return False
+
+    def put(self, path, obj, key=None):
+        """
+        Store the object parsed from a file. Errors are ignored, a missing
+        cache entry only means that the file will be parsed again.
+
+        `key` should be the fingerprint of the file taken before parsing
+        it. If the file changed while it was parsed, the entry is then
+        stale from the start instead of passing for the new contents.
+        """
+        tmp_path = None
+        try:
+            if key is None:
+                key = self.fingerprint(path)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((CACHE_VERSION, key), f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._entry_path(key[0]))
+        except Exception:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def prune(self):
+        """
+        Remove the least recently used entries until the size of the cache
+        is below `max_bytes`.
+        """
+        try:
+            entries = []
+            total = 0
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                    total += st.st_size
+        except OSError:
+            return
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """
+        Remove all the entries.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -15,7 +15,9 @@
 #   with this program.  If not, see <https://www.gnu.org/licenses/>.
 from textgrid_explorer.dialogs.replace_dlg import FindAndReplaceDialog
 from textgrid_explorer.dialogs.replace_dlg import MapAnnotationDialog
+from textgrid_explorer.dialogs.replace_dlg import FindResultsDialog
 from textgrid_explorer.dialogs.filter_view import FilterByDialog
+from textgrid_explorer.dialogs.sort_dlg import SortDialog
 from textgrid_explorer.dialogs.project_dlg import NewProjectDialog
 from textgrid_explorer.dialogs.project_dlg import OpenProjectDialog
 from textgrid_explorer.dialogs.project_dlg import ProjectSettingsDialog
@@ -13,6 +13,8 @@
 #
 #   You should have received a copy of the GNU General Public License along
 #   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import re
+
 from PySide6.QtWidgets import (
     QDialog,
     QLabel,
@@ -22,14 +24,61 @@ from PySide6.QtWidgets import (
     QFormLayout,
     QVBoxLayout,
     QHBoxLayout,
+    QWidget,
 )
 from PySide6.QtCore import (
     Qt,
+    QTimer,
     Signal
 )
 
+class FilterCondition(QWidget):
+    """
+    A column and a regex pattern that the rows of the table must match.
+    """
+    changed = Signal()
+    remove_clicked = Signal()
+
+    def __init__(self, parent, fields, default_value=''):
+        super().__init__(parent)
+        self.column_box = QComboBox(self)
+        self.column_box.addItems(fields)
+        self.column_box.currentIndexChanged.connect(self.changed)
+
+        self.line_ed = QLineEdit(default_value, self)
+        self.line_ed.setPlaceholderText('Regex expression')
+        self.line_ed.textChanged.connect(self.changed)
+
+        remove_btn = QPushButton('Remove', self)
+        remove_btn.clicked.connect(self.remove_clicked)
+
+        hbox = QHBoxLayout()
+        hbox.setContentsMargins(0, 0, 0, 0)
+        hbox.addWidget(self.column_box)
+        hbox.addWidget(self.line_ed, 1)
+        hbox.addWidget(remove_btn)
+        self.setLayout(hbox)
+
+    def set_fields(self, fields):
+        index = self.column_box.currentIndex()
+        self.column_box.blockSignals(True)
+        self.column_box.clear()
+        self.column_box.addItems(fields)
+        self.column_box.setCurrentIndex(min(index, len(fields) - 1))
+        self.column_box.blockSignals(False)
+
+    def to_tuple(self):
+        return (self.column_box.currentIndex(), self.line_ed.text())
+
 class FilterByDialog(QDialog):
-    filtered_by = Signal(int, str, str)
+    """
+    Filter the rows of the table by one or more conditions. The filters
+    are emitted through `filters_changed` once the conditions stop changing
+    for `debounce_interval` milliseconds and all the patterns are valid.
+    """
+    filters_changed = Signal(object, str)
+
+    debounce_interval = 250
 
     def __init__(self, parent, fields=None, default_value=''):
         super().__init__(parent)
@@ -37,21 +86,33 @@ class FilterByDialog(QDialog):
         self.default_value = default_value
         if fields is None:
             self._fields = []
+        self.conditions = []
         self.setWindowTitle('Filter by')
         self.setMinimumWidth(400)
         self.init_ui()
 
     def init_ui(self):
-        # Headers
-        self.headers_box = QComboBox(self)
-        self.headers_box.addItems(self._fields)
-        self.headers_box.currentIndexChanged.connect(self.on_changed)
+        # Wait for the user to stop typing before filtering
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.debounce_interval)
+        self.debounce_timer.timeout.connect(self.emit_filters)
 
-        self.line_ed = QLineEdit(self.default_value, self)
-        self.line_ed.setPlaceholderText('Regex expression')
-        self.line_ed.textChanged.connect(self.on_changed)
+        # How the conditions are combined
+        self.mode_box = QComboBox(self)
+        self.mode_box.addItem('All conditions (AND)', 'and')
+        self.mode_box.addItem('Any condition (OR)', 'or')
+        self.mode_box.currentIndexChanged.connect(self.on_changed)
+
+        self.conditions_box = QVBoxLayout()
+        self.add_condition(self.default_value)
+
+        self.message_label = QLabel('', self)
 
         # Buttons
+        add_btn = QPushButton('&Add condition', self)
+        add_btn.clicked.connect(lambda: self.add_condition())
+
         clear_btn = QPushButton('C&lear', self)
         clear_btn.clicked.connect(self.on_clear)
 
@@ -59,30 +120,68 @@ class FilterByDialog(QDialog):
         cancel_btn.clicked.connect(self.reject)
 
         hbox = QHBoxLayout()
+        hbox.addWidget(add_btn)
         hbox.addStretch()
         hbox.addWidget(clear_btn)
         hbox.addWidget(cancel_btn)
 
+        form = QFormLayout()
+        form.addRow('Show rows matching:', self.mode_box)
+
         # Main Layout
         layout = QVBoxLayout()
-        layout.addWidget(QLabel('Select column:'))
-        layout.addWidget(self.headers_box)
-        layout.addWidget(QLabel('Search pattern:'))
-        layout.addWidget(self.line_ed)
+        layout.addLayout(form)
+        layout.addWidget(QLabel('Conditions (column and search pattern):'))
+        layout.addLayout(self.conditions_box)
+        layout.addWidget(self.message_label)
         layout.addLayout(hbox)
 
         self.setLayout(layout)
 
+    def add_condition(self, pattern=''):
+        condition = FilterCondition(self, self._fields, pattern)
+        condition.changed.connect(self.on_changed)
+        condition.remove_clicked.connect(lambda: self.remove_condition(condition))
+        self.conditions.append(condition)
+        self.conditions_box.addWidget(condition)
+        condition.line_ed.setFocus()
+        return condition
+
+    def remove_condition(self, condition):
+        # Keep at least one condition
+        if len(self.conditions) == 1:
+            condition.line_ed.setText('')
+            return
+        self.conditions.remove(condition)
+        self.conditions_box.removeWidget(condition)
+        condition.deleteLater()
+        self.on_changed()
+
     def on_changed(self):
+        self.debounce_timer.start()
+
+    def emit_filters(self):
+        self.debounce_timer.stop()
         dict_ = self.to_dict()
-        self.filtered_by.emit(
-            dict_['column_index'],
-            dict_['column_name'],
-            dict_['pattern'],
-        )
+        for _, pattern in dict_['filters']:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                self.message_label.setText(f'Invalid pattern: {e}')
+                return
+        self.message_label.setText('')
+        self.filters_changed.emit(dict_['filters'], dict_['mode'])
+
+    def set_message(self, message):
+        self.message_label.setText(message)
 
     def on_clear(self):
-        self.line_ed.setText('')
+        for condition in self.conditions[1:]:
+            self.conditions_box.removeWidget(condition)
+            condition.deleteLater()
+        del self.conditions[1:]
+        self.conditions[0].line_ed.setText('')
+        self.emit_filters()
 
     def fields(self):
         return self._fields
@@ -90,16 +189,18 @@ class FilterByDialog(QDialog):
     def set_fields(self, fields):
         if not self._fields == fields:
             self._fields = fields
-            self.headers_box.clear()
-            self.headers_box.addItems(self._fields)
+            for condition in self.conditions:
+                condition.set_fields(fields)
 
     def set_index_field(self, index: int) -> None:
-        self.headers_box.setCurrentIndex(index)
+        """
+        Set the column of the last condition.
+        """
+        self.conditions[-1].column_box.setCurrentIndex(index)
 
     def to_dict(self):
         dict_ = {
-            'column_index': self.headers_box.currentIndex(),
-            'column_name': self.headers_box.currentText(),
-            'pattern': self.line_ed.text(),
+            'filters': [condition.to_tuple() for condition in self.conditions],
+            'mode': self.mode_box.currentData(),
         }
         return dict_
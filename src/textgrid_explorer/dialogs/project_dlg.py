@@ -17,22 +17,27 @@ from pathlib import Path
 
 from PySide6.QtWidgets import (
     QDialog,
+    QCheckBox,
+    QFormLayout,
     QMessageBox,
     QLabel,
     QLineEdit,
     QComboBox,
+    QDoubleSpinBox,
     QPushButton,
     QPushButton,
     QFileDialog,
     QListWidgetItem,
     QListWidget,
     QGroupBox,
+    QProgressBar,
     QVBoxLayout,
     QHBoxLayout,
 )
 from PySide6.QtCore import Qt
 
 from textgrid_explorer import utils
+from textgrid_explorer.workers import TierScanner
 
 class NewProjectDialog(QDialog):
 
@@ -42,19 +47,51 @@ class NewProjectDialog(QDialog):
         self.setWindowTitle('New Project Settings')
         self.setMinimumWidth(500)
         self._tiers = []
+        self._tier_counts = {}
+        self._paths = None
+        # The current scan, and all the scans still running
+        self._scanner = None
+        self._scanners = []
 
     def init_ui(self):
         self.textgrid_dir_ed = QLineEdit('')
+        self.textgrid_dir_ed.textChanged.connect(self._on_source_changed)
         textgrid_dir_btn = QPushButton('...')
         textgrid_dir_btn.clicked.connect(self._on_textgrid_dir_btn)
 
+        self.include_ed = QLineEdit('')
+        self.include_ed.setPlaceholderText('All TextGrid files')
+        self.include_ed.setToolTip('Glob patterns separated by semicolons, e.g. speaker*/*.TextGrid')
+        self.include_ed.textChanged.connect(self._on_source_changed)
+        self.exclude_ed = QLineEdit('')
+        self.exclude_ed.setPlaceholderText('None')
+        self.exclude_ed.setToolTip('Glob patterns of files and folders, separated by semicolons')
+        self.exclude_ed.textChanged.connect(self._on_source_changed)
+        self.follow_symlinks_box = QCheckBox('Follow symbolic links to folders', self)
+        self.follow_symlinks_box.toggled.connect(self._on_source_changed)
+
         update_btn = QPushButton('&Scan TextGrid files', self)
         update_btn.clicked.connect(self._on_scan_tiers)
+        self.scan_progress_bar = QProgressBar(self)
+        self.scan_progress_bar.hide()
 
         self.primary_tier = QComboBox(self)
         self.primary_tier.currentTextChanged.connect(self._on_primary_tier)
         self.secondary_tiers = QListWidget(self)
 
+        self.alignment_box = QComboBox(self)
+        self.alignment_box.addItem('Exact boundaries', 'exact')
+        self.alignment_box.addItem('Boundaries within a tolerance', 'tolerance')
+        self.alignment_box.addItem('Maximum overlap', 'overlap')
+        self.alignment_box.currentIndexChanged.connect(self._on_alignment)
+
+        self.tolerance_box = QDoubleSpinBox(self)
+        self.tolerance_box.setSuffix(' ms')
+        self.tolerance_box.setDecimals(3)
+        self.tolerance_box.setRange(0, 1000)
+        self.tolerance_box.setValue(utils.DEFAULT_TOLERANCE*1000)
+        self.tolerance_box.setEnabled(False)
+
         self.ok_btn = QPushButton('&Ok', self)
         self.ok_btn.clicked.connect(self.accept)
         self.ok_btn.setEnabled(False)
@@ -68,9 +105,16 @@ class NewProjectDialog(QDialog):
         dir_layout.addWidget(self.textgrid_dir_ed)
         dir_layout.addWidget(textgrid_dir_btn)
 
+        filter_layout = QFormLayout()
+        filter_layout.addRow('Include:', self.include_ed)
+        filter_layout.addRow('Exclude:', self.exclude_ed)
+
         source_layout = QVBoxLayout()
         source_layout.addLayout(dir_layout)
+        source_layout.addLayout(filter_layout)
+        source_layout.addWidget(self.follow_symlinks_box)
         source_layout.addWidget(update_btn)
+        source_layout.addWidget(self.scan_progress_bar)
         source_groupbox = QGroupBox('TextGrid directory:')
         source_groupbox.setLayout(source_layout)
 
@@ -80,6 +124,11 @@ class NewProjectDialog(QDialog):
         table_layout.addWidget(self.primary_tier)
         table_layout.addWidget(QLabel('Secondary tiers'))
         table_layout.addWidget(self.secondary_tiers)
+        table_layout.addWidget(QLabel('Align secondary tiers by'))
+        alignment_layout = QHBoxLayout()
+        alignment_layout.addWidget(self.alignment_box)
+        alignment_layout.addWidget(self.tolerance_box)
+        table_layout.addLayout(alignment_layout)
         self.table_groupbox = QGroupBox('Build Table:')
         self.table_groupbox.setLayout(table_layout)
         self.table_groupbox.setEnabled(False)
@@ -101,21 +150,112 @@ class NewProjectDialog(QDialog):
         src_dir_str = self.textgrid_dir_ed.text()
         src_dir = Path(src_dir_str)
 
+        self.stop_scan()
+        self.table_groupbox.setEnabled(False)
+        self.ok_btn.setEnabled(False)
         if not src_dir.is_absolute() or not src_dir.is_dir():
-            self.table_groupbox.setEnabled(False)
-            self.ok_btn.setEnabled(False)
             QMessageBox.information(
                 self,
                 'Oops',
                 'The <b>TextGrid directory</b> does not exist'
             )
             return
+
+        # The files are listed and scanned off the GUI thread
+        scanner = TierScanner(
+            self,
+            src_dir,
+            include=self._glob_patterns(self.include_ed),
+            exclude=self._glob_patterns(self.exclude_ed),
+            follow_symlinks=self.follow_symlinks_box.isChecked(),
+        )
+        scanner.scanned.connect(self._on_tiers_scanned)
+        scanner.progress_changed.connect(self._on_scan_progress)
+        scanner.failed.connect(self._on_scan_failed)
+        scanner.finished.connect(self._on_scan_finished)
+        self._scanner = scanner
+        self._scanners.append(scanner)
+
+        self.scan_progress_bar.setRange(0, 0)
+        self.scan_progress_bar.show()
+        scanner.start()
+
+    def stop_scan(self):
+        """
+        Stop the current tier scan, if any. The scan may take a moment to
+        finish the files it is parsing, so it is not waited for.
+        """
+        scanner = self._scanner
+        if scanner is None:
+            return
+        self._scanner = None
+        scanner.requestInterruption()
+        self.scan_progress_bar.hide()
+
+    def wait_for_scans(self):
+        """
+        Stop the tier scans and wait for them, e.g. before quitting.
+        """
+        self.stop_scan()
+        for scanner in self._scanners:
+            scanner.wait()
+
+    def _on_scan_progress(self, done, total):
+        if self.sender() is not self._scanner:
+            return
+        self.scan_progress_bar.setRange(0, total)
+        self.scan_progress_bar.setValue(done)
+
+    def _on_scan_failed(self, message):
+        if self.sender() is not self._scanner:
+            return
+        QMessageBox.warning(self, 'Oops', f'Could not scan the TextGrid files: {message}')
+
+    def _on_scan_finished(self):
+        scanner = self.sender()
+        if scanner in self._scanners:
+            self._scanners.remove(scanner)
+        if scanner is self._scanner:
+            self._scanner = None
+            self.scan_progress_bar.hide()
+
+    def _on_tiers_scanned(self, paths, tier_counts):
+        # Ignore the results of a scan stopped meanwhile
+        if self.sender() is not self._scanner:
+            return
+        # The files are parsed on in the background
+        self.scan_progress_bar.hide()
+        self._set_tiers(paths, tier_counts)
+
+    def _set_tiers(self, paths, tier_counts):
         self.table_groupbox.setEnabled(True)
         self.ok_btn.setEnabled(True)
-        self._tiers = utils.get_tier_names(src_dir)
+        # The files are listed once and reused to build the table
+        self._tier_counts = tier_counts
+        self._paths = paths
+        self._tiers = list(self._tier_counts)
 
         self.primary_tier.clear()
-        self.primary_tier.addItems(self._tiers)
+        for i, t in enumerate(self._tiers):
+            self.primary_tier.addItem(t)
+            self.primary_tier.setItemData(
+                i, self._tier_count_text(t), Qt.ItemDataRole.ToolTipRole
+            )
+
+    @staticmethod
+    def _glob_patterns(line_edit):
+        return [pattern.strip() for pattern in line_edit.text().split(';') if pattern.strip()]
+
+    def _on_source_changed(self):
+        # The scanned files no longer match the source, scan them again
+        self.stop_scan()
+        self._paths = None
+        self.table_groupbox.setEnabled(False)
+        self.ok_btn.setEnabled(False)
+
+    def _tier_count_text(self, tier_name):
+        count = self._tier_counts.get(tier_name, 0)
+        return f'Found in {count} file(s)'
 
     def _on_primary_tier(self, text):
         self.secondary_tiers.clear()
@@ -123,10 +263,16 @@ class NewProjectDialog(QDialog):
             if t == text:
                 continue
             item = QListWidgetItem(t)
+            item.setToolTip(self._tier_count_text(t))
             item.setFlags(item.flags()|Qt.ItemFlag.ItemIsUserCheckable)
             item.setCheckState(Qt.CheckState.Unchecked)
             self.secondary_tiers.addItem(item)
 
+    def _on_alignment(self, index):
+        self.tolerance_box.setEnabled(
+            self.alignment_box.itemData(index) == 'tolerance'
+        )
+
     def _on_textgrid_dir_btn(self):
         dir_str = QFileDialog.getExistingDirectory(
             self,
@@ -148,6 +294,10 @@ class NewProjectDialog(QDialog):
             return
         super().accept()
 
+    def done(self, result):
+        self.stop_scan()
+        super().done(result)
+
     def data(self):
         tiers = []
         for i in range(self.secondary_tiers.count()):
@@ -157,8 +307,14 @@ class NewProjectDialog(QDialog):
 
         dict_ = {
             'src_dir': self.textgrid_dir_ed.text(),
+            'include': self._glob_patterns(self.include_ed),
+            'exclude': self._glob_patterns(self.exclude_ed),
+            'follow_symlinks': self.follow_symlinks_box.isChecked(),
+            'paths': self._paths,
             'primary_tier': self.primary_tier.currentText(),
-            'secondary_tiers': tiers
+            'secondary_tiers': tiers,
+            'alignment': self.alignment_box.currentData(),
+            'tolerance': self.tolerance_box.value()/1000,
         }
         return dict_
 
@@ -166,6 +322,38 @@ class OpenProjectDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-class ProjectSettingsDialog(QDialog):
+class ProjectSettingsDialog(NewProjectDialog):
+    """
+    Change the settings of the open project. The TextGrid directory is
+    scanned again to list its tiers, which are then selected as in the
+    settings.
+    """
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.setWindowTitle('Project Settings')
+        self._settings = None
+
+    def set_data(self, dict_):
+        """
+        Fill in the dialog with the settings returned by `data`.
+        """
+        self.textgrid_dir_ed.setText(dict_['src_dir'])
+        self.include_ed.setText('; '.join(dict_.get('include', [])))
+        self.exclude_ed.setText('; '.join(dict_.get('exclude', [])))
+        self.follow_symlinks_box.setChecked(dict_.get('follow_symlinks', False))
+        self.alignment_box.setCurrentIndex(self.alignment_box.findData(dict_['alignment']))
+        self.tolerance_box.setValue(dict_['tolerance']*1000)
+
+        self._settings = dict_
+        self._on_scan_tiers()
+
+    def _set_tiers(self, paths, tier_counts):
+        super()._set_tiers(paths, tier_counts)
+        if self._settings is None:
+            return
+        self.primary_tier.setCurrentText(self._settings['primary_tier'])
+        for i in range(self.secondary_tiers.count()):
+            item = self.secondary_tiers.item(i)
+            if item.text() in self._settings['secondary_tiers']:
+                item.setCheckState(Qt.CheckState.Checked)
@@ -16,11 +16,14 @@
 from collections import namedtuple
 
 from PySide6.QtWidgets import (
+    QCheckBox,
     QDialog,
     QLabel,
     QLineEdit,
     QComboBox,
     QPushButton,
+    QListView,
+    QListWidget,
     QWidget,
     QTabWidget,
     QVBoxLayout,
@@ -84,10 +87,15 @@ class FindTab(QWidget):
     def init_ui(self):
         self.column_box = QComboBox(self)
         self.find_ed = QLineEdit(self)
+        self.all_columns_check = QCheckBox('Search in a&ll columns', self)
+        self.all_columns_check.toggled.connect(
+            lambda checked: self.column_box.setDisabled(checked)
+        )
 
         form = QFormLayout()
         form.addRow('In c&olumn:', self.column_box)
         form.addRow('&Find what:', self.find_ed)
+        form.addRow('', self.all_columns_check)
 
         self.setLayout(form)
 
@@ -107,6 +115,9 @@ class FindTab(QWidget):
     def current_column_field(self):
         return self.column_box.currentIndex()
 
+    def all_columns_field(self):
+        return self.all_columns_check.isChecked()
+
 class FindAndReplaceDialog(QDialog):
     replace_clicked = Signal(int)
     replace_all_clicked = Signal(int)
@@ -200,11 +211,13 @@ class FindAndReplaceDialog(QDialog):
             'column_index': -1,
             'pattern': '',
             'replace': '',
+            'all_columns': False,
         }
 
         if tab_index == 0:
             dict_['column_index'] = self.find_tab.current_column_field()
             dict_['pattern'] = self.find_tab.find_field()
+            dict_['all_columns'] = self.find_tab.all_columns_field()
         elif tab_index == 1:
             dict_['column_index'] = self.replace_tab.current_column_field()
             dict_['pattern'] = self.replace_tab.find_field()
@@ -234,7 +247,78 @@ class FindAndReplaceDialog(QDialog):
         if r in (0, 1):
             super().done(r)
 
+class FindResultsDialog(QDialog):
+    """
+    A non-modal list of the cells found by Find All. Activating a result or
+    moving with the Previous and Next buttons emits `result_activated` with
+    its position in the list.
+    """
+    result_activated = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Find results')
+        self.setMinimumWidth(400)
+        self.init_ui()
+
+    def init_ui(self):
+        self.summary_label = QLabel('', self)
+
+        self.results_view = QListView(self)
+        self.results_view.setUniformItemSizes(True)
+        self.results_view.activated.connect(lambda index: self.result_activated.emit(index.row()))
+
+        prev_btn = QPushButton('&Previous', self)
+        prev_btn.clicked.connect(lambda: self.move_to(-1))
+
+        next_btn = QPushButton('&Next', self)
+        next_btn.clicked.connect(lambda: self.move_to(1))
+
+        close_btn = QPushButton('&Close', self)
+        close_btn.clicked.connect(self.reject)
+
+        hbox = QHBoxLayout()
+        hbox.addStretch()
+        hbox.addWidget(prev_btn)
+        hbox.addWidget(next_btn)
+        hbox.addSpacing(10)
+        hbox.addWidget(close_btn)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.results_view)
+        layout.addLayout(hbox)
+
+        self.setLayout(layout)
+
+    def set_model(self, model):
+        self.results_view.setModel(model)
+
+    def set_summary(self, message):
+        self.summary_label.setText(message)
+
+    def move_to(self, step):
+        """
+        Select the result `step` positions away from the current one,
+        wrapping around the ends of the list.
+        """
+        model = self.results_view.model()
+        if model is None or model.rowCount() == 0:
+            return
+
+        current = self.results_view.currentIndex()
+        if current.isValid():
+            position = (current.row() + step) % model.rowCount()
+        else:
+            position = 0 if step > 0 else model.rowCount() - 1
+
+        index = model.index(position, 0)
+        self.results_view.setCurrentIndex(index)
+        self.results_view.scrollTo(index)
+        self.result_activated.emit(position)
+
 class MapAnnotationDialog(QDialog):
+    preview_clicked = Signal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -253,6 +337,19 @@ class MapAnnotationDialog(QDialog):
         self.find_ed = QLineEdit(self)
         self.replace_ed = QLineEdit(self)
 
+        # Preview of the changes
+        self.preview_label = QLabel('', self)
+        self.preview_list = QListWidget(self)
+        self.preview_list.hide()
+
+        self.src_tier_box.currentIndexChanged.connect(self.clear_preview)
+        self.dst_tier_box.currentIndexChanged.connect(self.clear_preview)
+        self.find_ed.textChanged.connect(self.clear_preview)
+        self.replace_ed.textChanged.connect(self.clear_preview)
+
+        preview_btn = QPushButton('&Preview', self)
+        preview_btn.clicked.connect(self.preview_clicked)
+
         ok_btn = QPushButton('Ok', self)
         ok_btn.clicked.connect(self.accept)
 
@@ -260,6 +357,7 @@ class MapAnnotationDialog(QDialog):
         cancel_btn.clicked.connect(self.reject)
 
         btn_box = QHBoxLayout()
+        btn_box.addWidget(preview_btn)
         btn_box.addWidget(ok_btn)
         btn_box.addWidget(cancel_btn)
 
@@ -271,10 +369,32 @@ class MapAnnotationDialog(QDialog):
 
         main_box = QVBoxLayout()
         main_box.addLayout(form)
+        main_box.addWidget(self.preview_label)
+        main_box.addWidget(self.preview_list)
         main_box.addLayout(btn_box)
 
         self.setLayout(main_box)
 
+    def set_preview(self, message, pairs=None):
+        """
+        Show the impact of the mapping before applying it.
+
+        Parameters
+        ----------
+        message : str
+            A summary of the changes.
+        pairs : list of (str, str), optional
+            A sample of labels before and after the mapping.
+        """
+        self.preview_label.setText(message)
+        self.preview_list.clear()
+        for before, after in pairs or []:
+            self.preview_list.addItem(f'{before} \u2192 {after}')
+        self.preview_list.setVisible(bool(pairs))
+
+    def clear_preview(self):
+        self.set_preview('')
+
     def set_fields(self, fields):
         if not self._fields == fields:
             self._fields = fields
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+from PySide6.QtWidgets import (
+    QDialog,
+    QComboBox,
+    QPushButton,
+    QFormLayout,
+    QVBoxLayout,
+    QHBoxLayout,
+)
+
+class SortDialog(QDialog):
+    """
+    Choose up to `levels` sort keys for the table. Each level is a column,
+    a field of the column (its label or one of its times) and an order.
+    """
+    levels = 3
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Sort')
+        self.setMinimumWidth(450)
+        self._fields = []
+        self.init_ui()
+
+    def init_ui(self):
+        form = QFormLayout()
+        self.level_boxes = []
+        for i in range(self.levels):
+            column_box = QComboBox(self)
+            field_box = QComboBox(self)
+            order_box = QComboBox(self)
+            order_box.addItem('A to Z', False)
+            order_box.addItem('Z to A', True)
+            column_box.currentIndexChanged.connect(
+                lambda _, column_box=column_box, field_box=field_box:
+                    self.on_column_changed(column_box, field_box)
+            )
+
+            hbox = QHBoxLayout()
+            hbox.addWidget(column_box, 1)
+            hbox.addWidget(field_box)
+            hbox.addWidget(order_box)
+            form.addRow('Sort by:' if i == 0 else 'Then by:', hbox)
+            self.level_boxes.append((column_box, field_box, order_box))
+
+        ok_btn = QPushButton('Ok', self)
+        ok_btn.setDefault(True)
+        ok_btn.clicked.connect(self.accept)
+
+        cancel_btn = QPushButton('Cancel', self)
+        cancel_btn.clicked.connect(self.reject)
+
+        btn_box = QHBoxLayout()
+        btn_box.addStretch()
+        btn_box.addWidget(ok_btn)
+        btn_box.addWidget(cancel_btn)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addLayout(btn_box)
+        self.setLayout(layout)
+
+    def on_column_changed(self, column_box, field_box):
+        column = column_box.currentData()
+        field_box.clear()
+        if column is None or column < 0:
+            field_box.setEnabled(False)
+            return
+        field_box.setEnabled(True)
+        if column == 0:
+            field_box.addItem('Name', 'text')
+        else:
+            field_box.addItem('Label', 'text')
+            field_box.addItem('Start time', 'xmin')
+            field_box.addItem('End time', 'xmax')
+
+    def set_fields(self, fields, column_index=-1):
+        """
+        Set the columns of the table and preselect the first level.
+        """
+        if not self._fields == fields:
+            self._fields = fields
+            for i, (column_box, _, _) in enumerate(self.level_boxes):
+                column_box.clear()
+                if i > 0:
+                    column_box.addItem('(none)', -1)
+                for column, name in enumerate(fields):
+                    column_box.addItem(name, column)
+
+        if column_index >= 0:
+            column_box = self.level_boxes[0][0]
+            column_box.setCurrentIndex(column_box.findData(column_index))
+
+    def data(self):
+        """
+        Return the selected levels as (column, field, descending) tuples.
+        """
+        keys = []
+        for column_box, field_box, order_box in self.level_boxes:
+            column = column_box.currentData()
+            if column is None or column < 0:
+                continue
+            keys.append((column, field_box.currentData(), order_box.currentData()))
+        return keys
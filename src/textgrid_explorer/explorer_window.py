@@ -16,21 +16,25 @@
 import re
 import shutil
 import subprocess
+from bisect import bisect_left
 from importlib import resources
+from itertools import islice
+from pathlib import Path
 
 from PySide6.QtWidgets import (
     QMainWindow,
     QWidget,
+    QFileDialog,
     QMessageBox,
+    QProgressBar,
+    QPushButton,
     QTableView,
     QMenuBar,
     QToolBar,
     QVBoxLayout,
 )
 from PySide6.QtCore import (
-    QItemSelectionRange,
     QSettings,
-    QSortFilterProxyModel,
     Qt,
     Signal,
     Slot,
@@ -43,13 +47,22 @@ from PySide6.QtGui import (
 )
 
 from textgrid_explorer.models import TGTableModel
+from textgrid_explorer.models import FindResultsModel
+from textgrid_explorer.models import TGFilterProxyModel
+from textgrid_explorer.store import SortKey
+from textgrid_explorer.workers import TableLoader
+from textgrid_explorer.workers import ProjectLoader
+from textgrid_explorer.workers import SaveWorker
 from textgrid_explorer.dialogs import NewProjectDialog
+from textgrid_explorer.dialogs import ProjectSettingsDialog
 from textgrid_explorer.dialogs import FilterByDialog
+from textgrid_explorer.dialogs import SortDialog
 from textgrid_explorer.dialogs import FindAndReplaceDialog
+from textgrid_explorer.dialogs import FindResultsDialog
 from textgrid_explorer.dialogs import MapAnnotationDialog
 from textgrid_explorer.dialogs import PreferencesDialog
 from textgrid_explorer.resources import rc_icons
-from textgrid_explorer import utils
+from textgrid_explorer import project
 
 resources_dir = resources.files('textgrid_explorer.resources')
 settings = QSettings('Gilgamesh', 'textgrid_explorer')
@@ -60,14 +73,13 @@ class EditorView(QWidget):
     def __init__(self, parent):
         super().__init__(parent)
         self.init_ui()
-        self._modified_indexes = set()
 
     def init_ui(self):
         self.table_view = QTableView()
 
         model = TGTableModel()
-        model.dataChanged.connect(self.on_changed_indexes)
-        proxy_model = QSortFilterProxyModel(model)
+        model.labels_edited.connect(self.on_labels_edited)
+        proxy_model = TGFilterProxyModel(model)
         proxy_model.setSourceModel(model)
         self.table_view.setModel(proxy_model)
 
@@ -75,13 +87,7 @@ class EditorView(QWidget):
         box_layout.addWidget(self.table_view)
         self.setLayout(box_layout)
 
-    def on_changed_indexes(self, topleft, bottomright, roles):
-        if not topleft.isValid() or not topleft.isValid():
-            return
-        selection_range = QItemSelectionRange(topleft, bottomright)
-        indexes = selection_range.indexes()
-        for index in indexes:
-            self._modified_indexes.add(index)
+    def on_labels_edited(self, cells):
         self.save_changes.emit(True)
 
     def set_table_data(self, headers, data):
@@ -94,28 +100,45 @@ class EditorView(QWidget):
             Column names.
         data : list of list
             The inner list have n-dimensions and the first element is a `pathlib.Path`
-            and the rest of the elements are `mytextgrid.core.interval_tier.Interval` or None.
+            and the rest of the elements are the items returned by
+            `textgrid_explorer.utils.read_textgrid` or None.
         """
         model = self.table_view.model().sourceModel()
         model.set_full_dataset(headers, data)
+        self.save_changes.emit(False)
+
+    def set_table_store(self, store):
+        """
+        Set the table data from a `textgrid_explorer.store.TableStore`,
+        which may have modified cells.
+        """
+        model = self.table_view.model().sourceModel()
+        model.set_store(store)
+        self.update_save_state()
+
+    def append_table_data(self, data):
+        """
+        Append rows at the end of the table. See `set_table_data`.
+        """
+        model = self.table_view.model().sourceModel()
+        model.append_data(data)
 
     def model(self):
         return self.table_view.model()
 
-    def modified_indexes(self):
+    def dirty_registry(self):
         """
-        QModelIndex objects corresponding to all modified (unsaved) data
-        cells in the model
+        The `textgrid_explorer.store.DirtyRegistry` of the modified (unsaved)
+        cells of the current dataset.
         """
-        return self._modified_indexes
+        return self.table_view.model().sourceModel().data_collection().dirty
 
-    def clear_modified_indexes(self):
+    def update_save_state(self):
         """
-        Clear the internal list of modified indexes, typically called after
-        a successful save operation.
+        Emit `save_changes` according to whether there are modified cells,
+        typically called after a save operation.
         """
-        self._modified_indexes.clear()
-        self.save_changes.emit(False)
+        self.save_changes.emit(bool(self.dirty_registry()))
 
 class TGExplorer(QMainWindow):
 
@@ -124,6 +147,10 @@ class TGExplorer(QMainWindow):
         self.setWindowTitle('TextGrid Explorer')
         self.setMinimumSize(800, 500)
         #self.showMaximized()
+        self.table_loader = None
+        self.save_worker = None
+        self._saving_cells = []
+        self.project = None
         self.create_dialogs()
         self.create_actions()
         self.init_ui()
@@ -151,6 +178,10 @@ class TGExplorer(QMainWindow):
         self.project_settings_act.setShortcut('Ctrl+R')
         self.project_settings_act.triggered.connect(self.on_project_settings)
 
+        self.save_project_act = QAction(self.tr('Save p&roject'), self)
+        self.save_project_act.setShortcut('Ctrl+Shift+S')
+        self.save_project_act.triggered.connect(self.on_save_project)
+
         save_icon = QIcon(QPixmap(':icons/disk.png'))
         self.save_changes_act = QAction(save_icon, self.tr('&Save Changes'), self)
         self.save_changes_act.setShortcut('Ctrl+S')
@@ -167,6 +198,9 @@ class TGExplorer(QMainWindow):
         self.sort_za_act = QAction(self.tr('Sort table by column (Z to A)'), self)
         self.sort_za_act.triggered.connect(self.on_sort_za)
 
+        self.sort_act = QAction(self.tr('&Sort...'), self)
+        self.sort_act.triggered.connect(self.popup_sort_dlg)
+
         funnel_icon = QIcon(QPixmap(':icons/funnel.png'))
         self.filter_act = QAction(funnel_icon, self.tr('&Filter by...'), self)
         self.filter_act.triggered.connect(self.popup_filter_dlg)
@@ -200,6 +234,7 @@ class TGExplorer(QMainWindow):
         file_bar.addAction(self.close_project_act)
         file_bar.addSeparator()
         file_bar.addAction(self.project_settings_act)
+        file_bar.addAction(self.save_project_act)
         file_bar.addSeparator()
         file_bar.addAction(self.save_changes_act)
         file_bar.addSeparator()
@@ -217,6 +252,7 @@ class TGExplorer(QMainWindow):
         data_bar = menu_bar.addMenu(self.tr('&View'))
         data_bar.addAction(self.sort_az_act)
         data_bar.addAction(self.sort_za_act)
+        data_bar.addAction(self.sort_act)
         data_bar.addSeparator()
         data_bar.addAction(self.filter_act)
 
@@ -233,10 +269,34 @@ class TGExplorer(QMainWindow):
     def init_ui(self):
         self.editor_view = EditorView(self)
         self.editor_view.save_changes.connect(self.save_changes_act.setEnabled)
+        self.editor_view.model().filter_failed.connect(self.on_filter_failed)
         selection_model = self.editor_view.table_view.selectionModel()
         selection_model.currentColumnChanged.connect(self.on_sorting_act)
         self.setCentralWidget(self.editor_view)
 
+        # Find results refer to rows of the current dataset only
+        source_model = self.editor_view.model().sourceModel()
+        source_model.modelReset.connect(self.find_results_model.clear)
+
+        # Project loading progress
+        self.load_progress_bar = QProgressBar(self)
+        self.load_progress_bar.setMaximumWidth(200)
+        self.cancel_load_btn = QPushButton(self.tr('Cancel'), self)
+        self.cancel_load_btn.clicked.connect(self.on_cancel_load)
+
+        status_bar = self.statusBar()
+        status_bar.addPermanentWidget(self.load_progress_bar)
+        status_bar.addPermanentWidget(self.cancel_load_btn)
+        self.load_progress_bar.hide()
+        self.cancel_load_btn.hide()
+
+        # Save progress
+        self.save_progress_bar = QProgressBar(self)
+        self.save_progress_bar.setMaximumWidth(200)
+        self.save_progress_bar.setFormat(self.tr('Saving %v/%m'))
+        status_bar.addPermanentWidget(self.save_progress_bar)
+        self.save_progress_bar.hide()
+
     def create_dialogs(self):
         self.preferences_dlg = PreferencesDialog(self)
         self.preferences_dlg.accepted.connect(self.on_preferences)
@@ -244,8 +304,14 @@ class TGExplorer(QMainWindow):
         self.new_project_dlg = NewProjectDialog(self)
         self.new_project_dlg.accepted.connect(self.on_load_data)
 
+        self.project_settings_dlg = ProjectSettingsDialog(self)
+        self.project_settings_dlg.accepted.connect(self.on_apply_project_settings)
+
         self.simple_filter_dlg = FilterByDialog(self)
-        self.simple_filter_dlg.filtered_by.connect(self.on_filter_rows)
+        self.simple_filter_dlg.filters_changed.connect(self.on_filter_rows)
+
+        self.sort_dlg = SortDialog(self)
+        self.sort_dlg.accepted.connect(self.on_sort)
 
         self.find_and_replace_dlg = FindAndReplaceDialog(self)
         self.find_and_replace_dlg.replace_all_clicked.connect(self.on_replace_all)
@@ -253,19 +319,22 @@ class TGExplorer(QMainWindow):
         self.find_and_replace_dlg.find_all_clicked.connect(self.on_find_all)
         self.find_and_replace_dlg.find_clicked.connect(lambda: self.on_find(1))
 
+        self.find_results_model = FindResultsModel()
+        self.find_results_dlg = FindResultsDialog(self)
+        self.find_results_dlg.set_model(self.find_results_model)
+        self.find_results_dlg.result_activated.connect(self.on_find_result)
+
         self.map_annotations_dlg = MapAnnotationDialog(self)
         self.map_annotations_dlg.accepted.connect(self.on_map_annotations)
+        self.map_annotations_dlg.preview_clicked.connect(self.on_preview_map_annotations)
 
     def closeEvent(self, e):
-        indexes = self.editor_view.modified_indexes()
-        if indexes:
-            response = QMessageBox.question(
-                self,
-                'Save Changes?',
-                'You have unsaved changes. Do you want to save them before quitting?'
-            )
-            if response == QMessageBox.StandardButton.Yes:
-                self.on_save_changes()
+        self.new_project_dlg.wait_for_scans()
+        self.project_settings_dlg.wait_for_scans()
+        self.stop_table_loader()
+        self.editor_view.model().stop_filtering()
+        self.offer_to_save_changes('Do you want to save them before quitting?')
+        self.write_project()
         super().closeEvent(e)
 
     def popup_preferences_dlg(self):
@@ -334,51 +403,110 @@ class TGExplorer(QMainWindow):
         fields = [proxy_model.headerData(i, orientation) for i in range(ncols)]
 
         self.map_annotations_dlg.set_fields(fields)
+        self.map_annotations_dlg.clear_preview()
         self.map_annotations_dlg.show()
 
+    def select_source_cell(self, row, column):
+        """
+        Select, focus and scroll to a cell of the source model.
+
+        Returns
+        -------
+        bool
+            False if the cell is hidden by the current filter.
+        """
+        table_view = self.editor_view.table_view
+        proxy_model = table_view.model()
+        proxy_row = proxy_model.proxy_row(row)
+        if proxy_row < 0:
+            return False
+
+        # Fetch the rows up to the cell, if the view has not shown them yet
+        proxy_model.fetch_rows(proxy_row + 1)
+        proxy_index = proxy_model.index(proxy_row, column)
+
+        sel_model = table_view.selectionModel()
+        sel_model.select(proxy_index, sel_model.SelectionFlag.ClearAndSelect)
+        table_view.setCurrentIndex(proxy_index) # Focus
+        table_view.scrollTo(proxy_index)
+        return True
+
+    def find_columns(self, dlg_dict):
+        """
+        Return the columns to search in according to the find dialog.
+        """
+        source_model = self.editor_view.model().sourceModel()
+        if dlg_dict['all_columns']:
+            return list(range(source_model.columnCount()))
+        if dlg_dict['column_index'] < 0:
+            return []
+        return [dlg_dict['column_index']]
+
     def on_find(self, step=1):
         """
         Find the next item in the specified column starting from the
-        selected row.
+        selected row. When searching in all columns, start from the
+        selected cell instead.
         """
         table_view = self.editor_view.table_view
         proxy_model = table_view.model()
         source_model = proxy_model.sourceModel()
 
-        # 1. From the QDialog, get the column index and the search pattern
+        # 1. From the QDialog, get the columns and the search pattern
         dlg_dict = self.find_and_replace_dlg.data()
-        col_ind = dlg_dict['column_index']
+        columns = self.find_columns(dlg_dict)
         pattern = dlg_dict['pattern']
+        if not columns:
+            return False
 
-        # 2. From the QTableView, get the current selected row
-        row_ind = 0
+        # 2. From the QTableView, get the current selected cell
+        start = (0, -1)
         proxy_indexes = table_view.selectedIndexes()
         if proxy_indexes:
             current_source_index = proxy_model.mapToSource(proxy_indexes[0])
-            row_ind = current_source_index.row() + step
-
-        # 3. Find the next item moving on from the current selected row,
-        # the specified column and the pattern
-        p = re.compile(pattern)
-        for i in range(row_ind, source_model.rowCount()):
-            source_index = source_model.index(i, col_ind)
-            cell_text = source_index.data()
-            if not p.search(cell_text):
-                continue
-
-            proxy_index = proxy_model.mapFromSource(source_index)
-            if not proxy_index.isValid():
-                continue
-
-            sel_model = table_view.selectionModel()
-            sel_model.select(proxy_index, sel_model.SelectionFlag.ClearAndSelect)
-            table_view.setCurrentIndex(proxy_index) # Focus
-            table_view.scrollTo(proxy_index)
-            return True
+            if dlg_dict['all_columns']:
+                start = (current_source_index.row(), current_source_index.column() + step)
+            else:
+                start = (current_source_index.row() + step, -1)
+
+        # 3. Find the next visible match from the current cell
+        try:
+            matches = source_model.find_all(pattern, columns)
+        except re.error as e:
+            QMessageBox.warning(self, 'Find', f'Invalid pattern: {e}')
+            return False
+        for row, column in islice(matches, bisect_left(matches, start), None):
+            if self.select_source_cell(row, column):
+                return True
         return False
 
     def on_find_all(self):
-        print('Find All')
+        """
+        List every cell that matches the pattern in the specified column,
+        or in all columns.
+        """
+        source_model = self.editor_view.model().sourceModel()
+
+        dlg_dict = self.find_and_replace_dlg.data()
+        columns = self.find_columns(dlg_dict)
+        if not columns:
+            return
+
+        try:
+            matches = source_model.find_all(dlg_dict['pattern'], columns)
+        except re.error as e:
+            QMessageBox.warning(self, 'Find all', f'Invalid pattern: {e}')
+            return
+
+        self.find_results_model.set_matches(source_model, matches)
+        self.find_results_dlg.set_summary(f'{len(matches)} match(es) found.')
+        self.find_results_dlg.show()
+        self.find_results_dlg.raise_()
+
+    def on_find_result(self, position):
+        row, column = self.find_results_model.cell_at(position)
+        if not self.select_source_cell(row, column):
+            self.statusBar().showMessage('The cell is hidden by the current filter.', 3000)
 
     def on_replace(self):
         """
@@ -396,7 +524,6 @@ class TGExplorer(QMainWindow):
         # 2. From the QDialog, get the column index, the search pattern
         #    and the replace
         dlg_dict = self.find_and_replace_dlg.data()
-        col_ind = dlg_dict['column_index']
         pattern = dlg_dict['pattern']
         repl = dlg_dict['replace']
 
@@ -426,17 +553,15 @@ class TGExplorer(QMainWindow):
         pattern = dlg_dict['pattern']
         repl = dlg_dict['replace']
 
-        # 2. Get the all the indexes from the selected column
+        # 2. Get the visible indexes of the selected column that match
         proxy_model = table_view.model()
         source_model = proxy_model.sourceModel()
 
         source_indexes = []
-        for i in range(proxy_model.rowCount()):
-            proxy_item = proxy_model.index(i, col_ind)
-            source_item = proxy_model.mapToSource(proxy_item)
-            if not source_item.isValid():
+        for row, column in source_model.find_all(pattern, [col_ind]):
+            if proxy_model.proxy_row(row) < 0:
                 continue
-            source_indexes.append(source_item)
+            source_indexes.append(source_model.index(row, column))
 
         # 3. Replace All
         source_model.replace(source_indexes, pattern, repl)
@@ -451,6 +576,25 @@ class TGExplorer(QMainWindow):
             r.find, r.replace, r.src_column_index, r.dst_column_index,
         )
 
+    def on_preview_map_annotations(self):
+        """
+        Count the cells that the mapping would change without changing them.
+        """
+        r = self.map_annotations_dlg.data()
+
+        model = self.editor_view.table_view.model().sourceModel()
+        try:
+            summary = model.replace_all(
+                r.find, r.replace, r.src_column_index, r.dst_column_index, dry_run=True
+            )
+        except re.error as e:
+            self.map_annotations_dlg.set_preview(f'Invalid pattern: {e}')
+            return
+
+        self.map_annotations_dlg.set_preview(
+            f'{summary.count} cell(s) will change', summary.samples
+        )
+
     def on_open_praat(self):
         table_view = self.editor_view.table_view
         indexes = table_view.selectedIndexes()
@@ -503,7 +647,7 @@ class TGExplorer(QMainWindow):
             textgrid_path,
             sound_path,
             str(maximize_audibility),
-            str(item.tier.index + 1),
+            str(item.tier_index + 1),
             str(item.xmin),
             str(item.xmax)
         ]
@@ -516,7 +660,7 @@ class TGExplorer(QMainWindow):
         self.save_changes_act.setEnabled(b)
         self.close_project_act.setEnabled(b)
         self.project_settings_act.setEnabled(b)
-        self.open_project_act.setEnabled(b)
+        self.save_project_act.setEnabled(b)
         self.open_praat_act.setEnabled(b)
         self.filter_act.setEnabled(b)
         self.find_and_replace_act.setEnabled(b)
@@ -524,32 +668,157 @@ class TGExplorer(QMainWindow):
         self.map_annotation_act.setEnabled(b)
         self.sort_az_act.setEnabled(b)
         self.sort_za_act.setEnabled(b)
+        self.sort_act.setEnabled(b)
 
     def on_open_project(self):
-        pass
+        path, _ = QFileDialog.getOpenFileName(
+            self,
+            'Open project',
+            Path.home().as_posix(),
+            f'TextGrid Explorer projects (*{project.PROJECT_SUFFIX})',
+        )
+        if path == '':
+            return
+        if self.project is not None:
+            self.on_close_project()
+
+        # Read the project in the background
+        self.stop_table_loader()
+        self.on_enabled_buttons(False)
+
+        loader = ProjectLoader(self, Path(path))
+        loader.loaded.connect(self.on_project_loaded)
+        loader.progress_changed.connect(self.on_load_progress)
+        loader.failed.connect(self.on_open_project_failed)
+        loader.finished.connect(self.on_load_finished)
+        self.table_loader = loader
+
+        self.load_progress_bar.setRange(0, 0)
+        self.load_progress_bar.show()
+        self.cancel_load_btn.show()
+        loader.start()
+
+    def on_project_loaded(self, loaded_project, store):
+        if self.sender() is not self.table_loader:
+            return
+        self.project = loaded_project
+        self.editor_view.set_table_store(store)
+        self.update_window_title()
+        if loaded_project.reread_files:
+            self.statusBar().showMessage(
+                f'{loaded_project.reread_files} new or changed file(s) were read again.', 5000
+            )
+        if loaded_project.lost_edits:
+            QMessageBox.warning(
+                self,
+                'Open project',
+                f'{loaded_project.lost_edits} unsaved change(s) were lost because '
+                'their files have changed since the project was saved.'
+            )
+
+    def on_open_project_failed(self, message):
+        QMessageBox.critical(self, 'Open project', f'Could not open the project: {message}')
 
     def on_project_settings(self):
-        pass
+        if self.project is None:
+            return
+        self.project_settings_dlg.set_data(self.project.settings)
+        self.project_settings_dlg.open()
 
-    def on_close_project(self):
-        indexes = self.editor_view.modified_indexes()
-        if indexes:
+    def on_apply_project_settings(self):
+        self.offer_to_save_changes('Do you want to save them before the table is built again?')
+        project_path = None if self.project is None else self.project.path
+        self.load_project_data(self.project_settings_dlg.data(), project_path)
+
+    def on_save_project(self):
+        """
+        Save the current project, asking for a file the first time.
+        """
+        if self.project is None:
+            return
+        if self.project.path is None:
+            path, _ = QFileDialog.getSaveFileName(
+                self,
+                'Save project',
+                self.project.settings['src_dir'],
+                f'TextGrid Explorer projects (*{project.PROJECT_SUFFIX})',
+            )
+            if path == '':
+                return
+            path = Path(path)
+            if path.suffix != project.PROJECT_SUFFIX:
+                path = path.with_name(path.name + project.PROJECT_SUFFIX)
+            self.project.path = path
+            self.update_window_title()
+        self.wait_for_save()
+        if self.write_project():
+            self.statusBar().showMessage(f'Project saved to {self.project.path}', 3000)
+
+    def write_project(self):
+        """
+        Write the current project to its file, if it has one, so that it
+        can be opened again as it is, unsaved changes included.
+
+        Returns
+        -------
+        bool
+            False if the project could not be written.
+        """
+        if self.project is None or self.project.path is None:
+            return True
+        store = self.editor_view.model().sourceModel().data_collection()
+        try:
+            project.save_project(self.project, store)
+        except (OSError, project.ProjectError) as e:
+            QMessageBox.warning(self, 'Save project', f'Could not save the project: {e}')
+            return False
+        return True
+
+    def update_window_title(self):
+        if self.project is None:
+            self.setWindowTitle('TextGrid Explorer')
+        else:
+            self.setWindowTitle(f'{self.project.name} - TextGrid Explorer')
+
+    def offer_to_save_changes(self, question):
+        """
+        Ask whether to save the modified cells, if any, and wait for the
+        save to finish.
+        """
+        if self.editor_view.dirty_registry():
             response = QMessageBox.question(
                 self,
                 'Save Changes?',
-                'You have unsaved changes. Do you want to save them before closing the project?'
+                f'You have {self.unsaved_changes_text()}. {question}'
             )
             if response == QMessageBox.StandardButton.Yes:
                 self.on_save_changes()
+        self.wait_for_save()
+
+    def on_close_project(self):
+        self.stop_table_loader()
+        self.offer_to_save_changes('Do you want to save them before closing the project?')
+        self.write_project()
 
+        self.project = None
+        self.update_window_title()
         self.editor_view.set_table_data([], [])
         self.on_enabled_buttons(False)
-        self.editor_view.clear_modified_indexes()
 
     def on_load_data(self):
-        # Get variables from a dialog
-        dict_ = self.new_project_dlg.data()
+        self.load_project_data(self.new_project_dlg.data())
 
+    def load_project_data(self, dict_, project_path=None):
+        """
+        Build the table of a project in the background.
+
+        Parameters
+        ----------
+        dict_ : dict
+            The settings returned by `NewProjectDialog.data`.
+        project_path : pathlib.Path, optional
+            The file of the project, if it has been saved.
+        """
         src_dir = dict_['src_dir']
 
         primary_tier = dict_['primary_tier']
@@ -560,39 +829,138 @@ class TGExplorer(QMainWindow):
         if secondary_tiers is None:
             secondary_tiers = []
 
-        # Build table headers and data
-        headers, data = utils.create_aligned_tier_table(
-            src_dir, primary_tier, secondary_tiers
+        # Build table headers and data in the background
+        self.wait_for_save()
+        self.stop_table_loader()
+        self.on_enabled_buttons(False)
+        self.project = project.Project(dict_, project_path)
+        self.update_window_title()
+
+        loader = TableLoader(
+            self,
+            src_dir,
+            primary_tier,
+            secondary_tiers,
+            alignment=dict_['alignment'],
+            tolerance=dict_['tolerance'],
+            paths=dict_['paths'],
+            include=dict_.get('include'),
+            exclude=dict_.get('exclude'),
+            follow_symlinks=dict_.get('follow_symlinks', False),
         )
+        loader.rows_loaded.connect(self.on_rows_loaded)
+        loader.progress_changed.connect(self.on_load_progress)
+        loader.failed.connect(self.on_load_failed)
+        loader.finished.connect(self.on_load_finished)
+        self.table_loader = loader
+
+        # Fill up table as the rows arrive
+        self.editor_view.set_table_data(loader.headers(), [])
+        self.load_progress_bar.setRange(0, 0)
+        self.load_progress_bar.show()
+        self.cancel_load_btn.show()
+        loader.start()
+
+    def stop_table_loader(self):
+        """
+        Stop the current project loading, if any, and wait for it.
+        """
+        loader = self.table_loader
+        if loader is None:
+            return
+        # An incomplete table must not be saved
+        self.project = None
+        self.update_window_title()
+        self.table_loader = None
+        loader.requestInterruption()
+        loader.wait()
+        self.load_progress_bar.hide()
+        self.cancel_load_btn.hide()
+
+    def on_rows_loaded(self, rows):
+        # Ignore the batches of a cancelled loader still in the event queue
+        if self.sender() is not self.table_loader:
+            return
+        self.editor_view.append_table_data(rows)
+
+    def on_load_progress(self, done, total):
+        self.load_progress_bar.setRange(0, total)
+        self.load_progress_bar.setValue(done)
 
-        # Fill up table
-        self.editor_view.set_table_data(headers, data)
+    def on_load_failed(self, message):
+        QMessageBox.critical(self, 'New project', f'Could not load the project: {message}')
+
+    def on_load_finished(self):
+        loader = self.sender()
+        if loader is not self.table_loader:
+            return
+        self.table_loader = None
+        self.load_progress_bar.hide()
+        self.cancel_load_btn.hide()
+        if isinstance(loader, TableLoader):
+            self.project.fingerprints = loader.fingerprints
+            self.project.encodings = loader.encodings
 
         # Enable buttons
-        self.on_enabled_buttons(True)
-        self.save_changes_act.setEnabled(False)
+        self.on_enabled_buttons(self.project is not None)
+        self.editor_view.update_save_state()
+
+    def on_cancel_load(self):
+        self.stop_table_loader()
+        self.editor_view.set_table_data([], [])
+        self.on_enabled_buttons(False)
+
+    @Slot(object, str)
+    def on_filter_rows(self, filters, mode):
+        proxy_model = self.editor_view.model()
+        proxy_model.request_filters(filters, mode)
+
+    def on_filter_failed(self, message):
+        message = f'Could not filter the rows: {message}'
+        self.simple_filter_dlg.set_message(message)
+        self.statusBar().showMessage(message, 5000)
+
+    def popup_sort_dlg(self):
+        proxy_model = self.editor_view.model()
+        ncols = proxy_model.columnCount()
+        orientation = Qt.Orientation.Horizontal
+        fields = [proxy_model.headerData(i, orientation) for i in range(ncols)]
 
-    @Slot(int, str, str)
-    def on_filter_rows(self, column_index, column_name, pattern):
+        column_index = self.editor_view.table_view.currentIndex().column()
+        self.sort_dlg.set_fields(fields, column_index)
+        self.sort_dlg.open()
+
+    def on_sort(self):
         proxy_model = self.editor_view.model()
-        proxy_model.setFilterKeyColumn(column_index)
-        proxy_model.setFilterRegularExpression(pattern)
+        proxy_model.set_sort_keys(self.sort_dlg.data())
+
+    def sort_by_column(self, column_index, descending):
+        """
+        Sort by a column. Rows with the same label are ordered by file
+        name and then by the start time of the primary tier.
+        """
+        proxy_model = self.editor_view.model()
+        sort_keys = [SortKey(column_index, 'text', descending)]
+        if column_index != 0:
+            sort_keys.append(SortKey(0))
+        if proxy_model.columnCount() > 1:
+            sort_keys.append(SortKey(1, 'xmin'))
+
+        proxy_model.set_sort_keys(sort_keys)
 
     def on_sort_az(self):
         table_view = self.editor_view.table_view
         indexes = table_view.selectedIndexes()
         if indexes:
             topleft_index = indexes[0]
-            column_index = topleft_index.column()
-            table_view.sortByColumn(column_index, Qt.SortOrder.AscendingOrder)
+            self.sort_by_column(topleft_index.column(), False)
 
     def on_sort_za(self):
         table_view = self.editor_view.table_view
         indexes = table_view.selectedIndexes()
         if indexes:
             topleft_index = indexes[0]
-            column_index = topleft_index.column()
-            table_view.sortByColumn(column_index, Qt.SortOrder.DescendingOrder)
+            self.sort_by_column(topleft_index.column(), True)
 
     def on_sorting_act(self, current_index, previous_index):
         """
@@ -606,19 +974,88 @@ class TGExplorer(QMainWindow):
         self.sort_az_act.setText(f'Sort by column "{column_name}" (A to Z)')
         self.sort_za_act.setText(f'Sort by column "{column_name}" (Z to A)')
 
+    def unsaved_changes_text(self):
+        dirty = self.editor_view.dirty_registry()
+        nfiles = dirty.file_count()
+        return (
+            f'{len(dirty)} unsaved change{"s" if len(dirty) != 1 else ""} '
+            f'in {nfiles} file{"s" if nfiles != 1 else ""}'
+        )
+
     def on_save_changes(self):
-        tmp_paths = set()
-        indexes = self.editor_view.modified_indexes()
-        for index in indexes:
-            src_model = index.model()
-            src_model.setData(index, False, Qt.ItemDataRole.ForegroundRole)
-
-            item = index.data(Qt.ItemDataRole.UserRole)
-            if item.file_path in tmp_paths:
-                continue
-            item.textgrid.write(item.file_path) #Save path
-            tmp_paths.add(item.file_path)
-        self.editor_view.clear_modified_indexes()
+        if self.save_worker is not None:
+            return
+
+        store = self.editor_view.model().sourceModel().data_collection()
+        changes = {}
+        saving_cells = []
+        for path, cells in store.dirty_files().items():
+            for row, column in cells:
+                cell = store.cell(row, column)
+                changes.setdefault(path, []).append(cell)
+                saving_cells.append((row, column, cell.text))
+
+        if not changes:
+            return
+
+        # Write only the modified files, off the GUI thread
+        encodings = {}
+        if self.project is not None:
+            for path in changes:
+                encoding = self.project.file_encoding(path)
+                if encoding is not None:
+                    encodings[path] = encoding
+        worker = SaveWorker(self, changes, encodings)
+        worker.progress_changed.connect(self.on_save_progress)
+        worker.finished.connect(self.on_save_finished)
+        self.save_worker = worker
+        self._saving_cells = saving_cells
+
+        self.save_changes_act.setEnabled(False)
+        self.save_progress_bar.setRange(0, len(changes))
+        self.save_progress_bar.setValue(0)
+        self.save_progress_bar.show()
+        worker.start()
+
+    def on_save_progress(self, done, total):
+        self.save_progress_bar.setRange(0, total)
+        self.save_progress_bar.setValue(done)
+
+    def on_save_finished(self):
+        worker = self.save_worker
+        if worker is None:
+            return
+        self.save_worker = None
+        self.save_progress_bar.hide()
+
+        # Files that could not be written keep their cells modified
+        saved_paths = set(worker.saved)
+        if self.project is not None:
+            self.project.update_fingerprints(worker.saved)
+        model = self.editor_view.model().sourceModel()
+        store = model.data_collection()
+        model.mark_saved(
+            (row, column, text)
+            for row, column, text in self._saving_cells
+            if store.file_path(row) in saved_paths
+        )
+        self._saving_cells = []
+        self.editor_view.update_save_state()
+
+        if worker.errors:
+            QMessageBox.warning(
+                self,
+                'Save Changes',
+                'Some files could not be saved:<br>' + '<br>'.join(worker.errors)
+            )
+
+    def wait_for_save(self):
+        """
+        Wait for the current save operation, if any, to finish.
+        """
+        if self.save_worker is not None:
+            self.save_worker.wait()
+            self.on_save_finished()
 
     def on_preferences(self):
         dict_ = self.preferences_dlg.to_dict()
@@ -14,12 +14,18 @@
 #   You should have received a copy of the GNU General Public License along
 #   with this program.  If not, see <https://www.gnu.org/licenses/>.
 import re
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
 
 from PySide6.QtCore import (
+    QAbstractListModel,
+    QAbstractProxyModel,
     QAbstractTableModel,
     QModelIndex,
     Qt,
     QDate,
+    Signal,
 )
 from PySide6.QtGui import (
     QPixmap,
@@ -28,80 +34,155 @@ from PySide6.QtGui import (
     QBrush
 )
 
+from textgrid_explorer.store import SortKey
+from textgrid_explorer.store import TableStore
+from textgrid_explorer.trigrams import is_literal_extension
+from textgrid_explorer.workers import FilterWorker
+
+ReplaceSummary = namedtuple('ReplaceSummary', ['count', 'samples'])
+ColumnFilter = namedtuple('ColumnFilter', ['column', 'pattern'])
+
+FILTER_MODES = ('and', 'or')
+
+# Brushes returned by `TGTableModel.data`
+MISSING_BRUSH = QBrush(QColor('lightGray'))
+DEFAULT_BRUSH = QBrush(QColor('white'))
+TEXT_BRUSH = QBrush(QColor('black'))
+MODIFIED_TEXT_BRUSH = QBrush(QColor('blue'))
+
 class TGTableModel(QAbstractTableModel):
+    """
+    A table model whose rows are made visible to the views in pages of
+    `page_size` rows, as the user scrolls down.
+
+    `index` also returns the cells of the rows that have not been fetched
+    yet, and `rows_appended` reports the rows added to the store, so that
+    a `TGFilterProxyModel` can filter and sort the whole dataset and page
+    its own rows.
+
+    Every edit of the labels, single or in bulk, emits `labels_edited` once
+    with the list of (row, column) cells that changed.
+    """
+    labels_edited = Signal(object)
+    rows_appended = Signal(int, int)
+
+    page_size = 10000
 
     def __init__(self):
         super().__init__()
-        self._data = []
-        self._headers = []
+        self._store = TableStore()
+        self._fetched = 0
+        self._find_cache = {}
+        self._role_handlers = {
+            Qt.ItemDataRole.DisplayRole: self._display_data,
+            Qt.ItemDataRole.EditRole: self._display_data,
+            Qt.ItemDataRole.BackgroundRole: self._background_data,
+            Qt.ItemDataRole.ForegroundRole: self._foreground_data,
+            Qt.ItemDataRole.UserRole: self._user_data,
+        }
+
+        # Any change of the data makes the cached matches stale
+        self.dataChanged.connect(self._clear_find_cache)
+        self.modelReset.connect(self._clear_find_cache)
+        self.rows_appended.connect(self._clear_find_cache)
 
     def set_full_dataset(self, headers, new_data):
+        self.set_store(TableStore.from_rows(headers, new_data))
+
+    def set_store(self, store):
+        """
+        Show a `textgrid_explorer.store.TableStore`, e.g. one read from a
+        project file.
+        """
         self.beginResetModel()
-        self._headers = headers
-        self._data = new_data
+        self._store = store
+        self._fetched = min(len(self._store), self.page_size)
         self.endResetModel()
 
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid():
+            return QModelIndex()
+        if not (0 <= row < len(self._store) and 0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
     def rowCount(self, index=QModelIndex()):
-        return len(self._data)
+        return self._fetched
+
+    def total_row_count(self):
+        """
+        Return the number of rows in the dataset, including the ones that
+        have not been fetched yet.
+        """
+        return len(self._store)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._fetched < len(self._store)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        self._fetch(self._fetched + self.page_size)
+
+    def _fetch(self, count):
+        count = min(count, len(self._store))
+        if count <= self._fetched:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, count - 1)
+        self._fetched = count
+        self.endInsertRows()
 
     def columnCount(self, index=QModelIndex()):
-        return len(self._headers)
+        return len(self._store.headers)
 
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
         if not role == Qt.ItemDataRole.DisplayRole:
             return
 
         if orientation == Qt.Orientation.Horizontal:
-            return self._headers[section]
+            return self._store.headers[section]
         return section+1
 
     def data(self, index=QModelIndex(), role=Qt.ItemDataRole.DisplayRole):
         """
-        Underlying data structure is a list.
-        [
-            `pathlib.Path`, # Item from TextGrid property
-            `mytextgrid.Interval`, # Item from primary tier
-            `mytextgrid.Interval` or None, # Items from secondary tiers
-            ...
-            `mytextgrid.Interval` or None, # Items from secondary tiers
-        ]
-        """
-        row, column = index.row(), index.column()
-        item = self._data[row][column]
+        Underlying data structure is a `TableStore`. The first column holds
+        the `pathlib.Path` of the TextGrid file and the rest of the columns
+        hold the labels of the aligned intervals or None.
 
-        if role == Qt.ItemDataRole.DisplayRole:
-            if column == 0: # first column is `pathlib.Path` object
-                return item.name
-
-            if item is None: # Item is None
-                return ''
-
-            return item.text # `Interval` object
-
-        elif role == Qt.ItemDataRole.BackgroundRole:
-            if item is None:
-                return QBrush(QColor('lightGray'))
-            return QBrush(QColor('white'))
-
-        elif role == Qt.ForegroundRole.ForegroundRole:
-            if column > 0 and item is not None:
-                if item.modified:
-                    return QBrush(QColor('blue'))
-            return QBrush(QColor('black'))
-
-        elif role == Qt.ItemDataRole.EditRole:
-            if column == 0:
-                return item.name
-
-            if item is None:
-                return ''
-
-            return item.text
-
-        elif role == Qt.ItemDataRole.UserRole:
-            return item
-
-        return None
+        The view calls this method for every role of every painted cell, so
+        each role is handled by its own method looked up in a dict, and the
+        brushes are built only once.
+        """
+        handler = self._role_handlers.get(role)
+        if handler is None:
+            return None
+        return handler(index.row(), index.column())
+
+    def _display_data(self, row, column):
+        if column == 0: # first column is `pathlib.Path` object
+            return self._store.file_path(row).name
+
+        text = self._store.columns[column].labels[row]
+        if text is None: # Item is None
+            return ''
+        return text
+
+    def _background_data(self, row, column):
+        if column and self._store.columns[column].labels[row] is None:
+            return MISSING_BRUSH
+        return DEFAULT_BRUSH
+
+    def _foreground_data(self, row, column):
+        if column and self._store.columns[column].is_dirty(row):
+            return MODIFIED_TEXT_BRUSH
+        return TEXT_BRUSH
+
+    def _user_data(self, row, column):
+        if column == 0:
+            return self._store.file_path(row)
+        return self._store.cell(row, column)
 
     def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
         if not index.isValid():
@@ -112,41 +193,54 @@ class TGTableModel(QAbstractTableModel):
                 return False
 
             column, row = index.column(), index.row()
-            item = self._data[row][column]
+            text = self._store.label(row, column)
 
-            if item is None:
+            if text is None:
                 return False
 
-            if item.text == value:
+            if text == value:
                 return False
 
-            item.text = value
-            item.modified = True
-            self._data[row][column] = item
+            self._store.set_label(row, column, value)
+            self._store.set_dirty(row, column, True)
 
             self.dataChanged.emit(index, index)
+            self.labels_edited.emit([(row, column)])
             return True
 
         elif role == Qt.ForegroundRole.ForegroundRole:
             row, col = index.row(), index.column()
-            self._data[row][col].modified = value
+            self._store.set_dirty(row, col, value)
             self.dataChanged.emit(index, index)
             return True
 
         elif role == Qt.ItemDataRole.UserRole:
             row, col = index.row(), index.column()
-            self._data[row][col] = value
+            self._store.set_cell(row, col, value)
             self.dataChanged.emit(index, index)
             return True
 
         return False
 
-    def append_data(self, dict_):
-        self.beginInsertRows(QModelIndex(), self.rowCount(), self.rowCount())
-        self._data.append(dict_)
-        row = len(self._data) - 1
-        self.save(row)
-        self.endInsertRows()
+    def append_data(self, rows):
+        """
+        Append a batch of rows at the end of the table.
+
+        Parameters
+        ----------
+        rows : list of list
+            Rows in the format returned by
+            `textgrid_explorer.utils.create_aligned_tier_table`.
+        """
+        if not rows:
+            return
+        first = len(self._store)
+        self._store.append_rows(rows)
+        self.rows_appended.emit(first, len(self._store) - 1)
+
+        # Show the first page as soon as it is available, the rest is
+        # fetched on demand
+        self._fetch(self.page_size)
 
     def flags(self, index=None):
         if index is None:
@@ -158,25 +252,150 @@ class TGTableModel(QAbstractTableModel):
             return my_flags
 
         column, row = index.column(), index.row()
-        item = self._data[row][column]
-        if item is None:
+        if self._store.is_missing(row, column):
             return my_flags
         return my_flags|Qt.ItemFlag.ItemIsEditable
 
+    def set_labels(self, changes):
+        """
+        Change the labels of many cells in a single transaction.
+
+        The changed cells are marked as modified, `dataChanged` is emitted
+        once for every block of contiguous rows of a column and
+        `labels_edited` is emitted once for the whole transaction.
+
+        Parameters
+        ----------
+        changes : iterable of (int, int, str)
+            The row, the column and the new label of each cell. Cells in the
+            filename column, missing cells and unchanged labels are skipped.
+
+        Returns
+        -------
+        int
+            The number of changed cells.
+        """
+        store = self._store
+        # The last change of a cell wins
+        texts = {(row, column): text for row, column, text in changes if column != 0}
+        changed = []
+        for (row, column), text in texts.items():
+            old_text = store.label(row, column)
+            if old_text is None or old_text == text:
+                continue
+            changed.append((row, column))
+
+        store.set_labels((row, column, texts[row, column]) for row, column in changed)
+        for row, column in changed:
+            store.set_dirty(row, column, True)
+
+        if changed:
+            self._emit_changed_ranges(changed)
+            self.labels_edited.emit(changed)
+        return len(changed)
+
+    def mark_saved(self, cells):
+        """
+        Clear the modified flag of cells that were written to their files.
+        Cells edited again since they were saved are left modified.
+
+        Parameters
+        ----------
+        cells : iterable of (int, int, str)
+            The row, the column and the saved label of each cell.
+
+        Returns
+        -------
+        list of (int, int)
+            The cells that are no longer modified.
+        """
+        store = self._store
+        saved = []
+        for row, column, text in cells:
+            if store.label(row, column) != text:
+                continue
+            store.set_dirty(row, column, False)
+            saved.append((row, column))
+
+        if saved:
+            self._emit_changed_ranges(saved)
+        return saved
+
+    def _emit_changed_ranges(self, cells):
+        """
+        Emit `dataChanged` for each block of contiguous rows of a column,
+        including the rows that have not been fetched yet, which a proxy
+        model may show.
+        """
+        rows_by_column = {}
+        for row, column in cells:
+            rows_by_column.setdefault(column, []).append(row)
+
+        for column, rows in rows_by_column.items():
+            rows.sort()
+            first = last = rows[0]
+            for row in rows[1:]:
+                if row > last + 1:
+                    self.dataChanged.emit(self.index(first, column), self.index(last, column))
+                    first = row
+                last = row
+            self.dataChanged.emit(self.index(first, column), self.index(last, column))
+
+    def find_all(self, pattern, columns):
+        """
+        Return every cell whose text matches a regex pattern, including the
+        rows that have not been fetched yet.
+
+        The matches of the last search are kept until the data changes, so
+        that Find Next does not search the whole table again. The returned
+        list must not be modified.
+
+        Parameters
+        ----------
+        pattern : str
+            The regular expression to search for.
+        columns : list of int
+            The columns to search in.
+
+        Returns
+        -------
+        list of (int, int)
+            The (row, column) of each matching cell, sorted by row and column.
+
+        Raises
+        ------
+        re.error
+            If the pattern is not a valid regular expression.
+        """
+        key = (pattern, tuple(columns))
+        matches = self._find_cache.get(key)
+        if matches is None:
+            matches = self._store.find_all(re.compile(pattern), list(columns))
+            self._find_cache = {key: matches}
+        return matches
+
+    def _clear_find_cache(self, *args):
+        self._find_cache = {}
+
     def replace(self, indexes, pattern, repl):
         p = re.compile(pattern)
+        changes = []
         for index in indexes:
             item_str = index.data()
             if not p.search(item_str):
                 continue
             new_str = p.sub(repl, item_str)
-            self.setData(index, new_str)
+            changes.append((index.row(), index.column(), new_str))
+        self.set_labels(changes)
 
-    def replace_all(self, pattern, repl, src_column, dst_column=-1):
+    def replace_all(self, pattern, repl, src_column, dst_column=-1, dry_run=False, sample_size=10):
         '''
         Searches for a regex pattern in one column and replaces the matching
         substrings in another column with a specified replacement string.
 
+        The matching rows are looked up in the text index of the source
+        column, including the rows that have not been fetched yet.
+
         Parameters
         ----------
         pattern : str
@@ -191,30 +410,572 @@ class TGTableModel(QAbstractTableModel):
             The zero-based index of the column where the new, potentially
             modified, string value will be written. If -1, the the value is
             equal to src_column
+        dry_run : bool, default False
+            If True, only count the cells that would change, without
+            modifying them.
+        sample_size : int, default 10
+            The maximum number of (before, after) pairs in the result.
+
+        Returns
+        -------
+        ReplaceSummary
+            The number of matching cells whose label changes and a sample of
+            their labels before and after the replacement.
         '''
         p = re.compile(pattern)
 
         if dst_column == -1:
             dst_column = src_column
 
-        for irow in range(self.rowCount()):
-            src_index = self.index(irow, src_column)
-            dst_index = self.index(irow, dst_column)
-
-            src_str = src_index.data()
-            if p.search(src_str):
-                new_str = p.sub(repl, src_str)
-                self.setData(dst_index, new_str)
-        p = re.compile(pattern)
+        store = self._store
+        dst_labels = store.columns[dst_column].labels
 
-        for irow in range(self.rowCount()):
-            src_index = self.index(irow, src_column)
-            dst_index = self.index(irow, dst_column)
+        changes = []
+        samples = []
+        for irow in store.search(src_column, p):
+            dst_str = dst_labels[irow]
+            if dst_str is None:
+                continue
+            new_str = p.sub(repl, store.display_text(irow, src_column))
+            if new_str == dst_str:
+                continue
+            changes.append((irow, dst_column, new_str))
+            if len(samples) < sample_size:
+                samples.append((dst_str, new_str))
 
-            src_str = src_index.data()
-            if p.search(src_str):
-                new_str = p.sub(repl, src_str)
-                self.setData(dst_index, new_str)
+        if not dry_run:
+            self.set_labels(changes)
+        return ReplaceSummary(len(changes), samples)
 
     def data_collection(self):
-        return self._data
+        return self._store
+
+class FindResultsModel(QAbstractListModel):
+    """
+    A list of the cells found by `TGTableModel.find_all`. The items are
+    formatted when they are shown, so searches with many matches are cheap
+    to display.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._table_model = None
+        self._matches = []
+
+    def set_matches(self, table_model, matches):
+        self.beginResetModel()
+        self._table_model = table_model
+        self._matches = matches
+        self.endResetModel()
+
+    def clear(self):
+        self.set_matches(None, [])
+
+    def rowCount(self, index=QModelIndex()):
+        return len(self._matches)
+
+    def cell_at(self, position):
+        """
+        Return the (row, column) of the table cell of a result.
+        """
+        return self._matches[position]
+
+    def data(self, index=QModelIndex(), role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row, column = self._matches[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            store = self._table_model.data_collection()
+            header = store.headers[column]
+            text = store.display_text(row, column)
+            return f'Row {row + 1}, {header}: {text}'
+        elif role == Qt.ItemDataRole.UserRole:
+            return (row, column)
+        return None
+
+class FilterJob:
+    """
+    The computation of the rows shown by a `TGFilterProxyModel`.
+
+    A job only reads the table store, so it can run in a worker thread.
+    Each filter is evaluated on the distinct texts of its column. The texts
+    that match are kept in `matched_texts`, so that a later job can reuse
+    them through `known_texts` (the filter did not change) or
+    `candidate_texts` (the filter narrows down a previous one).
+    """
+
+    def __init__(self, store, nrows, filters, patterns, mode, sort_keys=(),
+                 revision=0, known_texts=None, candidate_texts=None):
+        self.store = store
+        self.nrows = nrows
+        self.filters = filters
+        self.patterns = patterns
+        self.mode = mode
+        self.sort_keys = sort_keys
+        self.revision = revision
+        self.known_texts = known_texts or {}
+        self.candidate_texts = candidate_texts or {}
+        self.matched_texts = {}
+
+    def run(self, cancelled=lambda: False):
+        """
+        Return the visible source rows in display order, or None if the job
+        was cancelled.
+        """
+        rows = self._filter_rows(cancelled)
+        if rows is None or cancelled():
+            return None
+        return self.sort_rows(rows)
+
+    def _filter_rows(self, cancelled):
+        store = self.store
+        if not self.filters:
+            return array('l', range(self.nrows))
+
+        matched = []
+        for f, p in zip(self.filters, self.patterns):
+            if cancelled():
+                return None
+            texts = self.known_texts.get(f)
+            if texts is None:
+                texts = store.matching_texts(f.column, p, self.candidate_texts.get(f))
+            self.matched_texts[f] = texts
+            matched.append(store.rows_for(f.column, texts))
+
+        if len(matched) == 1:
+            rows = matched[0]
+        elif self.mode == 'and':
+            matched.sort(key=len)
+            rows = set(matched[0]).intersection(*matched[1:])
+            rows = sorted(rows)
+        else:
+            rows = set().union(*matched)
+            rows = sorted(rows)
+        return array('l', rows[:bisect_left(rows, self.nrows)])
+
+    def sort_rows(self, rows):
+        if not self.sort_keys:
+            return rows
+        return self.store.sort_rows(rows, self.sort_keys)
+
+class TGFilterProxyModel(QAbstractProxyModel):
+    """
+    A sorting and filtering proxy for `TGTableModel`.
+
+    Several column filters can be active at once. A row is shown when it
+    matches all of them (mode 'and') or any of them (mode 'or'). Filters
+    are evaluated with the text indexes of the table store instead of
+    calling `data()`, and the visible source rows are kept in an integer
+    array. Its inverse, used by `mapFromSource`, is built on demand.
+
+    The rows are computed over the whole table store, including the rows
+    the source model has not fetched yet, and are made visible to the views
+    in pages of the source model's `page_size`, as the user scrolls down.
+
+    Edited cells do not re-filter or re-sort the table; the rows stay in
+    place until the filters or the sort order change.
+
+    `request_filters` computes the rows in a worker thread. A new request
+    cancels the previous one. When a filter only adds literal characters to
+    a current one, only the labels of the rows it shows are tested again.
+    `filter_failed` reports the error of a request that could not be
+    computed.
+    """
+    filter_failed = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._filters = []
+        self._patterns = []
+        self._mode = 'and'
+        self._sort_keys = []
+        self._rows = array('l')
+        self._proxy_rows = None
+        self._fetched = 0
+
+        # The distinct texts matched by the current filters, valid until
+        # the labels change
+        self._matched_texts = {}
+
+        # Changes of the source data or the sort order make the result of a
+        # running job stale
+        self._revision = 0
+        self._pending_job = None
+        self._filter_worker = FilterWorker(self)
+        self._filter_worker.job_done.connect(self._on_job_done)
+        self._filter_worker.job_failed.connect(self._on_job_failed)
+
+    def setSourceModel(self, model):
+        old_model = self.sourceModel()
+        if old_model is not None:
+            old_model.modelAboutToBeReset.disconnect(self.beginResetModel)
+            old_model.modelReset.disconnect(self._on_source_reset)
+            old_model.rows_appended.disconnect(self._on_rows_appended)
+            old_model.dataChanged.disconnect(self._on_data_changed)
+            old_model.headerDataChanged.disconnect(self.headerDataChanged)
+
+        self.beginResetModel()
+        super().setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._on_source_reset)
+        model.rows_appended.connect(self._on_rows_appended)
+        model.dataChanged.connect(self._on_data_changed)
+        model.headerDataChanged.connect(self.headerDataChanged)
+        self._set_rows(self._compute_rows())
+        self._fetched = min(len(self._rows), model.page_size)
+        self.endResetModel()
+
+    # Structure
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._fetched
+
+    def total_row_count(self):
+        """
+        Return the number of visible rows, including the ones that have not
+        been fetched yet.
+        """
+        return len(self._rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._fetched < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        self.fetch_rows(self._fetched + self.sourceModel().page_size)
+
+    def fetch_rows(self, count):
+        """
+        Make the first `count` visible rows available to the views.
+        """
+        count = min(count, len(self._rows))
+        if count <= self._fetched:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, count - 1)
+        self._fetched = count
+        self.endInsertRows()
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().columnCount()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        proxy_row = self.proxy_row(source_index.row())
+        if proxy_row < 0 or proxy_row >= self._fetched:
+            return QModelIndex()
+        return self.createIndex(proxy_row, source_index.column())
+
+    def proxy_row(self, row):
+        """
+        Return the position of a source row among the visible rows, fetched
+        or not, or -1 if the row is hidden by the filters.
+        """
+        proxy_rows = self._source_to_proxy()
+        if not 0 <= row < len(proxy_rows):
+            return -1
+        return proxy_rows[row]
+
+    # Filtering
+
+    def filters(self):
+        """
+        Return the active filters and the mode used to combine them.
+        """
+        return list(self._filters), self._mode
+
+    def set_filters(self, filters, mode='and'):
+        """
+        Show only the rows that match the filters.
+
+        Parameters
+        ----------
+        filters : list of ColumnFilter or (int, str)
+            The column and the regex pattern of each filter. Filters with
+            an empty pattern are ignored.
+        mode : {'and', 'or'}, default 'and'
+            Whether a row must match all the filters or any of them.
+
+        Raises
+        ------
+        ValueError
+            If the mode is not supported.
+        re.error
+            If a pattern is not a valid regular expression.
+        """
+        job = self._make_job(filters, mode, narrow=False)
+        self._pending_job = None
+        self._apply_job(job, job.run())
+
+    def request_filters(self, filters, mode='and'):
+        """
+        Like `set_filters`, but compute the rows in a worker thread. The
+        view is updated when the rows are ready, unless another request
+        arrives first.
+        """
+        job = self._make_job(filters, mode)
+        self._pending_job = job
+        self._filter_worker.submit(job)
+
+    def is_filtering(self):
+        return self._pending_job is not None
+
+    def stop_filtering(self):
+        """
+        Cancel the pending request, if any, and stop the worker thread.
+        """
+        self._pending_job = None
+        self._filter_worker.stop()
+
+    def clear_filters(self):
+        self.set_filters([])
+
+    def _make_job(self, filters, mode, narrow=True):
+        if mode not in FILTER_MODES:
+            raise ValueError(f'Unknown filter mode: {mode!r}, expected one of {FILTER_MODES}')
+
+        filters = [ColumnFilter(*f) for f in filters if f[1]]
+        patterns = [re.compile(f.pattern) for f in filters]
+
+        job = FilterJob(
+            self.sourceModel().data_collection(),
+            self.sourceModel().total_row_count(),
+            filters,
+            patterns,
+            mode,
+            self._valid_sort_keys(),
+            self._revision,
+        )
+
+        if narrow:
+            self._reuse_matched_texts(job)
+        return job
+
+    def _reuse_matched_texts(self, job):
+        """
+        Let the job reuse the texts matched by the current filters that
+        are kept as is or extended with literal characters.
+        """
+        for f in job.filters:
+            texts = self._matched_texts.get(f)
+            if texts is not None:
+                job.known_texts[f] = texts
+                continue
+            for old, texts in self._matched_texts.items():
+                if old.column == f.column and is_literal_extension(old.pattern, f.pattern):
+                    job.candidate_texts[f] = texts
+                    break
+
+    def _apply_job(self, job, rows):
+        self._filters = job.filters
+        self._patterns = job.patterns
+        self._mode = job.mode
+        self._matched_texts = job.matched_texts
+
+        # Rows appended while the job was running
+        nrows = self.sourceModel().total_row_count()
+        if nrows > job.nrows:
+            filters = self._valid_filters()
+            rows.extend(
+                row for row in range(job.nrows, nrows)
+                if not filters or self._accepts_row(row, filters)
+            )
+            if job.sort_keys:
+                rows = job.sort_rows(rows)
+        self._relayout(rows)
+
+    def _on_job_done(self, job, rows):
+        if job is not self._pending_job:
+            return
+        self._pending_job = None
+        if job.revision != self._revision:
+            self.request_filters(job.filters, job.mode)
+            return
+        self._apply_job(job, rows)
+
+    def _on_job_failed(self, job, message):
+        if job is not self._pending_job:
+            return
+        self._pending_job = None
+        if job.revision != self._revision:
+            self.request_filters(job.filters, job.mode)
+            return
+        self.filter_failed.emit(message)
+
+    def _valid_filters(self):
+        ncols = self.columnCount()
+        return [
+            (f.column, p) for f, p in zip(self._filters, self._patterns)
+            if 0 <= f.column < ncols
+        ]
+
+    def _accepts_row(self, row, filters):
+        store = self.sourceModel().data_collection()
+        matches = (p.search(store.display_text(row, column)) for column, p in filters)
+        if self._mode == 'and':
+            return all(matches)
+        return any(matches)
+
+    # Sorting
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if column < 0:
+            self.set_sort_keys([])
+        else:
+            self.set_sort_keys([SortKey(column, 'text', order == Qt.SortOrder.DescendingOrder)])
+
+    def sort_keys(self):
+        return list(self._sort_keys)
+
+    def set_sort_keys(self, sort_keys):
+        """
+        Sort the rows by several levels, e.g. by label, then by file name,
+        then by start time. An empty list restores the order of the source
+        model.
+
+        Parameters
+        ----------
+        sort_keys : list of SortKey
+        """
+        self._sort_keys = [SortKey(*key) for key in sort_keys]
+        self._revision += 1
+        self._relayout()
+
+    def _valid_sort_keys(self):
+        ncols = self.columnCount()
+        return [key for key in self._sort_keys if 0 <= key.column < ncols]
+
+    # Row mapping
+
+    def _compute_rows(self):
+        return self._make_job(self._filters, self._mode, narrow=False).run()
+
+    def _set_rows(self, rows):
+        self._rows = rows
+        self._proxy_rows = None
+
+    def _source_to_proxy(self):
+        """
+        Return the proxy row of each source row, -1 for hidden rows.
+        """
+        if self._proxy_rows is None:
+            proxy_rows = array('l', [-1]) * self.sourceModel().total_row_count()
+            for proxy_row, row in enumerate(self._rows):
+                proxy_rows[row] = proxy_row
+            self._proxy_rows = proxy_rows
+        return self._proxy_rows
+
+    def _relayout(self, rows=None):
+        """
+        Recompute the visible rows, or show the given ones, keeping the
+        selection and the current index of the views on the rows that
+        remain visible. As many rows as before stay fetched, and more if a
+        kept index moves further down.
+        """
+        if rows is None:
+            rows = self._compute_rows()
+
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        sources = [(self._rows[i.row()], i.column()) for i in old_indexes]
+
+        self._set_rows(rows)
+
+        # A few persistent indexes are cheaper to look up than the inverse
+        if len(sources) > 16:
+            find_row = self._source_to_proxy().__getitem__
+        else:
+            find_row = self._find_proxy_row
+
+        fetched = max(self._fetched, self.sourceModel().page_size)
+        new_indexes = []
+        for row, column in sources:
+            proxy_row = find_row(row)
+            if proxy_row < 0:
+                new_indexes.append(QModelIndex())
+            else:
+                new_indexes.append(self.createIndex(proxy_row, column))
+                fetched = max(fetched, proxy_row + 1)
+        self._fetched = min(fetched, len(rows))
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _find_proxy_row(self, row):
+        try:
+            return self._rows.index(row)
+        except ValueError:
+            return -1
+
+    # Source model signals
+
+    def _on_source_reset(self):
+        self._revision += 1
+        self._matched_texts = {}
+        self._set_rows(self._compute_rows())
+        self._fetched = min(len(self._rows), self.sourceModel().page_size)
+        self.endResetModel()
+
+    def _on_rows_appended(self, first, last):
+        self._matched_texts = {}
+        if self._proxy_rows is not None:
+            self._proxy_rows.extend(array('l', [-1]) * (last + 1 - len(self._proxy_rows)))
+        if self._valid_sort_keys():
+            self._relayout()
+            return
+
+        filters = self._valid_filters()
+        new_rows = [
+            row for row in range(first, last + 1)
+            if not filters or self._accepts_row(row, filters)
+        ]
+        if not new_rows:
+            return
+
+        start = len(self._rows)
+        self._rows.extend(new_rows)
+        if self._proxy_rows is not None:
+            for proxy_row, row in enumerate(new_rows, start):
+                self._proxy_rows[row] = proxy_row
+
+        # Show the first page as soon as it is available, the rest is
+        # fetched on demand
+        self.fetch_rows(self.sourceModel().page_size)
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        self._revision += 1
+        self._matched_texts = {}
+        source_to_proxy = self._source_to_proxy()
+        proxy_rows = [
+            source_to_proxy[row]
+            for row in range(top_left.row(), bottom_right.row() + 1)
+            if 0 <= source_to_proxy[row] < self._fetched
+        ]
+        if not proxy_rows:
+            return
+        self.dataChanged.emit(
+            self.index(min(proxy_rows), top_left.column()),
+            self.index(max(proxy_rows), bottom_right.column()),
+            roles,
+        )
+
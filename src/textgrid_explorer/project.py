@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import sqlite3
+import sys
+from array import array
+from pathlib import Path
+
+from textgrid_explorer import cache
+from textgrid_explorer import utils
+from textgrid_explorer.store import ColumnData, TableStore
+
+PROJECT_SUFFIX = '.tgproj'
+
+# Bump this value whenever the layout of the database changes, so that
+# project files written by older versions are rejected.
+PROJECT_VERSION = 2
+
+# The columns are stored as raw arrays, which depend on the platform
+ARRAY_FORMAT = f'{sys.byteorder}-{array("l").itemsize}'
+
+_SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    encoding TEXT
+);
+CREATE TABLE segments (
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    col INTEGER NOT NULL,
+    labels BLOB NOT NULL,
+    xmin BLOB NOT NULL,
+    xmax BLOB NOT NULL,
+    tier_index BLOB NOT NULL,
+    item_index BLOB NOT NULL,
+    dirty BLOB NOT NULL,
+    PRIMARY KEY (file_id, col)
+);
+"""
+
+class ProjectError(ValueError):
+    """
+    Raised when a project file cannot be read.
+    """
+
+class Project:
+    """
+    The settings of an open project, the file where it is saved and the
+    fingerprint and encoding of each TextGrid file when its rows were read.
+
+    Parameters
+    ----------
+    settings : dict
+        The settings of the table, as returned by
+        `textgrid_explorer.dialogs.NewProjectDialog.data`.
+    path : pathlib.Path, optional
+        The project file, None until the project is saved.
+    fingerprints : dict of {pathlib.Path: (int, int)}, optional
+        The size and modification time of each TextGrid file.
+    encodings : dict of {pathlib.Path: str}, optional
+        The encoding of each TextGrid file that could be read.
+    """
+
+    def __init__(self, settings, path=None, fingerprints=None, encodings=None):
+        self.settings = {key: value for key, value in settings.items() if key != 'paths'}
+        self.path = None if path is None else Path(path)
+        self.fingerprints = {} if fingerprints is None else fingerprints
+        self.encodings = {} if encodings is None else encodings
+        # Set by `load_project`
+        self.reread_files = 0
+        self.lost_edits = 0
+
+    @property
+    def name(self):
+        return 'Untitled' if self.path is None else self.path.stem
+
+    def update_fingerprints(self, paths):
+        """
+        Take the current fingerprint of files whose rows are up to date,
+        e.g. after saving them.
+        """
+        for path in paths:
+            fingerprint = file_fingerprint(path)
+            if fingerprint is not None:
+                self.fingerprints[path] = fingerprint
+
+    def file_encoding(self, path):
+        """
+        Return the encoding a file was read in, or None if it is unknown or
+        the file has changed since then.
+        """
+        encoding = self.encodings.get(path)
+        if encoding is None or file_fingerprint(path) != self.fingerprints.get(path):
+            return None
+        return encoding
+
+def file_fingerprint(path):
+    """
+    Return the (size, mtime_ns) of a file or None if it does not exist, see
+    `textgrid_explorer.cache.file_fingerprint`.
+    """
+    try:
+        return cache.file_fingerprint(path)[1:]
+    except OSError:
+        return None
+
+def save_project(project, store):
+    """
+    Write a project and its table, unsaved edits included, to
+    `project.path`. The file is replaced only once it is complete.
+
+    Raises
+    ------
+    OSError, ProjectError
+        If the file could not be written.
+    """
+    try:
+        utils.replace_file(project.path, lambda tmp_path: _write_project(tmp_path, project, store))
+    except sqlite3.Error as e:
+        raise ProjectError(f'Could not write {project.path}: {e}') from None
+
+def _write_project(tmp_path, project, store):
+    con = sqlite3.connect(tmp_path)
+    try:
+        # The file is synced as a whole once it is complete
+        con.execute('PRAGMA journal_mode = OFF')
+        con.execute('PRAGMA synchronous = OFF')
+        con.executescript(_SCHEMA)
+        with con:
+            meta = {
+                'version': PROJECT_VERSION,
+                'array_format': ARRAY_FORMAT,
+                'settings': project.settings,
+                'headers': store.headers,
+            }
+            con.executemany(
+                'INSERT INTO meta VALUES (?, ?)',
+                [(key, json.dumps(value)) for key, value in meta.items()]
+            )
+
+            dirty_files = store.dirty_files()
+            segments = store.file_segments()
+            for file_id, (path, start, stop) in enumerate(segments):
+                size, mtime_ns = project.fingerprints.get(path) or (-1, -1)
+                con.execute(
+                    'INSERT INTO files VALUES (?, ?, ?, ?, ?)',
+                    (file_id, str(path), size, mtime_ns, project.encodings.get(path))
+                )
+
+                dirty_rows = {}
+                for row, column in dirty_files.get(path, []):
+                    dirty_rows.setdefault(column, array('l')).append(row - start)
+                con.executemany(
+                    'INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [
+                        (file_id, column, *_pack_column(data, dirty_rows.get(column, array('l'))))
+                        for column, data in enumerate(store.file_columns(start, stop), start=1)
+                    ]
+                )
+
+            # The files without rows are listed too, so that they are not
+            # taken for new files when the project is opened
+            paths = {path for path, _, _ in segments}
+            con.executemany(
+                'INSERT INTO files (path, size, mtime_ns, encoding) VALUES (?, ?, ?, ?)',
+                [
+                    (str(path), *fingerprint, project.encodings.get(path))
+                    for path, fingerprint in project.fingerprints.items()
+                    if path not in paths
+                ]
+            )
+    finally:
+        con.close()
+
+def _pack_column(data, dirty_rows):
+    return (
+        json.dumps(data.labels, ensure_ascii=False).encode('utf-8'),
+        data.xmin.tobytes(),
+        data.xmax.tobytes(),
+        data.tier_index.tobytes(),
+        data.item_index.tobytes(),
+        dirty_rows.tobytes(),
+    )
+
+def _unpack_column(labels, xmin, xmax, tier_index, item_index, dirty):
+    data = ColumnData(
+        json.loads(labels.decode('utf-8')),
+        _array('d', xmin),
+        _array('d', xmax),
+        _array('h', tier_index),
+        _array('l', item_index),
+    )
+    return data, _array('l', dirty)
+
+def _array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    return values
+
+def load_project(path, progress=None, cancelled=lambda: False):
+    """
+    Read a project file and rebuild its table.
+
+    The TextGrid directory is listed again. The rows of the files whose
+    size and modification time have not changed are read from the project
+    file, the rest of the files are aligned again, and the files that no
+    longer exist are dropped. The unsaved edits of the changed files are
+    applied again to the items that are still at the same place.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The project file.
+    progress : callable, optional
+        Called as `progress(done, total)` as the files are read.
+    cancelled : callable, optional
+        Polled between files; when it returns True, the loading stops.
+
+    Returns
+    -------
+    tuple of (Project, textgrid_explorer.store.TableStore) or None
+        None if the loading was cancelled.
+
+    Raises
+    ------
+    ProjectError
+        If the file is not a project file of this version or its TextGrid
+        directory does not exist.
+    """
+    path = Path(path)
+    try:
+        con = sqlite3.connect(f'{path.resolve().as_uri()}?mode=ro', uri=True)
+    except sqlite3.Error as e:
+        raise ProjectError(f'Could not open {path}: {e}') from None
+
+    try:
+        return _load_project(con, path, progress, cancelled)
+    except sqlite3.Error as e:
+        raise ProjectError(f'{path} is not a valid project file: {e}') from None
+    finally:
+        con.close()
+
+def _load_project(con, path, progress, cancelled):
+    meta = {key: json.loads(value) for key, value in con.execute('SELECT key, value FROM meta')}
+    if meta.get('version') != PROJECT_VERSION:
+        raise ProjectError(f'{path} was written by another version of the application')
+    if meta.get('array_format') != ARRAY_FORMAT:
+        raise ProjectError(f'{path} was written on another platform')
+
+    settings = meta['settings']
+    src_dir = Path(settings['src_dir'])
+    if not src_dir.is_dir():
+        raise ProjectError(f'The TextGrid directory {src_dir} does not exist')
+
+    snapshot = {
+        Path(file_path): (file_id, (size, mtime_ns), encoding)
+        for file_id, file_path, size, mtime_ns, encoding in con.execute(
+            'SELECT id, path, size, mtime_ns, encoding FROM files'
+        )
+    }
+    paths = utils.find_textgrid_paths(
+        src_dir,
+        include=settings.get('include'),
+        exclude=settings.get('exclude'),
+        follow_symlinks=settings.get('follow_symlinks', False),
+    )
+    fingerprints = {}
+    for file_path in paths:
+        fingerprint = file_fingerprint(file_path)
+        if fingerprint is not None:
+            fingerprints[file_path] = fingerprint
+
+    # Only the new and changed files are read again
+    stale = [
+        file_path for file_path in paths
+        if file_path not in snapshot or snapshot[file_path][1] != fingerprints.get(file_path)
+    ]
+    # The encodings of the stale files are taken as they are read
+    encodings = {
+        file_path: encoding
+        for file_path, (_, fingerprint, encoding) in snapshot.items()
+        if encoding is not None and fingerprint == fingerprints.get(file_path)
+    }
+    aligned_rows = utils.iter_aligned_rows(
+        stale,
+        settings['primary_tier'],
+        settings['secondary_tiers'],
+        workers=None,
+        alignment=settings['alignment'],
+        tolerance=settings['tolerance'],
+        encodings=encodings,
+    )
+
+    project = Project(settings, path, fingerprints, encodings)
+    project.reread_files = len(stale)
+    store = TableStore(meta['headers'])
+    stale = set(stale)
+    total = len(paths)
+    try:
+        for done, file_path in enumerate(paths, start=1):
+            if cancelled():
+                return None
+            first_row = len(store)
+            if file_path in stale:
+                store.append_rows(next(aligned_rows))
+                if file_path in snapshot:
+                    columns = _read_segment(con, snapshot[file_path][0])
+                    project.lost_edits += _apply_edits(store, first_row, columns)
+            else:
+                # Files without rows have no columns
+                columns = _read_segment(con, snapshot[file_path][0])
+                if columns:
+                    store.append_file_columns(file_path, [data for data, _ in columns])
+                for column, (_, dirty_rows) in enumerate(columns, start=1):
+                    for row in dirty_rows:
+                        store.set_dirty(first_row + row, column, True)
+            if progress is not None:
+                progress(done, total)
+    finally:
+        aligned_rows.close()
+    return project, store
+
+def _read_segment(con, file_id):
+    return [
+        _unpack_column(*values)
+        for values in con.execute(
+            'SELECT labels, xmin, xmax, tier_index, item_index, dirty '
+            'FROM segments WHERE file_id = ? ORDER BY col',
+            (file_id,)
+        )
+    ]
+
+def _apply_edits(store, first_row, columns):
+    """
+    Apply the edits saved for a file to its rows, re-read from the file
+    from `first_row` on. An edit is applied if its item is still at the
+    same position and time.
+
+    Returns
+    -------
+    int
+        The number of edits that could not be applied.
+    """
+    lost = 0
+    for column, (data, dirty_rows) in enumerate(columns, start=1):
+        if not dirty_rows:
+            continue
+        current = store.columns[column].slice(first_row, len(store))
+        rows = {
+            (tier_index, item_index): row
+            for row, (tier_index, item_index) in enumerate(zip(current.tier_index, current.item_index))
+        }
+        for row in dirty_rows:
+            new_row = rows.get((data.tier_index[row], data.item_index[row]))
+            if new_row is None or current.xmin[new_row] != data.xmin[row]:
+                lost += 1
+                continue
+            store.set_label(first_row + new_row, column, data.labels[row])
+            store.set_dirty(first_row + new_row, column, True)
+    return lost
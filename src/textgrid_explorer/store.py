@@ -0,0 +1,727 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import operator
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+from itertools import groupby, repeat
+
+from textgrid_explorer.trigrams import TrigramIndex
+
+Cell = namedtuple(
+    'Cell',
+    ['file_path', 'tier_index', 'item_index', 'xmin', 'xmax', 'text', 'modified']
+)
+Cell.__doc__ = """
+A snapshot of a table cell. `tier_index` and `item_index` locate the
+interval or point in its TextGrid file.
+"""
+
+SortKey = namedtuple('SortKey', ['column', 'field', 'descending'], defaults=['text', False])
+SortKey.__doc__ = """
+A sort level of the table: the label ('text') or a time ('xmin', 'xmax')
+of a column, in ascending or descending order.
+"""
+
+SORT_FIELDS = ('text', 'xmin', 'xmax')
+
+ColumnData = namedtuple(
+    'ColumnData',
+    ['labels', 'xmin', 'xmax', 'tier_index', 'item_index']
+)
+ColumnData.__doc__ = """
+A run of cells of a tier column as parallel sequences, in the layout of
+`Column`.
+"""
+
+_DIGITS_PATTERN = re.compile(r'(\d+)')
+
+def natural_key(text):
+    """
+    Return a key that sorts the numbers in a string by their value, e.g.
+    'file2' before 'file10'.
+    """
+    parts = _DIGITS_PATTERN.split(text.casefold())
+    parts[1::2] = map(int, parts[1::2])
+    return parts
+
+def _rank(values):
+    """
+    Return the dense rank of each value and the number of distinct values.
+    """
+    ranks = {value: rank for rank, value in enumerate(sorted(set(values)))}
+    return array('l', map(ranks.__getitem__, values)), len(ranks)
+
+class Column:
+    """
+    The cells of a tier column stored in parallel arrays.
+
+    A missing cell has a `None` label and -1 as tier and item indexes.
+    """
+
+    def __init__(self):
+        self.labels = []
+        self.xmin = array('d')
+        self.xmax = array('d')
+        self.tier_index = array('h')
+        self.item_index = array('l')
+        self.dirty = bytearray()
+
+    def append(self, item):
+        if item is None:
+            self.labels.append(None)
+            self.xmin.append(0.0)
+            self.xmax.append(0.0)
+            self.tier_index.append(-1)
+            self.item_index.append(-1)
+        else:
+            self.labels.append(sys.intern(item.text))
+            self.xmin.append(float(item.xmin))
+            self.xmax.append(float(item.xmax))
+            self.tier_index.append(item.parent.index)
+            self.item_index.append(item.index)
+
+        nbytes = (len(self.labels) + 7) >> 3
+        if len(self.dirty) < nbytes:
+            self.dirty.append(0)
+
+    def extend(self, data):
+        """
+        Append the cells of a `ColumnData`.
+        """
+        self.labels.extend(None if text is None else sys.intern(text) for text in data.labels)
+        self.xmin.extend(data.xmin)
+        self.xmax.extend(data.xmax)
+        self.tier_index.extend(data.tier_index)
+        self.item_index.extend(data.item_index)
+
+        nbytes = (len(self.labels) + 7) >> 3
+        self.dirty.extend(bytes(nbytes - len(self.dirty)))
+
+    def slice(self, start, stop):
+        """
+        Return the cells of a range of rows as a `ColumnData`.
+        """
+        return ColumnData(
+            self.labels[start:stop],
+            self.xmin[start:stop],
+            self.xmax[start:stop],
+            self.tier_index[start:stop],
+            self.item_index[start:stop],
+        )
+
+    def is_dirty(self, row):
+        return self.dirty[row >> 3] >> (row & 7) & 1
+
+    def set_dirty(self, row, value):
+        if value:
+            self.dirty[row >> 3] |= 1 << (row & 7)
+        else:
+            self.dirty[row >> 3] &= ~(1 << (row & 7)) & 0xFF
+
+class ColumnTextIndex:
+    """
+    The rows of a column grouped by their display string.
+
+    Labels are very repetitive, so a search tests each distinct string once
+    instead of every row. The rows of each string are kept sorted.
+
+    Once a column has `trigram_threshold` distinct strings, a `TrigramIndex`
+    narrows down the strings tested by patterns with literal parts. Set the
+    threshold to None to disable it.
+    """
+    trigram_threshold = 1000
+
+    def __init__(self, texts=()):
+        self.postings = {}
+        self.trigrams = None
+        for row, text in enumerate(texts):
+            self.add(row, text)
+
+    def _new_text(self, text):
+        rows = self.postings[text] = array('l')
+        if self.trigrams is not None:
+            self.trigrams.add(text)
+        return rows
+
+    def add(self, row, text):
+        """
+        Add a row after the last indexed one.
+        """
+        rows = self.postings.get(text)
+        if rows is None:
+            rows = self._new_text(text)
+        rows.append(row)
+
+    def move(self, row, old_text, new_text):
+        """
+        Update the index after the text of a row has changed.
+        """
+        if old_text == new_text:
+            return
+        rows = self.postings[old_text]
+        del rows[bisect_left(rows, row)]
+        if not rows:
+            del self.postings[old_text]
+            if self.trigrams is not None:
+                self.trigrams.discard(old_text)
+
+        rows = self.postings.get(new_text)
+        if rows is None:
+            rows = self._new_text(new_text)
+        insort(rows, row)
+
+    def move_many(self, changes):
+        """
+        Update the index after the texts of many rows have changed.
+
+        The rows of each affected string are rebuilt once, so the cost is
+        linear in the size of the strings touched however many rows move.
+
+        Parameters
+        ----------
+        changes : iterable of (int, str, str)
+            The row, the old text and the new text of each changed row. A
+            row changed several times keeps its first old text and its
+            last new text.
+        """
+        moves = {}
+        for row, old_text, new_text in changes:
+            move = moves.get(row)
+            moves[row] = (old_text if move is None else move[0], new_text)
+
+        removed = defaultdict(set)
+        added = defaultdict(list)
+        for row, (old_text, new_text) in moves.items():
+            if old_text != new_text:
+                removed[old_text].add(row)
+                added[new_text].append(row)
+
+        postings = self.postings
+        for text in removed.keys() | added.keys():
+            rows = postings.get(text)
+            is_new = rows is None
+            gone = removed.get(text)
+            if gone:
+                rows = [row for row in rows if row not in gone]
+            new_rows = added.get(text)
+            if new_rows:
+                # Both runs are sorted, which the sort merges in linear time
+                rows = sorted(new_rows) if is_new else sorted([*rows, *sorted(new_rows)])
+
+            if rows:
+                if is_new:
+                    self._new_text(text).extend(rows)
+                else:
+                    postings[text] = array('l', rows)
+            elif not is_new:
+                del postings[text]
+                if self.trigrams is not None:
+                    self.trigrams.discard(text)
+
+    def candidate_texts(self, pattern):
+        """
+        Return the distinct strings that can match a compiled regex.
+        """
+        threshold = self.trigram_threshold
+        if threshold is None or len(self.postings) < threshold:
+            return self.postings.keys()
+
+        if self.trigrams is None:
+            self.trigrams = TrigramIndex(self.postings)
+        candidates = self.trigrams.candidates(pattern)
+        if candidates is None:
+            return self.postings.keys()
+        return candidates
+
+    def matching_texts(self, pattern, texts=None):
+        """
+        Return the set of distinct strings that match a compiled regex.
+
+        Parameters
+        ----------
+        pattern : re.Pattern
+            A compiled regular expression.
+        texts : iterable of str, optional
+            Only test these strings, e.g. the ones that matched a pattern
+            this pattern is known to narrow down.
+        """
+        candidates = self.candidate_texts(pattern)
+        if texts is not None:
+            # Both are supersets of the result
+            if isinstance(candidates, set):
+                candidates = candidates.intersection(texts)
+            else:
+                candidates = texts
+        return {text for text in candidates if pattern.search(text)}
+
+    def rows_for(self, texts):
+        """
+        Return the sorted rows whose text is one of `texts`.
+        """
+        postings = self.postings
+        matched = [postings[text] for text in texts if text in postings]
+        if len(matched) == 1:
+            return list(matched[0])
+        result = []
+        for rows in matched:
+            result.extend(rows)
+        result.sort()
+        return result
+
+    def search(self, pattern):
+        """
+        Return the sorted rows whose text matches a compiled regex.
+        """
+        postings = self.postings
+        matched = [postings[text] for text in self.candidate_texts(pattern) if pattern.search(text)]
+        if len(matched) == 1:
+            return list(matched[0])
+        result = []
+        for rows in matched:
+            result.extend(rows)
+        result.sort()
+        return result
+
+class DirtyRegistry:
+    """
+    The modified cells of a table grouped by file.
+
+    Each cell is kept as a single `row * ncols + column` integer in the set
+    of its file, so the memory used grows with the number of modified cells
+    only, and a file is dropped as soon as it has no modified cells left.
+    """
+
+    def __init__(self, ncols):
+        self.ncols = max(ncols, 1)
+        self._files = {}
+        self._count = 0
+
+    def __len__(self):
+        """
+        Return the number of modified cells.
+        """
+        return self._count
+
+    def add(self, file_id, row, column):
+        cells = self._files.get(file_id)
+        if cells is None:
+            cells = self._files[file_id] = set()
+        key = row * self.ncols + column
+        if key not in cells:
+            cells.add(key)
+            self._count += 1
+
+    def discard(self, file_id, row, column):
+        cells = self._files.get(file_id)
+        if cells is None:
+            return
+        key = row * self.ncols + column
+        if key in cells:
+            cells.remove(key)
+            self._count -= 1
+            if not cells:
+                del self._files[file_id]
+
+    def clear(self):
+        self._files.clear()
+        self._count = 0
+
+    def is_file_dirty(self, file_id):
+        return file_id in self._files
+
+    def file_count(self):
+        """
+        Return the number of files with modified cells.
+        """
+        return len(self._files)
+
+    def file_ids(self):
+        """
+        Return the ids of the files with modified cells.
+        """
+        return list(self._files)
+
+    def cells(self, file_id):
+        """
+        Return the (row, column) modified cells of a file in table order.
+        """
+        return [divmod(key, self.ncols) for key in sorted(self._files.get(file_id, ()))]
+
+class TableStore:
+    """
+    A columnar representation of the aligned table.
+
+    The first column holds the TextGrid file of each row as an id into a
+    shared file table, the rest of the columns are tier columns. Only
+    labels, times and the position of each item in its file are kept; the
+    TextGrid objects are released once the rows are added.
+
+    The text indexes may be used from a worker thread, `lock` guards them
+    against the changes made by the GUI thread.
+
+    The modified cells are flagged in their columns and tracked by file in
+    `dirty`, a `DirtyRegistry`.
+    """
+
+    def __init__(self, headers=None):
+        self.headers = list(headers) if headers is not None else []
+        self.files = []
+        self._file_ids = {}
+        self.file_ids = array('l')
+        self.columns = [None] + [Column() for _ in self.headers[1:]]
+        self._text_indexes = {}
+        self._sort_ranks = {}
+        self.dirty = DirtyRegistry(len(self.headers))
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.file_ids)
+
+    @classmethod
+    def from_rows(cls, headers, rows):
+        store = cls(headers)
+        store.append_rows(rows)
+        return store
+
+    def append_rows(self, rows):
+        """
+        Add rows in the format returned by
+        `textgrid_explorer.utils.create_aligned_tier_table`.
+        """
+        first_row = len(self)
+        columns = self.columns[1:]
+        for row in rows:
+            self.file_ids.append(self._file_id(row[0]))
+            for column, item in zip(columns, row[1:]):
+                column.append(item)
+        self._rows_added(first_row)
+
+    def append_file_columns(self, path, columns):
+        """
+        Add the rows of a file given column by column, as a `ColumnData`
+        for each tier column.
+        """
+        first_row = len(self)
+        nrows = len(columns[0].labels) if columns else 0
+        self.file_ids.extend(repeat(self._file_id(path), nrows))
+        for column, data in zip(self.columns[1:], columns):
+            column.extend(data)
+        self._rows_added(first_row)
+
+    def file_columns(self, start, stop):
+        """
+        Return the tier columns of a range of rows as a list of `ColumnData`.
+        """
+        return [column.slice(start, stop) for column in self.columns[1:]]
+
+    def file_segments(self):
+        """
+        Return a list of (pathlib.Path, int, int) with the file and the
+        first and last-plus-one rows of each run of rows of the same file.
+        Rows are added file by file, so each file has a single run.
+        """
+        segments = []
+        start = 0
+        for file_id, group in groupby(self.file_ids):
+            stop = start + sum(1 for _ in group)
+            segments.append((self.files[file_id], start, stop))
+            start = stop
+        return segments
+
+    def _file_id(self, path):
+        file_id = self._file_ids.get(path)
+        if file_id is None:
+            file_id = len(self.files)
+            self._file_ids[path] = file_id
+            self.files.append(path)
+        return file_id
+
+    def _rows_added(self, first_row):
+        with self.lock:
+            self._sort_ranks.clear()
+            for column, text_index in self._text_indexes.items():
+                for row in range(first_row, len(self)):
+                    text_index.add(row, self.display_text(row, column))
+
+    def file_path(self, row):
+        return self.files[self.file_ids[row]]
+
+    def label(self, row, column):
+        """
+        Return the label of a tier cell or None if the cell is missing.
+        """
+        return self.columns[column].labels[row]
+
+    def display_text(self, row, column):
+        """
+        Return the text shown in a cell: the file name in the first column,
+        the label or an empty string in the rest.
+        """
+        if column == 0:
+            return self.file_path(row).name
+        text = self.columns[column].labels[row]
+        if text is None:
+            return ''
+        return text
+
+    def column_texts(self, column):
+        """
+        Return the display text of every row of a column.
+        """
+        if column == 0:
+            names = [path.name for path in self.files]
+            return [names[file_id] for file_id in self.file_ids]
+        return ['' if text is None else text for text in self.columns[column].labels]
+
+    def text_index(self, column):
+        """
+        Return the `ColumnTextIndex` of a column. It is built on first use
+        and kept up to date as labels change and rows are added.
+        """
+        with self.lock:
+            text_index = self._text_indexes.get(column)
+            if text_index is None:
+                text_index = ColumnTextIndex(self.column_texts(column))
+                self._text_indexes[column] = text_index
+            return text_index
+
+    def search(self, column, pattern):
+        """
+        Return the sorted rows of a column whose display text matches a
+        compiled regex.
+        """
+        with self.lock:
+            return self.text_index(column).search(pattern)
+
+    def matching_texts(self, column, pattern, texts=None):
+        """
+        Return the distinct display texts of a column that match a compiled
+        regex. See `ColumnTextIndex.matching_texts`.
+        """
+        with self.lock:
+            return self.text_index(column).matching_texts(pattern, texts)
+
+    def rows_for(self, column, texts):
+        """
+        Return the sorted rows of a column whose display text is one of
+        `texts`.
+        """
+        with self.lock:
+            return self.text_index(column).rows_for(texts)
+
+    def find_all(self, pattern, columns):
+        """
+        Return the cells whose display text matches a compiled regex.
+
+        Returns
+        -------
+        list of (int, int)
+            The (row, column) of each matching cell, sorted by row and column.
+        """
+        if len(columns) == 1:
+            column = columns[0]
+            return [(row, column) for row in self.search(column, pattern)]
+
+        matches = []
+        for column in columns:
+            matches.extend((row, column) for row in self.search(column, pattern))
+        matches.sort()
+        return matches
+
+    def sort_ranks(self, column, field='text'):
+        """
+        Return the rank of every row for a field of a column and the number
+        of distinct ranks.
+
+        The file names are ranked in natural order, the labels in string
+        order (missing labels first) and the times by value. The ranks are
+        cached until the column changes.
+
+        Raises
+        ------
+        ValueError
+            If the field is not supported by the column.
+        """
+        if field not in SORT_FIELDS or (column == 0 and field != 'text'):
+            raise ValueError(f'Cannot sort column {column} by {field!r}')
+
+        with self.lock:
+            ranks = self._sort_ranks.get((column, field))
+            if ranks is None:
+                if column == 0:
+                    ranks = self._file_ranks()
+                elif field == 'text':
+                    ranks = _rank(self.column_texts(column))
+                else:
+                    ranks = _rank(getattr(self.columns[column], field))
+                self._sort_ranks[(column, field)] = ranks
+            return ranks
+
+    def _file_ranks(self):
+        files = self.files
+        order = sorted(
+            range(len(files)),
+            key=lambda i: (natural_key(files[i].name), str(files[i]))
+        )
+        file_ranks = array('l', [0]) * len(files)
+        for rank, file_id in enumerate(order):
+            file_ranks[file_id] = rank
+        return array('l', map(file_ranks.__getitem__, self.file_ids)), len(files)
+
+    def sort_rows(self, rows, sort_keys):
+        """
+        Return the rows sorted by several `SortKey` levels. The sort is
+        stable, rows that compare equal keep their order.
+        """
+        # Pack the ranks of all the levels and the position of the row in
+        # `rows` into one integer, so that a single sort of plain integers
+        # is needed
+        rows = array('l', rows)
+        nrows = len(rows)
+        packed = None
+        for key in sort_keys:
+            ranks, size = self.sort_ranks(key.column, key.field)
+            values = map(ranks.__getitem__, rows)
+            if key.descending:
+                values = map(operator.sub, repeat(size - 1), values)
+            if packed is None:
+                packed = values
+            else:
+                packed = map(operator.add, map(operator.mul, packed, repeat(size)), values)
+        if packed is None:
+            return rows
+
+        packed = list(map(operator.add, map(operator.mul, packed, repeat(nrows)), range(nrows)))
+        packed.sort()
+        return array('l', map(rows.__getitem__, map(operator.mod, packed, repeat(nrows))))
+
+    def _text_changed(self, row, column, old_text, new_text):
+        with self.lock:
+            self._sort_ranks.pop((column, 'text'), None)
+            text_index = self._text_indexes.get(column)
+            if text_index is not None:
+                text_index.move(
+                    row,
+                    '' if old_text is None else old_text,
+                    '' if new_text is None else new_text,
+                )
+
+    def set_label(self, row, column, text):
+        labels = self.columns[column].labels
+        self._text_changed(row, column, labels[row], text)
+        labels[row] = text
+
+    def set_labels(self, changes):
+        """
+        Change the labels of many cells. The text index and the sort ranks
+        of each column are updated once for the whole batch.
+
+        Parameters
+        ----------
+        changes : iterable of (int, int, str)
+            The row, the column and the new label of each cell.
+        """
+        by_column = defaultdict(list)
+        for row, column, text in changes:
+            by_column[column].append((row, text))
+
+        with self.lock:
+            for column, cells in by_column.items():
+                labels = self.columns[column].labels
+                self._sort_ranks.pop((column, 'text'), None)
+                text_index = self._text_indexes.get(column)
+                if text_index is not None:
+                    text_index.move_many(
+                        (row, '' if labels[row] is None else labels[row], '' if text is None else text)
+                        for row, text in cells
+                    )
+                for row, text in cells:
+                    labels[row] = text
+
+    def is_missing(self, row, column):
+        if column == 0:
+            return False
+        return self.columns[column].labels[row] is None
+
+    def is_dirty(self, row, column):
+        if column == 0:
+            return False
+        return bool(self.columns[column].is_dirty(row))
+
+    def set_dirty(self, row, column, value):
+        self.columns[column].set_dirty(row, value)
+        if value:
+            self.dirty.add(self.file_ids[row], row, column)
+        else:
+            self.dirty.discard(self.file_ids[row], row, column)
+
+    def is_file_dirty(self, path):
+        """
+        Return True if a file has modified cells.
+        """
+        file_id = self._file_ids.get(path)
+        return file_id is not None and self.dirty.is_file_dirty(file_id)
+
+    def dirty_files(self):
+        """
+        Return a dict of {pathlib.Path: list of (int, int)} with the modified
+        (row, column) cells of each file.
+        """
+        dirty = self.dirty
+        return {self.files[file_id]: dirty.cells(file_id) for file_id in dirty.file_ids()}
+
+    def cell(self, row, column):
+        """
+        Return a `Cell` snapshot of a tier cell or None if the cell is missing.
+        """
+        col = self.columns[column]
+        text = col.labels[row]
+        if text is None:
+            return None
+        return Cell(
+            self.file_path(row),
+            col.tier_index[row],
+            col.item_index[row],
+            col.xmin[row],
+            col.xmax[row],
+            text,
+            bool(col.is_dirty(row)),
+        )
+
+    def set_cell(self, row, column, cell):
+        col = self.columns[column]
+        with self.lock:
+            self._sort_ranks.pop((column, 'xmin'), None)
+            self._sort_ranks.pop((column, 'xmax'), None)
+        self._text_changed(
+            row, column, col.labels[row], None if cell is None else cell.text
+        )
+        if cell is None:
+            col.labels[row] = None
+            col.tier_index[row] = -1
+            col.item_index[row] = -1
+            self.set_dirty(row, column, False)
+            return
+        col.labels[row] = cell.text
+        col.xmin[row] = cell.xmin
+        col.xmax[row] = cell.xmax
+        col.tier_index[row] = cell.tier_index
+        col.item_index[row] = cell.item_index
+        self.set_dirty(row, column, cell.modified)
@@ -0,0 +1,609 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import codecs
+import re
+from itertools import islice, repeat
+from operator import itemgetter
+
+# Buffers are tokenized and copied in chunks of about this number of bytes
+# and items are built in blocks of this number of items, which bounds the
+# memory used on top of the buffer and the parsed TextGrid.
+CHUNK_SIZE = 1024 * 1024
+BLOCK_SIZE = 10000
+
+_HEADER_PATTERN = re.compile(rb'Object class = "TextGrid"[^\n]*\n')
+
+# The values of a TextGrid are its quoted strings and its numbers, in the
+# same order in long and short format. The rest (the names of the fields,
+# the "[n]" positions and the "<exists>" flag) are skipped, which is what
+# Praat does when it reads a text file. As in Praat, a string runs up to the
+# next quote that is not doubled, and may span several lines. Files written
+# with unescaped quotes (e.g. by mytextgrid) do not tokenize into a valid
+# TextGrid and are left to mytextgrid.
+_STRING = rb'"([^"]*(?:""[^"]*)*)"'
+_TOKEN_PATTERN = re.compile(_STRING + rb'|([-+0-9.](?<![^\s=].)[0-9.eE+-]*)')
+_STRING_PATTERN = re.compile(_STRING)
+_LONG_FORMAT_PATTERN = re.compile(rb'\s*xmin\b')
+
+# Each interval or point has a single string, its label, and the rest of its
+# values have no quotes. The items of a tier are skipped by matching as many
+# strings, in runs of SKIP_BLOCK_SIZE strings. A string only ends at a quote
+# that is not doubled, so that a run that does not match fails without
+# trying other ways to split it into strings.
+SKIP_BLOCK_SIZE = 1024
+_SKIP_STRING = rb'[^"]*"[^"]*(?:""[^"]*)*"(?!")'
+_SKIP_STRING_PATTERN = re.compile(_SKIP_STRING)
+_SKIP_BLOCK_PATTERN = re.compile(rb'(?:%s){%d}' % (_SKIP_STRING, SKIP_BLOCK_SIZE))
+
+# The encodings that are not ASCII-compatible. Files in these encodings are
+# transcoded to UTF-8 before they are tokenized.
+UTF16_ENCODINGS = ('utf-16-le', 'utf-16-be')
+
+# Each token is a (string, number) tuple with one of the two values empty
+_string_value = itemgetter(0)
+_number_value = itemgetter(1)
+
+class TextGridSyntaxError(ValueError):
+    pass
+
+class TextGrid(list):
+    """
+    The tiers of a parsed TextGrid file and the encoding of the file.
+    """
+
+    def __init__(self, xmin, xmax, tiers=(), encoding='utf-8'):
+        super().__init__(tiers)
+        self.xmin = xmin
+        self.xmax = xmax
+        self.encoding = encoding
+        self.file_path = None
+
+class Tier(list):
+    """
+    The items of a tier of a parsed TextGrid file.
+
+    `tier_class` is 'IntervalTier' or 'TextTier' and `index` the position of
+    the tier in its file.
+    """
+
+    def __init__(self, name, tier_class, xmin, xmax, index):
+        super().__init__()
+        self.name = name
+        self.tier_class = tier_class
+        self.xmin = xmin
+        self.xmax = xmax
+        self.index = index
+
+    def is_interval(self):
+        return self.tier_class == 'IntervalTier'
+
+class Item:
+    """
+    An interval or a point of a parsed tier. The xmin and xmax of a point
+    are both its time.
+    """
+    __slots__ = ('xmin', 'xmax', 'text', 'index', 'parent')
+
+    def __init__(self, xmin, xmax, text, index, parent):
+        self.xmin = xmin
+        self.xmax = xmax
+        self.text = text
+        self.index = index
+        self.parent = parent
+
+    def __repr__(self):
+        return f'Item({self.xmin}, {self.xmax}, {self.text!r})'
+
+class _TokenReader:
+    """
+    Read the tokens of a TextGrid from an iterator of token lists.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.tokens = []
+        self.position = 0
+
+    def _fill(self):
+        """
+        Load the next non-empty chunk. Return False at the end of the file.
+        """
+        for tokens in self.chunks:
+            if tokens:
+                self.tokens = tokens
+                self.position = 0
+                return True
+        return False
+
+    def _next(self):
+        if self.position >= len(self.tokens) and not self._fill():
+            raise TextGridSyntaxError('Unexpected end of file')
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _take(self, count):
+        taken = self.tokens[self.position:self.position + count]
+        self.position += len(taken)
+        while len(taken) < count:
+            if not self._fill():
+                raise TextGridSyntaxError('Unexpected end of file')
+            more = self.tokens[:count - len(taken)]
+            self.position = len(more)
+            taken += more
+        return taken
+
+    def at_end(self):
+        return self.position >= len(self.tokens) and not self._fill()
+
+    def number(self):
+        number = self._next()[1]
+        if not number:
+            raise TextGridSyntaxError('Expected a number')
+        return float(number)
+
+    def string(self):
+        string, number = self._next()
+        if number:
+            raise TextGridSyntaxError('Expected a string')
+        return string
+
+    def items(self, tier_class, nitems):
+        """
+        Read the items of a tier in blocks of up to `BLOCK_SIZE` items.
+
+        Yields
+        ------
+        list of list
+            The tokens of each field of the items of a block: (xmin, xmax,
+            text) for intervals, (time, mark) for points.
+        """
+        if tier_class == b'IntervalTier':
+            nfields = 3
+        elif tier_class == b'TextTier':
+            nfields = 2
+        else:
+            raise TextGridSyntaxError(f'Unknown tier class {tier_class!r}')
+
+        for first in range(0, nitems, BLOCK_SIZE):
+            tokens = self._take(nfields * min(BLOCK_SIZE, nitems - first))
+            fields = [tokens[i::nfields] for i in range(nfields)]
+
+            # The labels must be strings and the rest numbers
+            if set(map(_number_value, fields[-1])) - {b''}:
+                raise TextGridSyntaxError('Expected a string label')
+            for numbers in fields[:-1]:
+                if b'' in map(_number_value, numbers):
+                    raise TextGridSyntaxError('Expected a number')
+            yield fields
+
+class _HeaderReader:
+    """
+    Read the values of the tier headers of a TextGrid, skipping the items
+    of the tiers without tokenizing them.
+
+    The buffer is read as a whole, or from an iterator of chunks that are
+    appended to it as they are needed.
+    """
+
+    def __init__(self, buffer, chunks=()):
+        self.buffer = buffer
+        self.position = 0
+        self.chunks = iter(chunks)
+        while len(self.buffer) < 1024 and self._extend():
+            pass
+        self.position = _header_end(self.buffer)
+
+    def _extend(self):
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            return False
+        # The character before the position is kept for the look-behind of
+        # the numbers
+        start = max(0, self.position - 1)
+        self.buffer = self.buffer[start:] + chunk
+        self.position -= start
+        return True
+
+    def _match(self, method):
+        """
+        Call a match or search method from the current position and move
+        past the match. A match that reaches the end of the buffer might go
+        on in the next chunk, so it is retried with more of the file.
+        """
+        while True:
+            match = method(self.buffer, self.position)
+            if match is not None and match.end() < len(self.buffer):
+                break
+            if not self._extend():
+                break
+        if match is not None:
+            self.position = match.end()
+        return match
+
+    def at_end(self):
+        while _TOKEN_PATTERN.search(self.buffer, self.position) is None:
+            if not self._extend():
+                return True
+        return False
+
+    def _next(self):
+        match = self._match(_TOKEN_PATTERN.search)
+        if match is None:
+            raise TextGridSyntaxError('Unexpected end of file')
+        return match
+
+    def number(self):
+        number = self._next().group(2)
+        if number is None:
+            raise TextGridSyntaxError('Expected a number')
+        return float(number)
+
+    def string(self):
+        string = self._next().group(1)
+        if string is None:
+            raise TextGridSyntaxError('Expected a string')
+        return string
+
+    def skip_strings(self, count):
+        for _ in range(count // SKIP_BLOCK_SIZE):
+            if self._match(_SKIP_BLOCK_PATTERN.match) is None:
+                raise TextGridSyntaxError('Unexpected end of file')
+        for _ in range(count % SKIP_BLOCK_SIZE):
+            if self._match(_SKIP_STRING_PATTERN.match) is None:
+                raise TextGridSyntaxError('Unexpected end of file')
+
+def sniff_encoding(buffer):
+    """
+    Tell the encoding of a TextGrid file from its byte order mark or, if it
+    has none, from the zero bytes of its first characters, which are ASCII
+    in every TextGrid file.
+
+    Returns
+    -------
+    str or None
+        'utf-8-sig', 'utf-16-le' or 'utf-16-be', or None for a file in an
+        ASCII-compatible encoding without byte order mark, e.g. UTF-8.
+    """
+    head = bytes(buffer[:2])
+    if bytes(buffer[:3]) == codecs.BOM_UTF8:
+        return 'utf-8-sig'
+    if head == codecs.BOM_UTF16_LE:
+        return 'utf-16-le'
+    if head == codecs.BOM_UTF16_BE:
+        return 'utf-16-be'
+    if len(head) == 2 and head[0] and not head[1]:
+        return 'utf-16-le'
+    if len(head) == 2 and not head[0] and head[1]:
+        return 'utf-16-be'
+    return None
+
+def _utf16_bom(buffer, encoding):
+    bom = codecs.BOM_UTF16_LE if encoding == 'utf-16-le' else codecs.BOM_UTF16_BE
+    return bom if bytes(buffer[:2]) == bom else b''
+
+def text_layout(buffer, encoding='utf-8'):
+    """
+    Tell how a TextGrid file is laid out, so that it can be written again
+    the same way.
+
+    Returns
+    -------
+    tuple
+        The byte order mark of a UTF-16 file (empty for other files), the
+        line ending of the file and whether it is in short format.
+    """
+    bom = _utf16_bom(buffer, encoding) if encoding in UTF16_ENCODINGS else b''
+    head = bytes(buffer[len(bom):len(bom) + 1024])
+    if encoding in UTF16_ENCODINGS:
+        head = head.decode(encoding, errors='replace').encode('utf-8')
+    start = _header_end(head)
+    newline = '\r\n' if head[start - 2:start] == b'\r\n' else '\n'
+    return bom, newline, not _LONG_FORMAT_PATTERN.match(head, start)
+
+def _to_utf8(buffer, encoding):
+    """
+    Return a buffer in one of `UTF16_ENCODINGS` as UTF-8, without its byte
+    order mark. The buffer is transcoded in chunks, so that it is never
+    held as a whole in a Python string.
+
+    Returns
+    -------
+    bytearray
+    """
+    utf8 = bytearray()
+    for chunk in _utf8_chunks(buffer, encoding):
+        utf8 += chunk
+    return utf8
+
+def _utf8_chunks(buffer, encoding):
+    """
+    Transcode a buffer in one of `UTF16_ENCODINGS` to UTF-8 in chunks of
+    about `CHUNK_SIZE` bytes, skipping its byte order mark.
+    """
+    start = len(_utf16_bom(buffer, encoding))
+    return _transcode(_slices(buffer, start, len(buffer)), encoding, 'utf-8')
+
+def _transcode(parts, from_encoding, to_encoding):
+    """
+    Transcode a sequence of byte strings part by part. A character may be
+    split between two parts.
+    """
+    decoder = codecs.getincrementaldecoder(from_encoding)()
+    for part in parts:
+        yield decoder.decode(part).encode(to_encoding)
+    yield decoder.decode(b'', final=True).encode(to_encoding)
+
+def _utf8_buffer(buffer, encoding):
+    """
+    Return the buffer to be tokenized and the encoding of its strings. Files
+    in UTF-16 are transcoded to UTF-8 as the tokenizer works on bytes.
+    """
+    if encoding in UTF16_ENCODINGS:
+        return _to_utf8(buffer, encoding), 'utf-8'
+    return buffer, _string_encoding(encoding)
+
+def _string_encoding(encoding):
+    # The byte order mark is at the start of the file, not of each string
+    return 'utf-8' if encoding == 'utf-8-sig' else encoding
+
+def _header_end(buffer):
+    header = _HEADER_PATTERN.search(buffer, 0, 1024)
+    if header is None:
+        raise TextGridSyntaxError('Not a TextGrid text file')
+    return header.end()
+
+def _token_chunks(buffer, start):
+    """
+    Tokenize a buffer in chunks of about `CHUNK_SIZE` bytes. The chunks end
+    at a newline outside of the strings: quotes only appear in strings, in
+    pairs, so a chunk with an even number of quotes ends outside of them.
+    """
+    end = len(buffer)
+    while start < end:
+        stop = _chunk_end(buffer, start + CHUNK_SIZE, end)
+        quotes = buffer[start:stop].count(b'"')
+        while quotes % 2 and stop < end:
+            next_stop = _chunk_end(buffer, stop, end)
+            quotes += buffer[stop:next_stop].count(b'"')
+            stop = next_stop
+        if quotes % 2:
+            raise TextGridSyntaxError('Unterminated string')
+        yield _TOKEN_PATTERN.findall(buffer, start, stop)
+        start = stop
+
+def _chunk_end(buffer, position, end):
+    stop = buffer.find(b'\n', min(position, end))
+    return end if stop < 0 else stop + 1
+
+def _read_tiers(buffer):
+    """
+    Read the header of a TextGrid and iterate over its tiers.
+
+    Yields
+    ------
+    tuple
+        The xmin and xmax of the TextGrid first, then the class, the name,
+        the xmin, the xmax, the number of items and the item blocks (see
+        `_TokenReader.items`) of each tier. The blocks of a tier must be
+        consumed before moving to the next tier.
+    """
+    reader = _TokenReader(_token_chunks(buffer, _header_end(buffer)))
+    yield reader.number(), reader.number()
+    if reader.at_end():
+        return
+
+    ntiers = int(reader.number())
+    for _ in range(ntiers):
+        tier_class = reader.string()
+        name = reader.string()
+        tier_xmin = reader.number()
+        tier_xmax = reader.number()
+        nitems = int(reader.number())
+        yield tier_class, name, tier_xmin, tier_xmax, nitems, reader.items(tier_class, nitems)
+
+    # Stray tokens, e.g. from unescaped quotes, shift the rest of the values
+    if not reader.at_end():
+        raise TextGridSyntaxError('Unexpected values after the last tier')
+
+def _decode_strings(strings, encoding):
+    """
+    Decode and unescape a list of quoted string tokens in a single pass,
+    joined by newlines, unless some of them span several lines.
+    """
+    if not strings:
+        return []
+    text = b'\n'.join(strings).decode(encoding)
+    if text.count('\n') != len(strings) - 1:
+        return [string.decode(encoding).replace('""', '"') for string in strings]
+    return text.replace('""', '"').split('\n')
+
+def parse_textgrid(buffer, encoding='utf-8'):
+    """
+    Parse a TextGrid file in long or short format.
+
+    The buffer is tokenized in chunks and the items are built in blocks,
+    so apart from the buffer itself, the memory used is about the size of
+    the returned object.
+
+    Parameters
+    ----------
+    buffer : bytes or mmap.mmap
+        The contents of the file.
+    encoding : str, default 'utf-8'
+        The encoding of the file, see `sniff_encoding`.
+
+    Returns
+    -------
+    TextGrid
+
+    Raises
+    ------
+    TextGridSyntaxError
+        If the buffer is not a TextGrid file.
+    UnicodeDecodeError
+        If the strings cannot be decoded.
+    """
+    buffer, string_encoding = _utf8_buffer(buffer, encoding)
+
+    tiers = _read_tiers(buffer)
+    tg = TextGrid(*next(tiers), encoding=encoding)
+    for index, (tier_class, name, tier_xmin, tier_xmax, _, blocks) in enumerate(tiers):
+        tier_class, name = _decode_strings([tier_class, name], string_encoding)
+        tier = Tier(name, tier_class, tier_xmin, tier_xmax, index)
+        for fields in blocks:
+            xmins = list(map(float, map(_number_value, fields[0])))
+            xmaxs = map(float, map(_number_value, fields[1])) if len(fields) == 3 else xmins
+            texts = _decode_strings(list(map(_string_value, fields[-1])), string_encoding)
+            first = len(tier)
+            tier.extend(map(Item, xmins, xmaxs, texts, range(first, first + len(xmins)), repeat(tier)))
+        tg.append(tier)
+    return tg
+
+def tier_names(buffer, encoding='utf-8'):
+    """
+    Read the tier names of a TextGrid file in long or short format. Only
+    the headers of the tiers are tokenized and only the names are decoded,
+    the items are skipped by counting their labels.
+
+    Parameters
+    ----------
+    buffer : bytes or mmap.mmap
+        The contents of the file.
+    encoding : str, default 'utf-8'
+        The encoding of the file, see `sniff_encoding`.
+
+    Returns
+    -------
+    list of str
+
+    Raises
+    ------
+    TextGridSyntaxError
+        If the buffer is not a TextGrid file.
+    UnicodeDecodeError
+        If the names cannot be decoded.
+    """
+    if encoding in UTF16_ENCODINGS:
+        reader = _HeaderReader(b'', _utf8_chunks(buffer, encoding))
+        encoding = 'utf-8'
+    else:
+        reader = _HeaderReader(buffer)
+
+    # The values are in the same order as in `_read_tiers`
+    reader.number()
+    reader.number()
+    names = []
+    if not reader.at_end():
+        for _ in range(int(reader.number())):
+            tier_class = reader.string()
+            if tier_class not in (b'IntervalTier', b'TextTier'):
+                raise TextGridSyntaxError(f'Unknown tier class {tier_class!r}')
+            names.append(reader.string())
+            reader.number()
+            reader.number()
+            reader.skip_strings(int(reader.number()))
+
+        # Labels with unescaped quotes shift the rest of the strings
+        if not reader.at_end():
+            raise TextGridSyntaxError('Unexpected values after the last tier')
+    return _decode_strings(names, _string_encoding(encoding))
+
+def quote_label(text, encoding='utf-8'):
+    """
+    Return a label as a quoted TextGrid string.
+    """
+    return b'"' + text.replace('"', '""').encode(_string_encoding(encoding)) + b'"'
+
+def patch_labels(buffer, cells, encoding='utf-8'):
+    """
+    Replace the labels of some items of a TextGrid file. Only the quoted
+    labels are rewritten, the rest of the file is kept byte by byte.
+
+    Parameters
+    ----------
+    buffer : bytes or mmap.mmap
+        The contents of the TextGrid file.
+    cells : list of textgrid_explorer.store.Cell
+        The cells with the new labels.
+    encoding : str, default 'utf-8'
+        The encoding of the file, see `sniff_encoding`.
+
+    Yields
+    ------
+    bytes
+        The parts of the patched file, to be written one after the other.
+        The parts copied from the buffer are at most `CHUNK_SIZE` bytes.
+
+    Raises
+    ------
+    TextGridSyntaxError
+        If the buffer is not a TextGrid file.
+    ValueError
+        If the file no longer has the items of the cells.
+    """
+    if encoding in UTF16_ENCODINGS:
+        # Patch the file in UTF-8 and encode it back part by part
+        parts = patch_labels(_to_utf8(buffer, encoding), cells)
+        yield _utf16_bom(buffer, encoding)
+        yield from _transcode(parts, 'utf-8', encoding)
+        return
+
+    cells_by_tier = {}
+    for cell in cells:
+        cells_by_tier.setdefault(cell.tier_index, {})[cell.item_index] = cell
+
+    # Find the position of each label among the strings of the file, after
+    # the class and the name of its tier, and check that its item is there
+    replacements = {}
+    nstrings = 0
+    tiers = _read_tiers(buffer)
+    next(tiers)
+    for tier_index, (*_, nitems, blocks) in enumerate(tiers):
+        nstrings += 2
+        tier_cells = cells_by_tier.pop(tier_index, {})
+        first = 0
+        for fields in blocks:
+            end = first + len(fields[0])
+            for item_index in [i for i in tier_cells if first <= i < end]:
+                cell = tier_cells.pop(item_index)
+                if float(fields[0][item_index - first][1]) != cell.xmin:
+                    raise ValueError(f'No item at {cell.xmin} in tier {tier_index + 1}')
+                replacements[nstrings + item_index] = quote_label(cell.text, encoding)
+            first = end
+        nstrings += nitems
+        if tier_cells:
+            cells_by_tier[tier_index] = tier_cells
+
+    for tier_cells in cells_by_tier.values():
+        cell = next(iter(tier_cells.values()))
+        raise ValueError(f'No item at {cell.xmin} in tier {cell.tier_index + 1}')
+
+    # Only the strings up to the last replaced label are located
+    strings = _STRING_PATTERN.finditer(buffer, _header_end(buffer))
+    position = 0
+    previous = -1
+    for string_index in sorted(replacements):
+        match = next(islice(strings, string_index - previous - 1, None))
+        previous = string_index
+        yield from _slices(buffer, position, match.start())
+        yield replacements[string_index]
+        position = match.end()
+    yield from _slices(buffer, position, len(buffer))
+
+def _slices(buffer, start, end):
+    for position in range(start, end, CHUNK_SIZE):
+        yield buffer[position:min(position + CHUNK_SIZE, end)]
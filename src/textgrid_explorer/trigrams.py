@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+_REPEATS = tuple(
+    getattr(sre_parse, name)
+    for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+    if hasattr(sre_parse, name)
+)
+_ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+
+def trigrams(text):
+    """
+    Return the set of substrings of length 3 of a string.
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def required_literals(pattern):
+    """
+    Return literal substrings that every match of a regex must contain.
+
+    Only the parts of the pattern that always take part in a match are
+    considered: alternatives, optional repeats and case-insensitive groups
+    are skipped. The result may be empty, but never wrong.
+
+    Parameters
+    ----------
+    pattern : re.Pattern
+        A compiled regular expression.
+
+    Returns
+    -------
+    list of str
+    """
+    if pattern.flags & sre_parse.SRE_FLAG_IGNORECASE:
+        return []
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return []
+
+    literals = []
+    _collect_literals(parsed, literals)
+    return literals
+
+def _collect_literals(subpattern, literals):
+    run = []
+    for op, av in subpattern:
+        if op == sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+
+        if run:
+            literals.append(''.join(run))
+            run = []
+
+        if op == sre_parse.SUBPATTERN:
+            _, add_flags, _, p = av
+            if not add_flags & sre_parse.SRE_FLAG_IGNORECASE:
+                _collect_literals(p, literals)
+        elif op in _REPEATS:
+            min_count, _, p = av
+            if min_count >= 1:
+                _collect_literals(p, literals)
+        elif op == _ATOMIC_GROUP:
+            _collect_literals(av, literals)
+    if run:
+        literals.append(''.join(run))
+
+def is_literal_extension(old, new):
+    """
+    Return True if `new` is the regex `old` followed by literal characters.
+
+    Every string that matches such a pattern also matches `old`, so the
+    results of `old` can be narrowed down instead of searching again.
+
+    Parameters
+    ----------
+    old, new : str
+        Regular expressions.
+
+    Returns
+    -------
+    bool
+    """
+    if not new.startswith(old) or new == old:
+        return False
+    suffix = new[len(old):]
+    try:
+        old_items = list(sre_parse.parse(old))
+        new_items = list(sre_parse.parse(new))
+    except Exception:
+        return False
+
+    # The suffix must not change the meaning of the end of `old`, e.g. a
+    # quantifier, a closing brace or the digits of an escape sequence
+    if len(new_items) != len(old_items) + len(suffix):
+        return False
+    tail = new_items[len(old_items):]
+    return all(
+        op == sre_parse.LITERAL and av == ord(char)
+        for (op, av), char in zip(tail, suffix)
+    )
+
+class TrigramIndex:
+    """
+    An inverted index from trigrams to the strings that contain them.
+
+    It narrows down the strings that can match a regex before the regex
+    runs: a string can only match if it contains every trigram of the
+    literals required by the pattern.
+    """
+
+    def __init__(self, texts=()):
+        self.postings = {}
+        for text in texts:
+            self.add(text)
+
+    def add(self, text):
+        for gram in trigrams(text):
+            texts = self.postings.get(gram)
+            if texts is None:
+                texts = self.postings[gram] = set()
+            texts.add(text)
+
+    def discard(self, text):
+        for gram in trigrams(text):
+            texts = self.postings.get(gram)
+            if texts is None:
+                continue
+            texts.discard(text)
+            if not texts:
+                del self.postings[gram]
+
+    def candidates(self, pattern):
+        """
+        Return the strings that can match a compiled regex, or None if the
+        pattern has no literal long enough to narrow the search.
+        """
+        grams = set()
+        for literal in required_literals(pattern):
+            grams.update(trigrams(literal))
+        if not grams:
+            return None
+
+        postings = []
+        for gram in grams:
+            texts = self.postings.get(gram)
+            if not texts:
+                return set()
+            postings.append(texts)
+        postings.sort(key=len)
+
+        result = set(postings[0])
+        for texts in postings[1:]:
+            result &= texts
+            if not result:
+                break
+        return result
@@ -13,47 +13,385 @@
 #
 #   You should have received a copy of the GNU General Public License along
 #   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import codecs
+import fnmatch
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from pprint import pprint
 
 import mytextgrid
 
-def read_textgrid(path):
+try:
+    import chardet
+except ImportError:
+    chardet = None
+
+from textgrid_explorer import cache
+from textgrid_explorer import textgrid_parser
+
+# Directories with fewer files than this are read serially, since starting
+# the worker processes costs more than it saves.
+PARALLEL_MIN_FILES = 64
+MAX_CHUNK_SIZE = 16
+
+# Files of this size or larger are memory-mapped instead of read into memory
+MMAP_MIN_SIZE = 16 * 1024 * 1024
+
+# The encoding of the files that are neither UTF-8 nor UTF-16, when chardet
+# is not available or cannot tell. Praat writes them in ISO Latin-1.
+LEGACY_ENCODING = 'latin-1'
+CHARDET_SAMPLE_SIZE = 64 * 1024
+CHARDET_MIN_CONFIDENCE = 0.5
+_NON_ASCII_PATTERN = re.compile(rb'[\x80-\xff]')
+
+# {absolute path: (fingerprint, encoding)} of the files read or written,
+# the least recently used dropped beyond MAX_KNOWN_ENCODINGS files
+MAX_KNOWN_ENCODINGS = 65536
+_file_encodings = OrderedDict()
+_file_encodings_lock = threading.Lock()
+
+# The extensions of the TextGrid files, compared case-insensitively
+TEXTGRID_SUFFIXES = ('.textgrid',)
+
+# How the items of the secondary tiers are matched to the primary intervals
+ALIGNMENT_MODES = ('exact', 'tolerance', 'overlap')
+DEFAULT_TOLERANCE = 0.001
+
+def read_textgrid(path, use_cache=True):
+    """
+    Read a TextGrid file in long or short format. The tiers and items of
+    the returned object know their position in the file, which is used by
+    the table model to locate them again.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The path of the TextGrid file.
+    use_cache : bool, default True
+        If True, look up the file in the persistent parse cache before
+        parsing it, and store it there after parsing it.
+
+    Returns
+    -------
+    textgrid_explorer.textgrid_parser.TextGrid or mytextgrid.TextGrid or None
+        None if the file could not be read.
+    """
     try:
-        tg = mytextgrid.read_from_file(path, encoding='utf-8')
+        parse_cache = cache.default_cache() if use_cache else None
+        tg = None
+        if parse_cache is not None:
+            # Taken before parsing, so that a file changed meanwhile does
+            # not get an entry that looks up to date
+            key = parse_cache.fingerprint(path)
+            tg = parse_cache.get(path, key)
+            if tg is not None:
+                remember_encoding(path, tg.encoding)
+        if tg is None:
+            tg = _parse_textgrid(path)
+            if parse_cache is not None:
+                parse_cache.put(path, tg, key)
+
         tg.file_path = path
-        for index, tier in enumerate(tg):
-            tg.file_path = path
-            tg.parent = tg
-            tier.index = index
-            for item in tier:
-                item.file_path =path
-                item.tier = tier
-                item.textgrid = tg
-                item.modified = False
         return tg
     except Exception as e:
         return None
 
-def get_tier_names(source_dir):
-    source_dir = Path(source_dir)
+def _parse_textgrid(path):
+    """
+    Parse a TextGrid file with the built-in parser, falling back on
+    mytextgrid for the files it cannot read.
+    """
+    with open_buffer(path) as buffer:
+        encoding = detect_encoding(path, buffer)
+        try:
+            return textgrid_parser.parse_textgrid(buffer, encoding)
+        except (textgrid_parser.TextGridSyntaxError, UnicodeDecodeError):
+            pass
+    return read_mytextgrid(path, encoding)
+
+@contextmanager
+def open_buffer(path):
+    """
+    Open a file as a read-only buffer. Files of `MMAP_MIN_SIZE` bytes or
+    more are memory-mapped, so that their contents are paged in by the
+    system as they are scanned instead of being copied into memory.
+
+    Yields
+    ------
+    bytes or mmap.mmap
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_MIN_SIZE:
+            yield f.read()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+def detect_encoding(path, buffer):
+    """
+    Return the encoding of a TextGrid file.
+
+    The byte order mark or the layout of the first bytes tell UTF-16 and
+    UTF-8 with BOM apart. Other files are UTF-8 if they decode as such;
+    chardet is only used for the rest. The result is remembered until the
+    file changes.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The path of the file.
+    buffer : bytes or mmap.mmap
+        The contents of the file, see `open_buffer`.
+
+    Returns
+    -------
+    str
+    """
+    fingerprint = cache.ParseCache.fingerprint(path)
+    with _file_encodings_lock:
+        known = _file_encodings.get(fingerprint[0])
+        if known is not None and known[0] == fingerprint:
+            _file_encodings.move_to_end(fingerprint[0])
+            return known[1]
+
+    encoding = textgrid_parser.sniff_encoding(buffer)
+    if encoding is None:
+        encoding = 'utf-8' if _is_utf8(buffer) else _guess_legacy_encoding(buffer)
+    _store_encoding(fingerprint, encoding)
+    return encoding
+
+def remember_encoding(path, encoding):
+    """
+    Remember the encoding of a file, typically after it has been written.
+    """
+    _store_encoding(cache.ParseCache.fingerprint(path), encoding)
 
-    names = []
-    for path in source_dir.rglob('*.TextGrid'):
+def _store_encoding(fingerprint, encoding):
+    with _file_encodings_lock:
+        _file_encodings[fingerprint[0]] = (fingerprint, encoding)
+        _file_encodings.move_to_end(fingerprint[0])
+        while len(_file_encodings) > MAX_KNOWN_ENCODINGS:
+            _file_encodings.popitem(last=False)
+
+def _is_utf8(buffer):
+    return _decodes(buffer, 'utf-8')
+
+def _decodes(buffer, encoding):
+    chunk_size = textgrid_parser.CHUNK_SIZE
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        for start in range(0, len(buffer), chunk_size):
+            decoder.decode(buffer[start:start + chunk_size])
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def _guess_legacy_encoding(buffer):
+    if chardet is not None:
+        # The labels are what tells the encodings apart, the first bytes
+        # that are not ASCII are sampled
+        non_ascii = _NON_ASCII_PATTERN.search(buffer)
+        start = 0 if non_ascii is None else max(0, non_ascii.start() - CHARDET_SAMPLE_SIZE // 4)
+        guess = chardet.detect(bytes(buffer[start:start + CHARDET_SAMPLE_SIZE]))
+        encoding = guess.get('encoding')
         try:
-            tg = read_textgrid(path)
-        except Exception as e:
-            print(f'Could not read {path}: {e}')
-            continue
+            # The tokenizer needs an ASCII-compatible encoding, and the
+            # guess must hold for the whole file, which is not ASCII
+            if (encoding and guess.get('confidence', 0) >= CHARDET_MIN_CONFIDENCE
+                    and 'Object class'.encode(encoding) == b'Object class'):
+                encoding = codecs.lookup(encoding).name
+                if encoding != 'ascii' and _decodes(buffer, encoding):
+                    return encoding
+        except (LookupError, UnicodeError):
+            pass
+    return LEGACY_ENCODING
 
-        for tier in tg:
-            name = tier.name
-            if name in names:
-                continue
-            names.append(name)
-    return names
+def read_mytextgrid(path, encoding='utf-8'):
+    """
+    Read a TextGrid file with mytextgrid and attach to it its encoding and
+    to its tiers and items their position in the file.
+
+    Returns
+    -------
+    mytextgrid.TextGrid
+    """
+    tg = mytextgrid.read_from_file(path, encoding=encoding)
+    tg.encoding = encoding
+    tg.file_path = path
+    for index, tier in enumerate(tg):
+        tier.index = index
+        for item_index, item in enumerate(tier):
+            item.index = item_index
+    return tg
+
+def write_textgrid_labels(path, cells, encoding=None):
+    """
+    Write the labels of some table cells to their TextGrid file.
+
+    Only the changed labels are spliced into the file, the rest of it is
+    left untouched. Files that cannot be patched that way are written again
+    in full, in their original encoding, line endings and format.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The path of the TextGrid file.
+    cells : list of textgrid_explorer.store.Cell
+        The cells to be written. All of them must belong to `path`.
+    encoding : str, optional
+        The encoding the file was read in. If None, it is detected again.
+
+    Raises
+    ------
+    OSError
+        If the file could not be read.
+    ValueError
+        If the file no longer has the items of the cells.
+    """
+    if encoding is None:
+        with open_buffer(path) as buffer:
+            encoding = detect_encoding(path, buffer)
+
+    try:
+        replace_file(path, lambda tmp_path: _write_patched_labels(path, tmp_path, cells, encoding))
+    except textgrid_parser.TextGridSyntaxError:
+        _rewrite_textgrid_labels(path, cells, encoding)
+    except UnicodeEncodeError:
+        raise ValueError(f'{path} cannot hold the new labels in {encoding}') from None
+    except ValueError:
+        raise ValueError(f'{path} has changed since it was loaded') from None
+    remember_encoding(path, encoding)
+
+def _write_patched_labels(path, tmp_path, cells, encoding):
+    with open_buffer(path) as buffer, open(tmp_path, 'wb') as f:
+        f.writelines(textgrid_parser.patch_labels(buffer, cells, encoding))
+
+def _rewrite_textgrid_labels(path, cells, encoding):
+    try:
+        tg = read_mytextgrid(path, encoding)
+    except Exception:
+        raise OSError(f'Could not read {path}') from None
+
+    for cell in cells:
+        try:
+            item = tg[cell.tier_index][cell.item_index]
+        except IndexError:
+            item = None
+        if item is None or float(item.xmin) != cell.xmin:
+            raise ValueError(f'{path} has changed since it was loaded')
+        item.text = cell.text
+
+    with open_buffer(path) as buffer:
+        layout = textgrid_parser.text_layout(buffer, encoding)
+    try:
+        replace_file(path, lambda tmp_path: _write_textgrid_as(tg, tmp_path, encoding, *layout))
+    except UnicodeEncodeError:
+        raise ValueError(f'{path} cannot hold the new labels in {encoding}') from None
+
+def _write_textgrid_as(tg, path, encoding, bom, newline, short_format):
+    # mytextgrid writes UTF-8 with the line endings of the platform, so the
+    # file is encoded again as the original one was
+    tg.write(path, short_format)
+    text = Path(path).read_text(encoding='utf-8')
+    with open(path, 'wb') as f:
+        f.write(bom)
+        f.write(text.replace('\n', newline).encode(encoding))
+
+def replace_file(path, write):
+    """
+    Call `write` with the path of a temporary file and rename it over
+    `path` once it is complete.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        with open(tmp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def scan_tier_names(paths, progress=None, cancelled=lambda: False):
+    """
+    Collect the names of the tiers of a list of TextGrid files. Only the
+    tier headers are read, the intervals and points are skipped.
+
+    Parameters
+    ----------
+    paths : list of pathlib.Path
+        The TextGrid files, see `find_textgrid_paths`.
+    progress : callable, optional
+        Called as `progress(done, total)` as the files are read.
+    cancelled : callable, optional
+        Polled between files; when it returns True, the scan stops.
 
-def create_aligned_tier_table(source_dir, primary_tier_name, secondary_tier_names):
+    Returns
+    -------
+    dict of {str: int} or None
+        The tier names in order of appearance mapped to the number of files
+        in which they are found. None if the scan was cancelled.
+    """
+    counts = {}
+    total = len(paths)
+    for done, path in enumerate(paths, start=1):
+        if cancelled():
+            return None
+        names = read_tier_names(path)
+        if names is None:
+            print(f'Could not read {path}')
+        else:
+            for name in dict.fromkeys(names):
+                counts[name] = counts.get(name, 0) + 1
+        if progress is not None:
+            progress(done, total)
+    return counts
+
+def read_tier_names(path):
+    """
+    Read the tier names of a TextGrid file in long or short format.
+
+    The encoding is only detected if the names are not valid UTF-8, as
+    telling a legacy encoding apart takes reading the whole file.
+
+    Returns
+    -------
+    list of str or None
+        None if the file could not be read.
+    """
+    try:
+        with open_buffer(path) as buffer:
+            try:
+                encoding = textgrid_parser.sniff_encoding(buffer) or 'utf-8'
+                return textgrid_parser.tier_names(buffer, encoding)
+            except (textgrid_parser.TextGridSyntaxError, UnicodeDecodeError):
+                encoding = detect_encoding(path, buffer)
+            try:
+                return textgrid_parser.tier_names(buffer, encoding)
+            except (textgrid_parser.TextGridSyntaxError, UnicodeDecodeError):
+                pass
+        # e.g. labels with unescaped quotes, see `_parse_textgrid`
+        return [tier.name for tier in read_mytextgrid(path, encoding)]
+    except Exception:
+        return None
+
+def create_aligned_tier_table(source_dir, primary_tier_name, secondary_tier_names, workers=1, alignment='exact', tolerance=DEFAULT_TOLERANCE, paths=None):
     """
     Reads TextGrid files from a source directory, aligns them based on a
     primary tier's intervals, and organizes the data into a table.
@@ -66,6 +404,22 @@ def create_aligned_tier_table(source_dir, primary_tier_name, secondary_tier_name
         The name of the tier to use as the key for alignment.
     secondary_tier_names: list of str
         A list of names of the secondary tiers to align with the primary tier.
+    workers: int or None, default 1
+        The number of processes used to read the files. If 1, the files are
+        read serially in the current process. If None, use as many processes
+        as CPUs. Directories with less than `PARALLEL_MIN_FILES` files are
+        always read serially.
+    alignment: {'exact', 'tolerance', 'overlap'}, default 'exact'
+        How the items of the secondary tiers are matched to the primary
+        intervals. 'exact' requires the same xmin and xmax, 'tolerance'
+        allows both boundaries to differ by up to `tolerance` seconds and
+        'overlap' picks the item that overlaps most with the primary interval.
+    tolerance: float, default DEFAULT_TOLERANCE
+        The maximum difference in seconds between boundaries when
+        `alignment` is 'tolerance'.
+    paths: list of pathlib.Path, optional
+        The TextGrid files of the directory, if they have already been
+        listed by `find_textgrid_paths`.
 
     Returns
     -------
@@ -78,53 +432,360 @@ def create_aligned_tier_table(source_dir, primary_tier_name, secondary_tier_name
     if not source_dir.is_dir() or not source_dir.is_absolute():
         return [], []
 
-    # Initialize data structures
-    aligned_data = {}
-    headers = ['filename', primary_tier_name] + secondary_tier_names
+    headers = table_headers(primary_tier_name, secondary_tier_names)
+    if paths is None:
+        paths = find_textgrid_paths(source_dir)
+
+    table_rows = []
+    for file_rows in iter_aligned_rows(
+            paths, primary_tier_name, secondary_tier_names, workers, alignment, tolerance):
+        table_rows.extend(file_rows)
+    return headers, table_rows
+
+def table_headers(primary_tier_name, secondary_tier_names):
+    return ['filename', primary_tier_name] + list(secondary_tier_names)
+
+def find_textgrid_paths(source_dir, include=None, exclude=None, follow_symlinks=False):
+    """
+    Return the paths of the TextGrid files in a directory and its
+    subdirectories, sorted.
+
+    The tree is walked once with `os.scandir`. The file extensions are
+    compared case-insensitively, so '.textgrid' files are found too.
+
+    Parameters
+    ----------
+    source_dir : str or pathlib.Path
+        The directory to walk.
+    include : list of str, optional
+        Glob patterns of the files to list. By default, all TextGrid files
+        are listed.
+    exclude : list of str, optional
+        Glob patterns of the files and directories to skip. The contents of
+        a skipped directory are not walked.
+    follow_symlinks : bool, default False
+        Whether to walk into symbolic links to directories. Each directory
+        is walked only once, even if several links lead to it. Symbolic
+        links to files are always listed.
+
+    Glob patterns are case-insensitive. A pattern with a '/' is matched
+    against the path relative to `source_dir`, with '/' as separator, and
+    any other pattern against the file or directory name.
+
+    Returns
+    -------
+    list of pathlib.Path
+    """
+    include = _glob_patterns(include)
+    exclude = _glob_patterns(exclude)
 
-    # Process each TextGrid file in the source directory
-    for path in source_dir.rglob('*.TextGrid'):
+    paths = []
+    visited = set()
+    stack = [(os.fspath(source_dir), '')]
+    while stack:
+        dir_path, rel_dir = stack.pop()
         try:
-            tg = read_textgrid(path)
-        except Exception as e:
-            print(f'Could not read {path}: {e}')
+            if follow_symlinks:
+                st = os.stat(dir_path)
+                if (st.st_dev, st.st_ino) in visited:
+                    continue
+                visited.add((st.st_dev, st.st_ino))
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError as e:
+            print(f'Could not read {dir_path}: {e}')
             continue
 
-        # Get the primary tier
-        for tier in tg:
-            primary_tiers = [tier for tier in tg if tier.name == primary_tier_name]
-            if not primary_tiers:
-                print(f'Primary tier "{primary_tier_name}" not found in {path}. Skipping.')
+        for entry in entries:
+            name = entry.name.lower()
+            rel_path = rel_dir + name
+            if exclude and _glob_match(name, rel_path, exclude):
                 continue
+            try:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    stack.append((entry.path, rel_path + '/'))
+                    continue
+                if not name.endswith(TEXTGRID_SUFFIXES) or not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if include and not _glob_match(name, rel_path, include):
+                continue
+            paths.append(entry.path)
 
-            primary_tier = primary_tiers[0]
+    paths.sort()
+    return [Path(path) for path in paths]
 
-            for primary_interval in primary_tier:
-                if not primary_interval.text.strip():
-                    continue
+def _glob_patterns(patterns):
+    return [(pattern.lower(), '/' in pattern) for pattern in patterns or [] if pattern]
 
-                interval_times = (primary_interval.xmin, primary_interval.xmax)
+def _glob_match(name, rel_path, patterns):
+    return any(
+        fnmatch.fnmatchcase(rel_path if has_slash else name, pattern)
+        for pattern, has_slash in patterns
+    )
 
-                row = [None]*len(headers)
-                row[0] = path
-                row[1] = primary_interval
+def cache_textgrids(paths, workers=1, cancelled=lambda: False):
+    """
+    Parse TextGrid files into the persistent parse cache, so that building a
+    table from them afterwards, e.g. once the tiers of a new project have
+    been chosen, finds them there instead of parsing them again. The files
+    already in the cache are not loaded.
 
-                aligned_data[interval_times] = row
+    Parameters
+    ----------
+    paths : list of pathlib.Path
+        The TextGrid files, see `find_textgrid_paths`.
+    workers : int or None, default 1
+        The number of processes used to parse the files, see
+        `create_aligned_tier_table`.
+    cancelled : callable, optional
+        Polled between files; when it returns True, the parsing stops.
 
-            for tier in tg:
-                if tier == primary_tier:
-                    continue
-                if tier.name in secondary_tier_names:
-                    for secondary_interval in tier:
-                        interval_times = (secondary_interval.xmin, secondary_interval.xmax)
-
-                        if interval_times in aligned_data:
-                            try:
-                                tier_index = headers.index(tier.name)
-                                aligned_data[interval_times][tier_index] = secondary_interval
-                            except:
-                                continue
-    # Convert the dictionary of aligned data into a list of lists for the table model
-#    pprint(aligned_data)
-    table_rows = list(aligned_data.values())
-    return headers, table_rows
+    Returns
+    -------
+    bool
+        False if the parsing was cancelled.
+    """
+    results = _map_files(_cache_textgrids, paths, workers)
+    try:
+        for _ in results:
+            if cancelled():
+                return False
+    finally:
+        results.close()
+        cache.default_cache().prune()
+    return True
+
+def _cache_textgrids(paths):
+    parse_cache = cache.default_cache()
+    return [parse_cache.has(path) or read_textgrid(path) is not None for path in paths]
+
+def iter_aligned_rows(paths, primary_tier_name, secondary_tier_names, workers=1, alignment='exact', tolerance=DEFAULT_TOLERANCE, encodings=None):
+    """
+    Align TextGrid files one after another.
+
+    See `create_aligned_tier_table` for a description of the other
+    parameters.
+
+    Parameters
+    ----------
+    encodings : dict, optional
+        If given, filled with the {pathlib.Path: str} encoding of each file
+        that could be read, as the rows of the file are yielded.
+
+    Yields
+    ------
+    list of list
+        The rows of each file, in the same order as `paths`.
+    """
+    if alignment not in ALIGNMENT_MODES:
+        raise ValueError(f'alignment must be one of {ALIGNMENT_MODES}')
+
+    args = (primary_tier_name, secondary_tier_names, alignment, tolerance)
+    results = _map_files(_align_textgrids, paths, workers, *args)
+    try:
+        for path, (rows, encoding) in zip(paths, results):
+            if encodings is not None and encoding is not None:
+                encodings[path] = encoding
+            yield rows
+    finally:
+        results.close()
+    cache.default_cache().prune()
+
+def _map_files(function, paths, workers, *args):
+    """
+    Call `function(chunk, *args)` on chunks of `paths` and yield the
+    results for each path, in the same order as `paths`.
+
+    The chunks are processed in a pool of `workers` processes, or serially
+    in the current process if `workers` is 1 or there are less than
+    `PARALLEL_MIN_FILES` paths. `function` must be a module-level function
+    that returns a list with one result for each path of its chunk.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Both branches yield the results in the same order, so they are
+    # identical.
+    if workers > 1 and len(paths) >= PARALLEL_MIN_FILES:
+        # Small chunks let the first results arrive early
+        chunksize = max(1, min(MAX_CHUNK_SIZE, len(paths) // (workers * 4)))
+        chunks = [paths[i:i+chunksize] for i in range(0, len(paths), chunksize)]
+
+        # Forking a process that runs other threads (e.g. a GUI) is unsafe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [executor.submit(function, chunk, *args) for chunk in chunks]
+            try:
+                for future in futures:
+                    yield from future.result()
+            finally:
+                # Do not wait for pending chunks if the caller stops early
+                for future in futures:
+                    future.cancel()
+    else:
+        for path in paths:
+            yield from function([path], *args)
+
+def _align_textgrids(paths, *args):
+    return [_align_textgrid(path, *args) for path in paths]
+
+def _align_textgrid(path, primary_tier_name, secondary_tier_names, alignment='exact', tolerance=DEFAULT_TOLERANCE):
+    """
+    Read a single TextGrid file and align its secondary tiers to the
+    intervals of the primary tier.
+
+    This is a module-level function so that it can be sent to the worker
+    processes of `iter_aligned_rows`.
+
+    Returns
+    -------
+    tuple of (list of list, str)
+        One row for each non-empty interval of the primary tier, in time
+        order, and the encoding of the file, None if it could not be read.
+    """
+    tg = read_textgrid(path)
+    if tg is None:
+        print(f'Could not read {path}')
+        return [], None
+    return _align_tiers(tg, path, primary_tier_name, secondary_tier_names, alignment, tolerance), tg.encoding
+
+def _align_tiers(tg, path, primary_tier_name, secondary_tier_names, alignment, tolerance):
+    """
+    Return the aligned rows of a TextGrid read from `path`.
+    """
+    primary_tier = next((tier for tier in tg if tier.name == primary_tier_name), None)
+    if primary_tier is None:
+        print(f'Primary tier "{primary_tier_name}" not found in {path}. Skipping.')
+        return []
+
+    ncolumns = len(secondary_tier_names) + 2
+    rows = []
+    for primary_interval in primary_tier:
+        if not primary_interval.text.strip():
+            continue
+        row = [None]*ncolumns
+        row[0] = path
+        row[1] = primary_interval
+        rows.append(row)
+
+    if not rows:
+        return rows
+
+    # The column of each secondary tier is looked up once per tier
+    columns = {name: i for i, name in enumerate(secondary_tier_names, start=2)}
+    primary_items = [row[1] for row in rows]
+    for tier in tg:
+        if tier is primary_tier:
+            continue
+        column = columns.get(tier.name)
+        if column is None:
+            continue
+        if alignment == 'tolerance':
+            matches = _match_tolerance(primary_items, tier, tolerance)
+        elif alignment == 'overlap':
+            matches = _match_overlap(primary_items, tier)
+        else:
+            matches = _match_exact(primary_items, tier)
+
+        for row_index, item in matches:
+            rows[row_index][column] = item
+    return rows
+
+def _match_exact(primary_items, tier):
+    """
+    Match the items of a tier to the primary intervals with the same xmin
+    and xmax.
+
+    The primary intervals come from a single tier, so they are sorted by time
+    and each item is located with a binary search.
+
+    Yields
+    ------
+    tuple of (int, item)
+        The position of the primary interval and the matched item.
+    """
+    xmins = [item.xmin for item in primary_items]
+    nitems = len(xmins)
+    for item in tier:
+        i = bisect_left(xmins, item.xmin)
+        if i < nitems and xmins[i] == item.xmin and primary_items[i].xmax == item.xmax:
+            yield i, item
+
+def _match_tolerance(primary_items, tier, tolerance):
+    """
+    Match the items of a tier to the primary intervals whose xmin and xmax
+    differ by at most `tolerance` seconds. If several items match the same
+    primary interval, the closest one is kept.
+
+    The candidates of each item are the primary intervals whose xmin falls in
+    [xmin - tolerance, xmin + tolerance], located with a binary search.
+
+    Yields
+    ------
+    tuple of (int, item)
+        The position of the primary interval and the matched item.
+    """
+    xmins = [float(item.xmin) for item in primary_items]
+    xmaxs = [float(item.xmax) for item in primary_items]
+    nitems = len(xmins)
+
+    best = {}
+    for item in tier:
+        item_xmin = float(item.xmin)
+        item_xmax = float(item.xmax)
+        i = bisect_left(xmins, item_xmin - tolerance)
+        while i < nitems and xmins[i] <= item_xmin + tolerance:
+            xmax_diff = abs(xmaxs[i] - item_xmax)
+            if xmax_diff <= tolerance:
+                diff = abs(xmins[i] - item_xmin) + xmax_diff
+                if i not in best or diff < best[i][0]:
+                    best[i] = (diff, item)
+            i += 1
+
+    for i in sorted(best):
+        yield i, best[i][1]
+
+def _match_overlap(primary_items, tier):
+    """
+    Match each primary interval to the item of a tier that overlaps most with
+    it. Points match the primary interval that contains them.
+
+    Both sequences are sorted by time and the items of a tier do not overlap
+    each other, so a single sweep finds all the matches.
+
+    Yields
+    ------
+    tuple of (int, item)
+        The position of the primary interval and the matched item.
+    """
+    items = list(tier)
+    xmins = [float(item.xmin) for item in items]
+    xmaxs = [float(item.xmax) for item in items]
+    nitems = len(items)
+
+    j = 0
+    for i, primary_item in enumerate(primary_items):
+        primary_xmin = float(primary_item.xmin)
+        primary_xmax = float(primary_item.xmax)
+
+        # Skip the items that end before the primary interval
+        while j < nitems and (
+            xmaxs[j] < primary_xmin or
+            (xmaxs[j] == primary_xmin and xmins[j] < xmaxs[j])
+        ):
+            j += 1
+
+        best_item = None
+        best_overlap = -1.0
+        k = j
+        while k < nitems and xmins[k] < primary_xmax:
+            overlap = min(xmaxs[k], primary_xmax) - max(xmins[k], primary_xmin)
+            if overlap > best_overlap:
+                best_overlap = overlap
+                best_item = items[k]
+            k += 1
+
+        if best_item is not None:
+            yield i, best_item
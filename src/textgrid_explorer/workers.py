@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PySide6.QtCore import (
+    QThread,
+    Signal,
+)
+
+from textgrid_explorer import project
+from textgrid_explorer import utils
+
+class TableLoader(QThread):
+    """
+    Build the aligned table in a background thread and send the rows to the
+    GUI thread in batches.
+
+    A batch is sent when it has `batch_size` rows or when `batch_interval`
+    seconds have passed since the previous one, whichever comes first.
+    `fingerprints` holds the size and modification time of the files, taken
+    before they are read, and `encodings` the encoding of the files that
+    could be read. Unless `paths` is given, the files are listed
+    from `src_dir` with the `include`, `exclude` and `follow_symlinks`
+    settings of the project, see `utils.find_textgrid_paths`.
+    """
+    rows_loaded = Signal(object)
+    progress_changed = Signal(int, int)
+    failed = Signal(str)
+
+    batch_size = 5000
+    batch_interval = 0.2
+
+    def __init__(self, parent, src_dir, primary_tier, secondary_tiers, alignment='exact', tolerance=utils.DEFAULT_TOLERANCE, paths=None,
+                 include=None, exclude=None, follow_symlinks=False):
+        super().__init__(parent)
+        self.src_dir = src_dir
+        self.paths = paths
+        self.include = include
+        self.exclude = exclude
+        self.follow_symlinks = follow_symlinks
+        self.primary_tier = primary_tier
+        self.secondary_tiers = secondary_tiers
+        self.alignment = alignment
+        self.tolerance = tolerance
+        self.fingerprints = {}
+        self.encodings = {}
+
+    def headers(self):
+        return utils.table_headers(self.primary_tier, self.secondary_tiers)
+
+    def run(self):
+        try:
+            paths = self.paths
+            if paths is None:
+                paths = utils.find_textgrid_paths(
+                    self.src_dir,
+                    include=self.include,
+                    exclude=self.exclude,
+                    follow_symlinks=self.follow_symlinks,
+                )
+            for path in paths:
+                fingerprint = project.file_fingerprint(path)
+                if fingerprint is not None:
+                    self.fingerprints[path] = fingerprint
+            total = len(paths)
+            self.progress_changed.emit(0, total)
+
+            rows_iter = utils.iter_aligned_rows(
+                paths,
+                self.primary_tier,
+                self.secondary_tiers,
+                workers=None,
+                alignment=self.alignment,
+                tolerance=self.tolerance,
+                encodings=self.encodings,
+            )
+            batch = []
+            last_emit = time.monotonic()
+            try:
+                for done, file_rows in enumerate(rows_iter, start=1):
+                    if self.isInterruptionRequested():
+                        return
+                    batch.extend(file_rows)
+
+                    now = time.monotonic()
+                    if len(batch) >= self.batch_size or now - last_emit >= self.batch_interval:
+                        self.rows_loaded.emit(batch)
+                        self.progress_changed.emit(done, total)
+                        batch = []
+                        last_emit = now
+            finally:
+                rows_iter.close()
+
+            if batch:
+                self.rows_loaded.emit(batch)
+            self.progress_changed.emit(total, total)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class ProjectLoader(QThread):
+    """
+    Read a project file in a background thread, see
+    `textgrid_explorer.project.load_project`.
+    """
+    loaded = Signal(object, object)
+    progress_changed = Signal(int, int)
+    failed = Signal(str)
+
+    def __init__(self, parent, path):
+        super().__init__(parent)
+        self.path = path
+
+    def run(self):
+        try:
+            result = project.load_project(
+                self.path, self.progress_changed.emit, self.isInterruptionRequested
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if result is not None:
+            self.loaded.emit(*result)
+
+class TierScanner(QThread):
+    """
+    List the TextGrid files of a directory and collect the names of their
+    tiers in a background thread, see `utils.scan_tier_names`.
+
+    Once the tiers are sent, the thread goes on parsing the files into the
+    parse cache until it is interrupted, so that the table built from them
+    next does not parse them again, see `utils.cache_textgrids`.
+    """
+    scanned = Signal(object, object)
+    progress_changed = Signal(int, int)
+    failed = Signal(str)
+
+    def __init__(self, parent, src_dir, include=None, exclude=None, follow_symlinks=False):
+        super().__init__(parent)
+        self.src_dir = src_dir
+        self.include = include
+        self.exclude = exclude
+        self.follow_symlinks = follow_symlinks
+
+    def run(self):
+        try:
+            paths = utils.find_textgrid_paths(
+                self.src_dir,
+                include=self.include,
+                exclude=self.exclude,
+                follow_symlinks=self.follow_symlinks,
+            )
+            self.progress_changed.emit(0, len(paths))
+            counts = utils.scan_tier_names(
+                paths, self.progress_changed.emit, self.isInterruptionRequested
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if counts is None:
+            return
+        self.scanned.emit(paths, counts)
+
+        try:
+            utils.cache_textgrids(paths, workers=None, cancelled=self.isInterruptionRequested)
+        except Exception as e:
+            print(f'Could not cache the TextGrid files: {e}')
+
+class FilterWorker(QThread):
+    """
+    Run filter jobs in a background thread.
+
+    Only the latest submitted job matters: submitting a job cancels the
+    one that is running, which is then dropped without emitting anything.
+    A job is an object with a `run(cancelled)` method that returns its
+    result, or None when `cancelled()` becomes True.
+    """
+    job_done = Signal(object, object)
+    job_failed = Signal(object, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._pending = None
+        self._active = False
+
+    def submit(self, job):
+        with self._lock:
+            self._pending = job
+            if self._active:
+                return
+            self._active = True
+        # The thread may still be returning from its previous run
+        self.wait()
+        self.start()
+
+    def stop(self):
+        with self._lock:
+            self._pending = None
+        self.requestInterruption()
+        self.wait()
+
+    def _cancelled(self):
+        return self._pending is not None or self.isInterruptionRequested()
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            with self._lock:
+                job = self._pending
+                self._pending = None
+                if job is None:
+                    self._active = False
+                    return
+
+            try:
+                result = job.run(self._cancelled)
+            except Exception as e:
+                if not self._cancelled():
+                    self.job_failed.emit(job, str(e))
+                continue
+
+            if result is not None and not self._cancelled():
+                self.job_done.emit(job, result)
+
+        with self._lock:
+            self._active = False
+
+class SaveWorker(QThread):
+    """
+    Write the changed labels to their TextGrid files in a background thread.
+
+    The files are written in parallel by a pool of up to `max_workers`
+    threads, each of them through a temporary file that replaces the
+    original one. When the thread finishes, `saved` holds the paths that
+    were written and `errors` the messages of the files that failed. A
+    file that fails does not stop the others.
+    """
+    progress_changed = Signal(int, int)
+
+    max_workers = 8
+
+    def __init__(self, parent, changes, encodings=None):
+        """
+        Parameters
+        ----------
+        changes : dict of {pathlib.Path: list of textgrid_explorer.store.Cell}
+            The cells to be written, grouped by file.
+        encodings : dict of {pathlib.Path: str}, optional
+            The encoding the files were read in. The encoding of the files
+            missing here is detected again.
+        """
+        super().__init__(parent)
+        self.changes = changes
+        self.encodings = {} if encodings is None else encodings
+        self.saved = []
+        self.errors = []
+
+    def run(self):
+        total = len(self.changes)
+        self.progress_changed.emit(0, total)
+        if not total:
+            return
+
+        workers = min(self.max_workers, total)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(utils.write_textgrid_labels, path, cells, self.encodings.get(path)): path
+                for path, cells in self.changes.items()
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    future.result()
+                except (OSError, ValueError) as e:
+                    self.errors.append(str(e))
+                except Exception as e:
+                    self.errors.append(f'Could not save {futures[future]}: {e}')
+                else:
+                    self.saved.append(futures[future])
+                self.progress_changed.emit(done, total)
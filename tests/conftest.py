@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import sys
+from pathlib import Path
+
+package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
+sys.path.insert(0, str(package_dir))
+
+import pytest
+
+from textgrid_explorer import cache
+
+@pytest.fixture(autouse=True)
+def parse_cache(tmp_path_factory, monkeypatch):
+    """
+    Keep the parsed files of the tests out of the user cache.
+    """
+    parse_cache = cache.ParseCache(tmp_path_factory.mktemp('cache'))
+    monkeypatch.setattr(cache, '_default_cache', parse_cache)
+    return parse_cache
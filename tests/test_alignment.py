@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import sys
+from pathlib import Path
+
+package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
+sys.path.insert(0, str(package_dir))
+
+import mytextgrid
+import pytest
+
+from textgrid_explorer import utils
+
+# The times are exact binary fractions, so the expected matches do not
+# depend on rounding
+TOLERANCE = 1 / 64
+
+def write_textgrid(path, xmax, tiers):
+    """
+    Write a TextGrid with an interval tier for each (name, boundaries,
+    labels) and a point tier for each (name, {time: label}).
+    """
+    tg = mytextgrid.create_textgrid(0, xmax)
+    for name, *values in tiers:
+        if len(values) == 2:
+            tier = tg.insert_tier(name)
+            tier.insert_boundaries(*values[0])
+            for index, text in enumerate(values[1]):
+                tier.set_text_at_index(index, text)
+        else:
+            tier = tg.insert_tier(name, interval_tier=False)
+            for time, text in values[0].items():
+                tier.insert_point(time, text)
+    tg.write(path)
+
+@pytest.fixture
+def corpus(tmp_path):
+    # Both files have the same times, their rows must not mix
+    for name, labels in [('a.TextGrid', 'abc'), ('b.TextGrid', 'def')]:
+        write_textgrid(tmp_path / name, 4, [
+            ('word', [1, 2, 3], [labels[0], labels[1], '', labels[2]]),
+            ('syl', [1, 2, 3], [f'{labels[0]}1', f'{labels[1]}1', 'gap', f'{labels[2]}1']),
+            ('phone', [1 + 1 / 128, 2, 3.5], ['x', 'y', 'z', 'w']),
+            # A point at the boundary of two rows and one after an empty
+            # primary interval
+            ('tone', {1: 'H', 3: 'L'}),
+        ])
+    return tmp_path
+
+def aligned(source_dir, alignment, secondary_tiers=('syl', 'phone', 'tone')):
+    headers, rows = utils.create_aligned_tier_table(
+        source_dir, 'word', list(secondary_tiers), alignment=alignment, tolerance=TOLERANCE
+    )
+    assert headers == utils.table_headers('word', list(secondary_tiers))
+    return [
+        (row[0].name, *[None if item is None else item.text for item in row[1:]])
+        for row in rows
+    ]
+
+def test_exact_alignment(corpus):
+    assert aligned(corpus, 'exact') == [
+        ('a.TextGrid', 'a', 'a1', None, None),
+        ('a.TextGrid', 'b', 'b1', None, None),
+        ('a.TextGrid', 'c', 'c1', None, None),
+        ('b.TextGrid', 'd', 'd1', None, None),
+        ('b.TextGrid', 'e', 'e1', None, None),
+        ('b.TextGrid', 'f', 'f1', None, None),
+    ]
+
+def test_tolerance_alignment(corpus):
+    assert aligned(corpus, 'tolerance') == [
+        ('a.TextGrid', 'a', 'a1', 'x', None),
+        ('a.TextGrid', 'b', 'b1', 'y', None),
+        ('a.TextGrid', 'c', 'c1', None, None),
+        ('b.TextGrid', 'd', 'd1', 'x', None),
+        ('b.TextGrid', 'e', 'e1', 'y', None),
+        ('b.TextGrid', 'f', 'f1', None, None),
+    ]
+
+def test_overlap_alignment(corpus):
+    # A point at a boundary goes to the interval that starts there, and the
+    # first of two equal overlaps wins ('z' and 'w' for 'c')
+    assert aligned(corpus, 'overlap') == [
+        ('a.TextGrid', 'a', 'a1', 'x', None),
+        ('a.TextGrid', 'b', 'b1', 'y', 'H'),
+        ('a.TextGrid', 'c', 'c1', 'z', 'L'),
+        ('b.TextGrid', 'd', 'd1', 'x', None),
+        ('b.TextGrid', 'e', 'e1', 'y', 'H'),
+        ('b.TextGrid', 'f', 'f1', 'z', 'L'),
+    ]
+
+def test_tolerance_ties(tmp_path):
+    write_textgrid(tmp_path / 'a.TextGrid', 2, [
+        ('word', [1, 1 + TOLERANCE], ['', 'a', 'b']),
+        # Both points are TOLERANCE away from 'a' in total, the first wins;
+        # the window is closed
+        ('tone', {1: 'H', 1 + TOLERANCE / 2: 'L'}),
+        ('phone', [1 - TOLERANCE, 1 + 2 * TOLERANCE], ['', 'p', 'q']),
+    ])
+    assert aligned(tmp_path, 'tolerance', ['tone', 'phone']) == [
+        ('a.TextGrid', 'a', 'H', 'p'),
+        ('a.TextGrid', 'b', None, 'q'),
+    ]
+
+def test_unknown_alignment(corpus):
+    with pytest.raises(ValueError):
+        aligned(corpus, 'nearest')
+
+@pytest.fixture(scope='module')
+def large_corpus(tmp_path_factory):
+    """
+    A directory with enough files to be read by a pool of processes, with
+    boundaries that differ from file to file.
+    """
+    source_dir = tmp_path_factory.mktemp('large_corpus')
+    for i in range(utils.PARALLEL_MIN_FILES + 3):
+        primary_name = 'other' if i % 16 == 5 else 'word'
+        write_textgrid(source_dir / f'{i:03}.TextGrid', 4, [
+            (primary_name, [1, 2, 3], [f'w{i}', f'v{i}', '', f'u{i}']),
+            ('syl', [1, 2 + (i % 3) / 64, 3], ['s', 't', 'u', 'v']),
+            ('phone', [1 + (i % 4) / 128, 2.5], ['p', 'q', 'r']),
+            ('tone', {1 + (i % 2) / 128: 'H', 3: 'L'}),
+        ])
+    return source_dir
+
+def item_values(item):
+    if item is None:
+        return None
+    return (item.text, item.xmin, item.xmax, item.parent.index, item.index)
+
+@pytest.mark.parametrize('alignment', utils.ALIGNMENT_MODES)
+def test_parallel_alignment_matches_serial(large_corpus, alignment, tmp_path, monkeypatch):
+    # The worker processes use the parse cache of the environment
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+
+    tables = []
+    for workers in (1, 2):
+        headers, rows = utils.create_aligned_tier_table(
+            large_corpus, 'word', ['syl', 'phone', 'tone'], workers=workers,
+            alignment=alignment, tolerance=TOLERANCE,
+        )
+        tables.append((headers, [(row[0], *map(item_values, row[1:])) for row in rows]))
+
+    serial, parallel = tables
+    assert len(serial[1]) == 3 * (utils.PARALLEL_MIN_FILES - 4 + 3)
+    assert parallel == serial
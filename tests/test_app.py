@@ -13,13 +13,406 @@
 #
 #   You should have received a copy of the GNU General Public License along
 #   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import codecs
 import sys
 from pathlib import Path
 
 package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
 sys.path.insert(0, str(package_dir))
 
+import mytextgrid
+import pytest
+
 import textgrid_explorer
+from textgrid_explorer import textgrid_parser
+from textgrid_explorer import utils
+from textgrid_explorer.store import Cell
+
+# A file as written by Praat: quotes are doubled and labels may span lines
+PRAAT_TEXTGRID = '''File type = "ooTextFile"
+Object class = "TextGrid"
+
+xmin = 0
+xmax = 3
+tiers? <exists>
+size = 2
+item []:
+    item [1]:
+        class = "IntervalTier"
+        name = "word"
+        xmin = 0
+        xmax = 3
+        intervals: size = 3
+        intervals [1]:
+            xmin = 0
+            xmax = 1
+            text = "first line
+""quoted"" second"
+        intervals [2]:
+            xmin = 1
+            xmax = 2.25
+            text = "ñandú = ""1"""
+        intervals [3]:
+            xmin = 2.25
+            xmax = 3
+            text = ""
+    item [2]:
+        class = "TextTier"
+        name = "tone"
+        xmin = 0
+        xmax = 3
+        points: size = 1
+        points [1]:
+            number = 0.5
+            mark = "H*"
+'''
+
+PRAAT_SHORT_TEXTGRID = '''File type = "ooTextFile"
+Object class = "TextGrid"
+
+0
+3
+<exists>
+2
+"IntervalTier"
+"word"
+0
+3
+3
+0
+1
+"first line
+""quoted"" second"
+1
+2.25
+"ñandú = ""1"""
+2.25
+3
+""
+"TextTier"
+"tone"
+0
+3
+1
+0.5
+"H*"
+'''
+
+PRAAT_SUMMARY = [
+    (0, 'word', [
+        (0.0, 1.0, 'first line\n"quoted" second', 0),
+        (1.0, 2.25, 'ñandú = "1"', 1),
+        (2.25, 3.0, '', 2),
+    ]),
+    (1, 'tone', [(0.5, 0.5, 'H*', 0)]),
+]
+
+def create_textgrid():
+    tg = mytextgrid.create_textgrid(0, 3)
+    words = tg.insert_tier('word')
+    words.insert_boundaries(1, 2.25)
+    words.set_text_at_index(0, 'hola')
+    words.set_text_at_index(1, 'ñandú\nsegunda línea')
+    tones = tg.insert_tier('tone', interval_tier=False)
+    tones.insert_point(0.5, 'H*')
+    tones.insert_point(1.75, '')
+    return tg
+
+def summary(tg):
+    """
+    Return the tiers and items of a parsed TextGrid as plain values.
+    """
+    return [
+        (tier.index, tier.name, [(float(item.xmin), float(item.xmax), item.text, item.index) for item in tier])
+        for tier in tg
+    ]
+
+def test_parser_matches_mytextgrid(tmp_path):
+    path = tmp_path / 'long.TextGrid'
+    create_textgrid().write(path)
+
+    tg = textgrid_parser.parse_textgrid(path.read_bytes())
+    assert [tier.tier_class for tier in tg] == ['IntervalTier', 'TextTier']
+    assert summary(tg) == summary(utils.read_mytextgrid(path))
+
+def test_parser_reads_short_format(tmp_path):
+    long_path = tmp_path / 'long.TextGrid'
+    short_path = tmp_path / 'short.TextGrid'
+    create_textgrid().write(long_path)
+    create_textgrid().write(short_path, short_format=True)
+
+    tg = textgrid_parser.parse_textgrid(short_path.read_bytes())
+    assert summary(tg) == summary(utils.read_mytextgrid(long_path))
+
+def test_parser_reads_escaped_and_multiline_strings():
+    for text in [PRAAT_TEXTGRID, PRAAT_SHORT_TEXTGRID]:
+        buffer = text.encode('utf-8')
+        assert summary(textgrid_parser.parse_textgrid(buffer)) == PRAAT_SUMMARY
+        assert textgrid_parser.tier_names(buffer) == ['word', 'tone']
+
+def test_parser_rejects_unescaped_quotes(tmp_path):
+    # mytextgrid writes the quotes of the labels as they are, which leaves
+    # stray values; those files are read by mytextgrid instead
+    path = tmp_path / 'unescaped.TextGrid'
+    tg = create_textgrid()
+    tg[0].set_text_at_index(2, 'a "b" c')
+    tg.write(path)
+
+    with pytest.raises(textgrid_parser.TextGridSyntaxError):
+        textgrid_parser.parse_textgrid(path.read_bytes())
+    tg = utils.read_textgrid(path, use_cache=False)
+    assert summary(tg) == summary(utils.read_mytextgrid(path))
+
+def test_parser_reads_utf16(tmp_path):
+    path = tmp_path / 'long.TextGrid'
+    create_textgrid().write(path)
+    text = path.read_text(encoding='utf-8')
+
+    for encoding in ['utf-16', 'utf-16-le', 'utf-16-be']:
+        buffer = text.encode(encoding)
+        tg = textgrid_parser.parse_textgrid(buffer, textgrid_parser.sniff_encoding(buffer))
+        assert summary(tg) == summary(utils.read_mytextgrid(path))
+        assert textgrid_parser.tier_names(buffer, tg.encoding) == ['word', 'tone']
+
+@pytest.mark.parametrize('short_format', [False, True], ids=['long', 'short'])
+@pytest.mark.parametrize('encoding', ['utf-8', 'utf-16-le'])
+@pytest.mark.parametrize('chunk_size', [100, textgrid_parser.CHUNK_SIZE])
+def test_tier_names_skip_the_items(monkeypatch, short_format, encoding, chunk_size):
+    monkeypatch.setattr(textgrid_parser, 'CHUNK_SIZE', chunk_size)
+    # More labels than a skipped block, with quotes, newlines and empty labels
+    labels = [['', 'a "b"', '"', 'x\ny', '""'][i % 5] for i in range(2 * textgrid_parser.SKIP_BLOCK_SIZE + 3)]
+    tiers = [
+        ('IntervalTier', 'wörd', labels),
+        ('TextTier', 'tone "H"', labels[:5]),
+        ('IntervalTier', 'empty', []),
+    ]
+    buffer = textgrid_text(tiers, short_format).encode(encoding)
+
+    names = textgrid_parser.tier_names(buffer, encoding)
+    assert names == ['wörd', 'tone "H"', 'empty']
+    assert names == [tier.name for tier in textgrid_parser.parse_textgrid(buffer, encoding)]
+    assert textgrid_parser.tier_names(textgrid_text([], short_format).encode(encoding), encoding) == []
+
+def test_tier_names_reject_unescaped_quotes(tmp_path):
+    path = tmp_path / 'unescaped.TextGrid'
+    tg = create_textgrid()
+    tg[0].set_text_at_index(2, 'a "b" c')
+    tg.write(path)
+
+    with pytest.raises(textgrid_parser.TextGridSyntaxError):
+        textgrid_parser.tier_names(path.read_bytes())
+    # Read by mytextgrid instead
+    assert utils.read_tier_names(path) == ['word', 'tone']
+
+def test_scan_tier_names(tmp_path):
+    files = {
+        'a.TextGrid': textgrid_text([('IntervalTier', 'word', ['x']), ('IntervalTier', 'phone', ['x'])]),
+        # A name found twice in a file is counted once
+        'b.TextGrid': textgrid_text([('IntervalTier', 'word', ['x']), ('TextTier', 'tone', ['H']), ('IntervalTier', 'word', [])], short_format=True),
+        'c.TextGrid': 'not a TextGrid',
+        'd.TextGrid': textgrid_text([('IntervalTier', 'año', ['ñ']), ('IntervalTier', 'word', [])]),
+    }
+    for name, text in files.items():
+        (tmp_path / name).write_bytes(text.encode('latin-1'))
+    paths = utils.find_textgrid_paths(tmp_path)
+
+    progress = []
+    counts = utils.scan_tier_names(paths, progress=lambda done, total: progress.append((done, total)))
+    assert counts == {'word': 3, 'phone': 1, 'tone': 1, 'año': 1}
+    assert list(counts) == ['word', 'phone', 'tone', 'año']
+    assert progress == [(1, 4), (2, 4), (3, 4), (4, 4)]
+    assert utils.scan_tier_names(paths, cancelled=lambda: True) is None
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, textgrid_parser.CHUNK_SIZE])
+def test_utf16_transcoded_in_chunks(monkeypatch, chunk_size):
+    # Characters and surrogate pairs split between chunks
+    monkeypatch.setattr(textgrid_parser, 'CHUNK_SIZE', chunk_size)
+    text = PRAAT_TEXTGRID.replace('H*', 'H* 🎵 ñ')
+    for encoding, bom in [('utf-16-le', codecs.BOM_UTF16_LE), ('utf-16-be', b'')]:
+        buffer = bom + text.encode(encoding)
+        assert textgrid_parser._to_utf8(buffer, encoding) == text.encode('utf-8')
+
+def test_patch_multiline_and_escaped_labels(tmp_path):
+    path = tmp_path / 'praat.TextGrid'
+    path.write_bytes(PRAAT_TEXTGRID.encode('utf-8'))
+    tg = utils.read_textgrid(path, use_cache=False)
+    words = tg[0]
+
+    utils.write_textgrid_labels(path, [
+        label_cell(path, words[0], 'X'),
+        label_cell(path, words[1], 'dos\n"líneas"'),
+    ])
+
+    expected = PRAAT_TEXTGRID.replace(
+        'text = "first line\n""quoted"" second"', 'text = "X"'
+    ).replace(
+        'text = "ñandú = ""1"""', 'text = "dos\n""líneas"""'
+    )
+    assert path.read_bytes() == expected.encode('utf-8')
+    tg = utils.read_textgrid(path, use_cache=False)
+    assert [item.text for item in tg[0]] == ['X', 'dos\n"líneas"', '']
+
+@pytest.mark.parametrize('text', [PRAAT_TEXTGRID, PRAAT_SHORT_TEXTGRID], ids=['long', 'short'])
+@pytest.mark.parametrize('encoding, bom', [
+    ('utf-8', b''),
+    ('utf-16-le', codecs.BOM_UTF16_LE),
+    ('utf-16-be', b''),
+])
+@pytest.mark.parametrize('newline', ['\n', '\r\n'], ids=['lf', 'crlf'])
+@pytest.mark.parametrize('chunk_size', [textgrid_parser.CHUNK_SIZE, 5])
+def test_patch_round_trip(tmp_path, monkeypatch, text, encoding, bom, newline, chunk_size):
+    monkeypatch.setattr(textgrid_parser, 'CHUNK_SIZE', chunk_size)
+    text = text.replace('\n', newline)
+    original = bom + text.encode(encoding)
+    path = tmp_path / 'praat.TextGrid'
+    path.write_bytes(original)
+    tg = utils.read_textgrid(path, use_cache=False)
+    assert tg.encoding == encoding
+    # Shorter, longer and equally long labels
+    cells = [
+        label_cell(path, tg[0][0], 'X'),
+        label_cell(path, tg[0][1], 'ñandú = "uno, dos"'),
+        label_cell(path, tg[1][0], 'L-'),
+    ]
+
+    expected = bom + text.replace(
+        f'"first line{newline}""quoted"" second"', '"X"'
+    ).replace(
+        '"ñandú = ""1"""', '"ñandú = ""uno, dos"""'
+    ).replace(
+        '"H*"', '"L-"'
+    ).encode(encoding)
+    assert b''.join(textgrid_parser.patch_labels(original, cells, encoding)) == expected
+
+    utils.write_textgrid_labels(path, cells)
+    assert path.read_bytes() == expected
+    tg = utils.read_textgrid(path, use_cache=False)
+    assert [[item.text for item in tier] for tier in tg] == [['X', 'ñandú = "uno, dos"', ''], ['L-']]
+
+def test_patch_rejects_moved_items(tmp_path):
+    path = tmp_path / 'praat.TextGrid'
+    path.write_bytes(PRAAT_TEXTGRID.encode('utf-8'))
+    words = utils.read_textgrid(path, use_cache=False)[0]
+
+    for cell in [label_cell(path, words[1], 'X')._replace(xmin=1.5),
+                 label_cell(path, words[1], 'X')._replace(item_index=7),
+                 label_cell(path, words[1], 'X')._replace(tier_index=4)]:
+        with pytest.raises(ValueError):
+            utils.write_textgrid_labels(path, [cell])
+    assert path.read_bytes() == PRAAT_TEXTGRID.encode('utf-8')
+
+def test_replace_file(tmp_path):
+    path = tmp_path / 'a.TextGrid'
+    path.write_bytes(b'old')
+    path.chmod(0o640)
+
+    def fail(tmp_path):
+        Path(tmp_path).write_bytes(b'half')
+        raise OSError('disk full')
+
+    with pytest.raises(OSError):
+        utils.replace_file(path, fail)
+    assert path.read_bytes() == b'old'
+    assert list(tmp_path.iterdir()) == [path]
+
+    utils.replace_file(path, lambda tmp_path: Path(tmp_path).write_bytes(b'new'))
+    assert path.read_bytes() == b'new'
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert list(tmp_path.iterdir()) == [path]
+
+def test_rewrite_keeps_encoding(tmp_path):
+    # The unescaped quotes make the patcher give up and rewrite the file
+    tg = create_textgrid()
+    tg[0].set_text_at_index(2, 'a "b" c')
+    tg.write(tmp_path / 'utf8.TextGrid')
+    text = (tmp_path / 'utf8.TextGrid').read_text(encoding='utf-8').replace('\n', '\r\n')
+
+    for encoding, bom in [('latin-1', b''), ('utf-16-le', codecs.BOM_UTF16_LE), ('utf-16-be', b'')]:
+        path = tmp_path / f'{encoding}.TextGrid'
+        path.write_bytes(bom + text.encode(encoding))
+        words = utils.read_textgrid(path, use_cache=False)[0]
+        assert words[1].text == 'ñandú\nsegunda línea'
+
+        utils.write_textgrid_labels(path, [label_cell(path, words[0], 'año')])
+
+        data = path.read_bytes()
+        assert data.startswith(bom)
+        lines = data[len(bom):].decode(encoding)
+        assert lines.count('\n') == lines.count('\r\n') == text.count('\r\n')
+        tg = utils.read_textgrid(path, use_cache=False)
+        assert tg.encoding == encoding
+        assert [item.text for item in tg[0]] == ['año', 'ñandú\nsegunda línea', 'a "b" c']
+
+    path = tmp_path / 'latin-1.TextGrid'
+    words = utils.read_textgrid(path, use_cache=False)[0]
+    with pytest.raises(ValueError):
+        utils.write_textgrid_labels(path, [label_cell(path, words[0], '日本')])
+
+def test_legacy_encoding_past_sample(tmp_path, monkeypatch):
+    # The only byte that is not ASCII is far past the chardet sample
+    labels = ['a'] * 19999 + ['año']
+    path = tmp_path / 'latin-1.TextGrid'
+    path.write_bytes(textgrid_text([('IntervalTier', 'word', labels)]).encode('latin-1'))
+    assert path.read_bytes().index(b'a\xf1o') > 4 * utils.CHARDET_SAMPLE_SIZE
+
+    tg = utils.read_textgrid(path, use_cache=False)
+    assert tg is not None and tg[0][19999].text == 'año'
+
+    # Guesses that cannot decode the whole file are not trusted
+    class chardet:
+        def detect(sample):
+            return {'encoding': 'ascii', 'confidence': 1.0}
+
+    monkeypatch.setattr(utils, 'chardet', chardet)
+    path.write_bytes(path.read_bytes() + b'\n')
+    tg = utils.read_textgrid(path, use_cache=False)
+    assert tg.encoding == utils.LEGACY_ENCODING and tg[0][19999].text == 'año'
+
+def textgrid_text(tiers, short_format=False):
+    """
+    Return a TextGrid as Praat writes it, with one-second intervals and
+    points in the middle of each second.
+
+    Parameters
+    ----------
+    tiers : list of (str, str, list of str)
+        The class, the name and the labels of each tier.
+    """
+    def string(text):
+        return '"' + text.replace('"', '""') + '"'
+
+    # (depth, field name, value) of each line, without value for the
+    # lines that only appear in long format
+    xmax = max([len(labels) for _, _, labels in tiers], default=0)
+    lines = [(0, 'xmin =', 0), (0, 'xmax =', xmax), (0, 'tiers?', '<exists>'), (0, 'size =', len(tiers)), (0, 'item []:', None)]
+    for tier_index, (tier_class, name, labels) in enumerate(tiers, start=1):
+        kind = 'intervals' if tier_class == 'IntervalTier' else 'points'
+        lines += [
+            (1, f'item [{tier_index}]:', None),
+            (2, 'class =', string(tier_class)),
+            (2, 'name =', string(name)),
+            (2, 'xmin =', 0),
+            (2, 'xmax =', xmax),
+            (2, f'{kind}: size =', len(labels)),
+        ]
+        for i, text in enumerate(labels):
+            lines.append((2, f'{kind} [{i + 1}]:', None))
+            if kind == 'intervals':
+                lines += [(3, 'xmin =', i), (3, 'xmax =', i + 1), (3, 'text =', string(text))]
+            else:
+                lines += [(3, 'number =', i + 0.5), (3, 'mark =', string(text))]
+
+    if short_format:
+        body = [f'{value}\n' for _, _, value in lines if value is not None]
+    else:
+        body = [
+            '    ' * depth + (name if value is None else f'{name} {value}') + '\n'
+            for depth, name, value in lines
+        ]
+    return 'File type = "ooTextFile"\nObject class = "TextGrid"\n\n' + ''.join(body)
+
+def label_cell(path, item, text):
+    return Cell(path, item.parent.index, item.index, item.xmin, item.xmax, text, True)
 
 if __name__ == '__main__':
     textgrid_explorer.main()
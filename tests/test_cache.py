@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import sys
+from pathlib import Path
+
+package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
+sys.path.insert(0, str(package_dir))
+
+import os
+
+import mytextgrid
+
+from textgrid_explorer import cache
+from textgrid_explorer import utils
+
+def test_parse_cache_keeps_fingerprint_before_parsing(tmp_path):
+    parse_cache = cache.ParseCache(tmp_path / 'cache')
+    path = tmp_path / 'a.TextGrid'
+    path.write_text('old')
+    key = parse_cache.fingerprint(path)
+
+    # The file changes while it is parsed
+    path.write_text('changed')
+    os.utime(path, ns=(key[2] + 1, key[2] + 1))
+    parse_cache.put(path, 'parsed from old', key)
+    assert parse_cache.get(path) is None
+
+    parse_cache.put(path, 'parsed from changed', parse_cache.fingerprint(path))
+    assert parse_cache.get(path) == 'parsed from changed'
+
+def test_parse_cache_checks_entries_without_loading(tmp_path, monkeypatch):
+    parse_cache = cache.ParseCache(tmp_path / 'cache')
+    path = tmp_path / 'a.TextGrid'
+    path.write_text('a')
+    assert not parse_cache.has(path)
+    parse_cache.put(path, 'parsed')
+
+    loaded = []
+    def load(f, load=cache.pickle.load):
+        loaded.append(load(f))
+        return loaded[-1]
+
+    monkeypatch.setattr(cache.pickle, 'load', load)
+    assert parse_cache.has(path)
+    assert loaded == [(cache.CACHE_VERSION, parse_cache.fingerprint(path))]
+
+    path.write_text('changed')
+    assert not parse_cache.has(path)
+    assert parse_cache.get(path) is None
+
+def test_textgrids_cached_ahead(tmp_path, monkeypatch):
+    paths = []
+    for name in ['a', 'b', 'c']:
+        path = tmp_path / f'{name}.TextGrid'
+        tg = mytextgrid.create_textgrid(0, 1)
+        tg.insert_tier(name)
+        tg.write(path)
+        paths.append(path)
+
+    assert not utils.cache_textgrids(paths, cancelled=lambda: True)
+    assert utils.cache_textgrids(paths)
+    parse_cache = cache.default_cache()
+    assert all(parse_cache.has(path) for path in paths)
+
+    # Building a table afterwards parses nothing
+    monkeypatch.setattr(utils, '_parse_textgrid', None)
+    assert [[tier.name for tier in utils.read_textgrid(path)] for path in paths] == [['a'], ['b'], ['c']]
+    assert utils.cache_textgrids(paths)
+
+def test_known_encodings_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, 'MAX_KNOWN_ENCODINGS', 2)
+    monkeypatch.setattr(utils, '_file_encodings', type(utils._file_encodings)())
+    paths = [tmp_path / f'{i}.TextGrid' for i in range(3)]
+    for path in paths:
+        path.write_bytes(b'File type')
+
+    utils.remember_encoding(paths[0], 'latin-1')
+    utils.remember_encoding(paths[1], 'latin-1')
+    assert utils.detect_encoding(paths[0], b'') == 'latin-1'
+    utils.remember_encoding(paths[2], 'latin-1')
+
+    assert list(utils._file_encodings) == [os.path.abspath(path) for path in (paths[0], paths[2])]
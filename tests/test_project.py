@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import sys
+from pathlib import Path
+
+package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
+sys.path.insert(0, str(package_dir))
+
+import os
+
+import mytextgrid
+import pytest
+
+from textgrid_explorer import cache
+from textgrid_explorer import project
+from textgrid_explorer import utils
+from textgrid_explorer.store import TableStore
+
+def write_textgrid(path, words, phones):
+    """
+    Write a TextGrid with a 'word' and a 'phone' tier of one-second
+    intervals.
+    """
+    tg = mytextgrid.create_textgrid(0, len(words))
+    for name, labels in [('word', words), ('phone', phones)]:
+        tier = tg.insert_tier(name)
+        tier.insert_boundaries(*range(1, len(labels)))
+        for index, text in enumerate(labels):
+            tier.set_text_at_index(index, text)
+    tg.write(path)
+
+@pytest.fixture
+def saved_project(tmp_path):
+    """
+    Build and save the project of a small corpus. Returns the project, the
+    store and the TextGrid directory.
+    """
+    src_dir = tmp_path / 'corpus'
+    src_dir.mkdir()
+    write_textgrid(src_dir / 'a.TextGrid', ['uno', 'dos'], ['u', 'd'])
+    write_textgrid(src_dir / 'b.TextGrid', ['tres', '', 'cuatro'], ['t', 'x', 'k'])
+    write_textgrid(src_dir / 'c.TextGrid', ['', ''], ['', ''])
+    write_textgrid(src_dir / 'skip.TextGrid', ['cinco'], ['c'])
+
+    settings = {
+        'src_dir': str(src_dir),
+        'include': [],
+        'exclude': ['skip.*'],
+        'follow_symlinks': False,
+        'paths': None,
+        'primary_tier': 'word',
+        'secondary_tiers': ['phone'],
+        'alignment': 'exact',
+        'tolerance': utils.DEFAULT_TOLERANCE,
+    }
+    paths = utils.find_textgrid_paths(src_dir, exclude=settings['exclude'])
+    encodings = {}
+    rows = [row for file_rows in utils.iter_aligned_rows(paths, 'word', ['phone'], encodings=encodings) for row in file_rows]
+    store = TableStore.from_rows(utils.table_headers('word', ['phone']), rows)
+    saved = project.Project(settings, tmp_path / f'test{project.PROJECT_SUFFIX}', encodings=encodings)
+    saved.update_fingerprints(paths)
+
+    # An edit that has not been written to its file
+    store.set_label(3, 2, 'K')
+    store.set_dirty(3, 2, True)
+    project.save_project(saved, store)
+    return saved, store, src_dir
+
+def table(store):
+    return [
+        (store.file_path(row).name, *[store.cell(row, column) for column in range(1, len(store.headers))])
+        for row in range(len(store))
+    ]
+
+def load(saved_project):
+    saved, _, _ = saved_project
+    loaded, store = project.load_project(saved.path)
+    assert loaded.settings == saved.settings
+    return loaded, store
+
+def test_round_trip(saved_project, monkeypatch):
+    saved, store, src_dir = saved_project
+    # Nothing is parsed again
+    monkeypatch.setattr(utils, 'read_textgrid', None)
+
+    loaded, loaded_store = load(saved_project)
+    assert (loaded.reread_files, loaded.lost_edits) == (0, 0)
+    assert loaded.fingerprints == saved.fingerprints
+    assert loaded.encodings == saved.encodings == {
+        src_dir / name: 'utf-8' for name in ['a.TextGrid', 'b.TextGrid', 'c.TextGrid']
+    }
+    assert loaded_store.headers == store.headers
+    assert table(loaded_store) == table(store)
+    assert loaded_store.dirty_files() == {src_dir / 'b.TextGrid': [(3, 2)]}
+
+def test_modified_file(saved_project):
+    _, store, src_dir = saved_project
+    path = src_dir / 'a.TextGrid'
+    write_textgrid(path, ['uno', 'dos', 'seis'], ['u', 'd', 's'])
+
+    loaded, loaded_store = load(saved_project)
+    assert loaded.reread_files == 1
+    assert loaded.fingerprints[path] == project.file_fingerprint(path)
+    assert [loaded_store.display_text(row, 1) for row in range(len(loaded_store))] == [
+        'uno', 'dos', 'seis', 'tres', 'cuatro',
+    ]
+    assert table(loaded_store)[3:] == table(store)[2:]
+
+def test_removed_and_new_files(saved_project):
+    _, store, src_dir = saved_project
+    os.remove(src_dir / 'b.TextGrid')
+    write_textgrid(src_dir / 'd.TextGrid', ['siete'], ['s'])
+
+    loaded, loaded_store = load(saved_project)
+    assert loaded.reread_files == 1
+    assert src_dir / 'b.TextGrid' not in loaded.fingerprints
+    assert table(loaded_store)[:2] == table(store)[:2]
+    assert [row[0] for row in table(loaded_store)] == ['a.TextGrid', 'a.TextGrid', 'd.TextGrid']
+    assert loaded_store.dirty_files() == {}
+
+def test_pending_edit_on_modified_file(saved_project):
+    _, _, src_dir = saved_project
+    path = src_dir / 'b.TextGrid'
+
+    # Another label of the file changed on disk, the edited item is still
+    # in its place
+    write_textgrid(path, ['tres', '', 'cuatro'], ['T', 'x', 'k'])
+    loaded, loaded_store = load(saved_project)
+    assert (loaded.reread_files, loaded.lost_edits) == (1, 0)
+    assert [loaded_store.display_text(row, 2) for row in range(len(loaded_store))] == ['u', 'd', 'T', 'K']
+    assert loaded_store.dirty_files() == {path: [(3, 2)]}
+
+    # The edited item is gone
+    write_textgrid(path, ['tres', 'cuatro'], ['t', 'k'])
+    loaded, loaded_store = load(saved_project)
+    assert (loaded.reread_files, loaded.lost_edits) == (1, 1)
+    assert [loaded_store.display_text(row, 2) for row in range(len(loaded_store))] == ['u', 'd', 't', 'k']
+    assert loaded_store.dirty_files() == {}
+
+def test_encodings(saved_project):
+    _, _, src_dir = saved_project
+    path = src_dir / 'b.TextGrid'
+    write_textgrid(path, ['tres', 'año', 'cuatro'], ['t', 'x', 'k'])
+    path.write_bytes(path.read_text(encoding='utf-8').encode('latin-1'))
+
+    # The encoding of a file read again is detected again
+    loaded, loaded_store = load(saved_project)
+    encoding = loaded.encodings[path]
+    assert encoding not in ('utf-8', 'ascii')
+    assert loaded.file_encoding(path) == encoding
+    assert loaded.file_encoding(src_dir / 'a.TextGrid') == 'utf-8'
+    assert loaded_store.display_text(3, 1) == 'año'
+
+    # Until the file changes again
+    os.utime(path, ns=(0, 0))
+    assert loaded.file_encoding(path) is None
+
+def test_fingerprint_matches_parse_cache(saved_project):
+    saved, _, src_dir = saved_project
+    path = src_dir / 'a.TextGrid'
+    assert saved.fingerprints[path] == cache.ParseCache.fingerprint(path)[1:]
+    assert project.file_fingerprint(src_dir / 'missing.TextGrid') is None
+
+def test_invalid_project_file(tmp_path):
+    path = tmp_path / f'test{project.PROJECT_SUFFIX}'
+    path.write_bytes(b'not a database')
+    with pytest.raises(project.ProjectError):
+        project.load_project(path)
@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import sys
+from pathlib import Path
+
+package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
+sys.path.insert(0, str(package_dir))
+
+import re
+import time
+from array import array
+from types import SimpleNamespace
+
+import pytest
+from PySide6.QtCore import QCoreApplication
+
+from textgrid_explorer.models import ColumnFilter, FilterJob, TGFilterProxyModel, TGTableModel
+from textgrid_explorer.store import Cell, ColumnData, ColumnTextIndex, SortKey, TableStore
+
+def create_store(*files, tiers=('word',)):
+    """
+    Return a store with a column for each tier and, for each file, a
+    (name, labels of the first tier, labels of the second tier...) tuple.
+    """
+    store = TableStore(['file', *tiers])
+    for name, *columns in files:
+        store.append_file_columns(Path(name), [
+            column_data(labels, tier_index) for tier_index, labels in enumerate(columns)
+        ])
+    return store
+
+def column_data(labels, tier_index=0):
+    """
+    Return the cells of a tier, the n-th label going from n to n + 1 s.
+    """
+    n = len(labels)
+    return ColumnData(
+        labels,
+        array('d', range(n)),
+        array('d', range(1, n + 1)),
+        array('h', [tier_index if text is not None else -1 for text in labels]),
+        array('l', [row if text is not None else -1 for row, text in enumerate(labels)]),
+    )
+
+def postings(text_index):
+    return {text: list(rows) for text, rows in text_index.postings.items()}
+
+def test_set_labels_updates_index_once():
+    store = create_store(('a.TextGrid', ['x', 'y', 'x', None, 'z', 'x']))
+    store.text_index(1)
+    store.sort_ranks(1)
+
+    store.set_labels([(0, 1, 'y'), (2, 1, 'new'), (4, 1, 'x'), (2, 1, 'w'), (5, 1, 'x')])
+
+    assert store.column_texts(1) == ['y', 'y', 'w', '', 'x', 'x']
+    assert postings(store.text_index(1)) == postings(ColumnTextIndex(store.column_texts(1)))
+    assert 'z' not in store.text_index(1).postings
+    assert store.sort_ranks(1) == (array('l', [3, 3, 1, 0, 2, 2]), 4)
+
+def test_append_file_columns():
+    store = create_store(
+        ('b.TextGrid', ['x', 'y'], ['1', None]),
+        ('a.TextGrid', ['z'], ['2']),
+        tiers=('word', 'phone'),
+    )
+
+    assert len(store) == 3
+    assert [store.file_path(row).name for row in range(3)] == ['b.TextGrid', 'b.TextGrid', 'a.TextGrid']
+    assert store.file_segments() == [(Path('b.TextGrid'), 0, 2), (Path('a.TextGrid'), 2, 3)]
+    assert store.column_texts(0) == ['b.TextGrid', 'b.TextGrid', 'a.TextGrid']
+    assert store.column_texts(2) == ['1', '', '2']
+    assert store.is_missing(1, 2) and not store.is_missing(1, 1)
+    assert store.cell(1, 2) is None
+    assert store.cell(2, 2) == Cell(Path('a.TextGrid'), 1, 0, 0.0, 1.0, '2', False)
+
+    data = store.file_columns(0, 2)
+    assert data[0].labels == ['x', 'y'] and list(data[1].item_index) == [0, -1]
+    copy = TableStore(store.headers)
+    copy.append_file_columns(Path('b.TextGrid'), data)
+    assert [copy.cell(row, 1) for row in range(2)] == [store.cell(row, 1) for row in range(2)]
+
+def test_dirty_cells():
+    store = create_store(
+        ('a.TextGrid', ['x', 'y', 'z'], ['1', '2', '3']),
+        ('b.TextGrid', ['w'], ['4']),
+        tiers=('word', 'phone'),
+    )
+    assert store.dirty_files() == {}
+
+    store.set_label(2, 2, 'changed')
+    store.set_dirty(2, 2, True)
+    store.set_dirty(0, 1, True)
+    store.set_dirty(3, 1, True)
+    store.set_dirty(3, 1, True)
+
+    assert store.label(2, 2) == 'changed'
+    assert store.is_dirty(2, 2) and not store.is_dirty(2, 1) and not store.is_dirty(2, 0)
+    assert store.cell(2, 2).modified
+    assert len(store.dirty) == 3
+    assert store.dirty_files() == {
+        Path('a.TextGrid'): [(0, 1), (2, 2)],
+        Path('b.TextGrid'): [(3, 1)],
+    }
+
+    store.set_dirty(3, 1, False)
+    assert not store.is_file_dirty(Path('b.TextGrid'))
+    assert store.is_file_dirty(Path('a.TextGrid'))
+    assert store.dirty_files() == {Path('a.TextGrid'): [(0, 1), (2, 2)]}
+
+def test_mark_saved_clears_saved_cells():
+    store = create_store(('a.TextGrid', ['x', 'y', 'z']), ('b.TextGrid', ['w']))
+    model = TGTableModel()
+    model.set_store(store)
+    edited = []
+    model.labels_edited.connect(edited.append)
+
+    assert model.set_labels([(0, 1, 'X'), (1, 1, 'y'), (2, 1, 'Z'), (3, 1, 'W'), (3, 0, 'c.TextGrid')]) == 3
+    assert edited == [[(0, 1), (2, 1), (3, 1)]]
+    saved = [(row, 1, store.label(row, 1)) for row in (0, 2, 3)]
+
+    # Edited again while it was being saved
+    model.set_labels([(2, 1, 'again')])
+    assert model.mark_saved(saved) == [(0, 1), (3, 1)]
+
+    assert store.dirty_files() == {Path('a.TextGrid'): [(2, 1)]}
+    assert not store.is_dirty(0, 1) and store.is_dirty(2, 1)
+    assert not store.is_file_dirty(Path('b.TextGrid'))
+
+def test_search(monkeypatch):
+    store = create_store(
+        ('a.TextGrid', ['casa', 'perro', None, 'cosa'], ['k', 'p', 'x', 'k']),
+        ('b.TextGrid', ['gato', 'casas'], ['g', 'k']),
+        tiers=('word', 'phone'),
+    )
+    pattern = re.compile('^c.sa')
+
+    assert store.search(1, pattern) == [0, 3, 5]
+    assert store.search(0, re.compile('^b')) == [4, 5]
+    # Missing cells are searched as empty strings
+    assert store.search(1, re.compile('^$')) == [2]
+    assert store.find_all(re.compile('[kp]'), [1, 2]) == [(0, 2), (1, 1), (1, 2), (3, 2), (5, 2)]
+
+    store.set_labels([(0, 1, 'mesa'), (4, 1, 'cosas')])
+    assert store.search(1, pattern) == [3, 4, 5]
+    assert store.rows_for(1, ['cosa', 'mesa']) == [0, 3]
+    assert store.matching_texts(1, pattern) == {'cosa', 'cosas', 'casas'}
+
+    # The same results once the strings are narrowed down by trigrams
+    monkeypatch.setattr(ColumnTextIndex, 'trigram_threshold', 1)
+    store._text_indexes.clear()
+    store.set_label(1, 1, 'cosa')
+    assert store.search(1, pattern) == [1, 3, 4, 5]
+    store.set_labels([(1, 1, 'perro')])
+    assert store.search(1, pattern) == [3, 4, 5]
+    assert store.search(1, re.compile('rr')) == [1]
+
+def test_sort_rows_is_stable():
+    store = create_store(
+        ('file10.TextGrid', ['b', 'a'], ['1', '2']),
+        ('file2.TextGrid', ['a', None, 'b'], ['2', '1', '1']),
+        tiers=('word', 'phone'),
+    )
+    rows = range(len(store))
+
+    assert list(store.sort_rows(rows, [SortKey(1)])) == [3, 1, 2, 0, 4]
+    assert list(store.sort_rows(rows, [SortKey(1, descending=True)])) == [0, 4, 1, 2, 3]
+    # Natural order of the file names, then the rows of a file keep theirs
+    assert list(store.sort_rows(rows, [SortKey(0)])) == [2, 3, 4, 0, 1]
+    assert list(store.sort_rows(rows, [SortKey(2), SortKey(1, descending=True)])) == [0, 4, 3, 1, 2]
+    assert list(store.sort_rows(rows, [SortKey(1, 'xmin', True)])) == [4, 1, 3, 0, 2]
+    assert list(store.sort_rows([4, 0, 2, 1, 3], [SortKey(2)])) == [4, 0, 3, 2, 1]
+    assert list(store.sort_rows([4, 0, 2], [])) == [4, 0, 2]
+
+    store.set_labels([(3, 1, 'c')])
+    assert list(store.sort_rows(rows, [SortKey(1)])) == [1, 2, 0, 4, 3]
+
+def test_filter_proxy_pages_the_whole_store(monkeypatch):
+    monkeypatch.setattr(TGTableModel, 'page_size', 3)
+    store = create_store(('a.TextGrid', ['a', 'b'] * 5))
+    model = TGTableModel()
+    model.set_store(store)
+    proxy = TGFilterProxyModel()
+    proxy.setSourceModel(model)
+    assert (model.rowCount(), proxy.rowCount(), proxy.total_row_count()) == (3, 3, 10)
+
+    # The filter sees the rows the source model has not fetched
+    proxy.set_filters([(1, '^b$')])
+    assert model.rowCount() == 3
+    assert (proxy.rowCount(), proxy.total_row_count()) == (3, 5)
+    assert [proxy.mapToSource(proxy.index(i, 1)).row() for i in range(3)] == [1, 3, 5]
+    assert (proxy.proxy_row(9), proxy.proxy_row(8)) == (4, -1)
+    assert not proxy.mapFromSource(model.index(9, 1)).isValid()
+
+    assert proxy.canFetchMore()
+    proxy.fetchMore()
+    assert proxy.rowCount() == 5 and not proxy.canFetchMore()
+    assert proxy.mapFromSource(model.index(9, 1)).row() == 4
+
+    # Sorting keeps the fetched rows
+    proxy.set_sort_keys([SortKey(1, 'xmin', True)])
+    assert model.rowCount() == 3 and proxy.rowCount() == 5
+    assert [proxy.mapToSource(proxy.index(i, 1)).row() for i in range(5)] == [9, 7, 5, 3, 1]
+
+    # Rows appended to the store are filtered and sorted too
+    tier = SimpleNamespace(index=0)
+    model.append_data([
+        [Path('b.TextGrid'), SimpleNamespace(text=text, xmin=i, xmax=i + 1, parent=tier, index=i)]
+        for i, text in enumerate(['b', 'c', 'b'])
+    ])
+    assert model.rowCount() == 3
+    assert proxy.total_row_count() == 7
+    assert [proxy.mapToSource(proxy.index(i, 1)).row() for i in range(proxy.rowCount())] == [9, 7, 5, 3, 12]
+
+    # Edits of rows fetched by the proxy only are reported
+    changed = []
+    proxy.dataChanged.connect(lambda top_left, bottom_right: changed.append(top_left.row()))
+    model.set_labels([(9, 1, 'bb')])
+    assert changed == [0]
+
+def filter_store():
+    return create_store(
+        ('a.TextGrid', ['casa', 'perro', None, 'cosa'], ['k', 'p', 'x', 'k']),
+        ('b.TextGrid', ['gato', 'casas'], ['g', 'k']),
+        tiers=('word', 'phone'),
+    )
+
+def run_filter_job(store, filters, mode):
+    filters = [ColumnFilter(*f) for f in filters]
+    patterns = [re.compile(f.pattern) for f in filters]
+    return list(FilterJob(store, len(store), filters, patterns, mode).run())
+
+def test_filter_job_modes():
+    store = filter_store()
+    filters = [(1, 'a$'), (2, '^k$')]
+
+    assert run_filter_job(store, filters, 'and') == [0, 3]
+    assert run_filter_job(store, filters, 'or') == [0, 3, 5]
+    assert run_filter_job(store, filters[:1], 'and') == [0, 3]
+    assert run_filter_job(store, [], 'or') == list(range(6))
+    # Missing cells are filtered as empty strings
+    assert run_filter_job(store, [(1, '^$'), (2, 'x')], 'and') == [2]
+
+def test_filter_job_cancelled():
+    store = filter_store()
+    filters = [ColumnFilter(1, 'a')]
+    job = FilterJob(store, len(store), filters, [re.compile('a')], 'and')
+    assert job.run(lambda: True) is None
+
+def filter_proxy(store):
+    model = TGTableModel()
+    model.set_store(store)
+    proxy = TGFilterProxyModel()
+    proxy.setSourceModel(model)
+    return proxy
+
+def visible_rows(proxy):
+    return [proxy.mapToSource(proxy.index(i, 0)).row() for i in range(proxy.rowCount())]
+
+def test_filter_proxy_narrows_matched_texts(monkeypatch):
+    store = filter_store()
+    proxy = filter_proxy(store)
+    candidates = []
+    matching_texts = store.matching_texts
+    def record_candidates(column, pattern, texts=None):
+        candidates.append(None if texts is None else sorted(texts))
+        return matching_texts(column, pattern, texts)
+    monkeypatch.setattr(store, 'matching_texts', record_candidates)
+
+    proxy.set_filters([(1, 'as')])
+    assert visible_rows(proxy) == [0, 5]
+
+    # Only the texts matched by the filter it extends are tested again
+    job = proxy._make_job([(1, 'asas')], 'and')
+    assert list(job.run()) == [5]
+    # Unchanged filters reuse their texts
+    job = proxy._make_job([(1, 'as'), (2, 'k')], 'or')
+    assert list(job.run()) == [0, 3, 5]
+    # A filter that is not a literal extension is tested on all the texts
+    job = proxy._make_job([(1, 'as|ro')], 'and')
+    assert list(job.run()) == [0, 1, 5]
+    assert candidates == [None, ['casa', 'casas'], None, None]
+
+    # Edits make the matched texts stale
+    proxy.sourceModel().set_labels([(1, 1, 'asado')])
+    candidates.clear()
+    proxy._make_job([(1, 'asa')], 'and').run()
+    assert candidates == [None]
+
+def wait_for_filters(proxy):
+    deadline = time.monotonic() + 10
+    while proxy.is_filtering():
+        assert time.monotonic() < deadline
+        QCoreApplication.processEvents()
+
+@pytest.fixture
+def core_app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+def test_filter_proxy_requests(core_app):
+    proxy = filter_proxy(filter_store())
+    layouts = []
+    proxy.layoutChanged.connect(lambda: layouts.append(visible_rows(proxy)))
+    try:
+        # A new request cancels the pending one, whose rows are never shown
+        proxy.request_filters([(1, 'o')])
+        proxy.request_filters([(1, 'as'), (2, 'k')], 'and')
+        assert proxy.is_filtering()
+        wait_for_filters(proxy)
+        assert layouts == [[0, 5]]
+        assert proxy.filters() == ([ColumnFilter(1, 'as'), ColumnFilter(2, 'k')], 'and')
+
+        # A stopped request leaves the rows as they are
+        proxy.request_filters([(1, 'o')])
+        proxy.stop_filtering()
+        assert not proxy.is_filtering()
+        QCoreApplication.processEvents()
+        assert layouts == [[0, 5]]
+    finally:
+        proxy.stop_filtering()
+
+def test_filter_proxy_reports_failures(core_app, monkeypatch):
+    store = filter_store()
+    proxy = filter_proxy(store)
+    def matching_texts(column, pattern, texts=None):
+        raise MemoryError('out of memory')
+    monkeypatch.setattr(store, 'matching_texts', matching_texts)
+    errors = []
+    proxy.filter_failed.connect(errors.append)
+    try:
+        proxy.request_filters([(1, 'o')])
+        wait_for_filters(proxy)
+        assert errors == ['out of memory']
+        assert visible_rows(proxy) == list(range(6))
+    finally:
+        proxy.stop_filtering()
+
+def test_find_all_keeps_matches_until_data_changes():
+    model = TGTableModel()
+    model.set_store(filter_store())
+    matches = model.find_all('as', [1])
+    assert matches == [(0, 1), (5, 1)]
+    assert model.find_all('as', [1]) is matches
+    assert model.find_all('as', [1, 2]) is not matches
+
+    model.set_labels([(1, 1, 'pasa')])
+    assert model.find_all('as', [1]) == [(0, 1), (1, 1), (5, 1)]
+
+    tier = SimpleNamespace(index=0)
+    model.append_data([[Path('c.TextGrid'), SimpleNamespace(text='asa', xmin=0, xmax=1, parent=tier, index=0), None]])
+    assert model.find_all('as', [1]) == [(0, 1), (1, 1), (5, 1), (6, 1)]
+
+    model.set_store(filter_store())
+    assert model.find_all('as', [1]) == [(0, 1), (5, 1)]
+    with pytest.raises(re.error):
+        model.find_all('as(', [1])
+
+def test_set_labels_coalesces_data_changed(monkeypatch):
+    monkeypatch.setattr(TGTableModel, 'page_size', 2)
+    store = create_store(
+        ('a.TextGrid', list('abcdefgh'), list('abcdefgh')),
+        tiers=('word', 'phone'),
+    )
+    model = TGTableModel()
+    model.set_store(store)
+    ranges = []
+    model.dataChanged.connect(
+        lambda top_left, bottom_right: ranges.append(
+            (top_left.column(), top_left.row(), bottom_right.column(), bottom_right.row())
+        )
+    )
+
+    # Adjacent rows in any order make one range per column, unchanged
+    # labels split them; the rows the views have not fetched are included
+    model.set_labels([
+        (2, 1, 'C'), (0, 1, 'A'), (1, 1, 'B'),
+        (5, 1, 'F'), (6, 1, 'g'), (7, 1, 'H'),
+        (4, 2, 'E'), (3, 2, 'D'),
+    ])
+    assert sorted(ranges) == [(1, 0, 1, 2), (1, 5, 1, 5), (1, 7, 1, 7), (2, 3, 2, 4)]
+
+    ranges.clear()
+    model.mark_saved([(0, 1, 'A'), (1, 1, 'B'), (7, 1, 'H'), (2, 1, 'stale')])
+    assert sorted(ranges) == [(1, 0, 1, 1), (1, 7, 1, 7)]
+
+    ranges.clear()
+    assert model.set_labels([(0, 1, 'A'), (1, 0, 'b.TextGrid')]) == 0
+    assert ranges == []
+
+def test_replace_all_dry_run():
+    store = create_store(
+        ('a.TextGrid', ['casa', 'perro', None, 'cosa'], ['k', 'p', 'x', None]),
+        ('b.TextGrid', ['gato', 'casas'], ['g', 'k']),
+        tiers=('word', 'phone'),
+    )
+    model = TGTableModel()
+    model.set_store(store)
+    labels = [list(column.labels) for column in store.columns[1:]]
+    signals = []
+    model.dataChanged.connect(lambda *args: signals.append('dataChanged'))
+    model.labels_edited.connect(lambda cells: signals.append('labels_edited'))
+
+    summary = model.replace_all('s', 'z', 1, dry_run=True, sample_size=1)
+    assert summary == (3, [('casa', 'caza')])
+    # Labels copied to another column, missing cells are skipped
+    summary = model.replace_all('^c(.).*', r'\1', 1, 2, dry_run=True)
+    assert summary == (2, [('k', 'a'), ('k', 'a')])
+
+    assert [list(column.labels) for column in store.columns[1:]] == labels
+    assert not store.dirty and store.dirty_files() == {}
+    assert signals == []
+
+    assert model.replace_all('s', 'z', 1, sample_size=1) == (3, [('casa', 'caza')])
+    assert store.columns[1].labels == ['caza', 'perro', None, 'coza', 'gato', 'cazaz']
+    assert store.dirty_files() == {
+        Path('a.TextGrid'): [(0, 1), (3, 1)],
+        Path('b.TextGrid'): [(5, 1)],
+    }
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import sys
+from pathlib import Path
+
+package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
+sys.path.insert(0, str(package_dir))
+
+import re
+
+import pytest
+
+from textgrid_explorer.trigrams import TrigramIndex, is_literal_extension, required_literals
+
+TEXTS = [
+    '', 'a', 'ca', 'sa', 'casa', 'caza', 'cosa', 'cosas', 'casas', 'casasa',
+    'CASA', 'Casa', 'caSA', 'ca sa', 'cxsa', 'aab', 'aaab', 'ab', 'cd',
+    'abcd', 'perro', 'ca.sa', 'ca{2}', 'ñandú', 'cañas',
+]
+
+@pytest.mark.parametrize('pattern, flags, literals', [
+    ('casa', 0, ['casa']),
+    ('^casa$', 0, ['casa']),
+    # Alternatives
+    ('casa|perro', 0, []),
+    ('ca(s|z)a', 0, ['ca', 'a']),
+    ('c(?:o|a)sas?', 0, ['c', 'sa']),
+    # Optional and repeated groups
+    ('ca(sa)?s', 0, ['ca', 's']),
+    ('ca(sa)*', 0, ['ca']),
+    ('(sa)+s', 0, ['sa', 's']),
+    ('a{2}b', 0, ['a', 'b']),
+    ('ca.sa', 0, ['ca', 'sa']),
+    # Character classes
+    ('c[aeo]sa', 0, ['c', 'sa']),
+    ('\\wasa[^x]', 0, ['asa']),
+    # Case-insensitive patterns and groups
+    ('casa', re.IGNORECASE, []),
+    ('(?i)casa', 0, []),
+    ('ca(?i:SA)s', 0, ['ca', 's']),
+    ('ñan', 0, ['ñan']),
+])
+def test_required_literals(pattern, flags, literals):
+    compiled = re.compile(pattern, flags)
+    assert required_literals(compiled) == literals
+
+    # The literals are in every text that matches
+    for text in TEXTS:
+        if compiled.search(text):
+            assert all(literal in text for literal in literals), text
+
+    # The prefilter never drops a matching text
+    matched = {text for text in TEXTS if compiled.search(text)}
+    candidates = TrigramIndex(TEXTS).candidates(compiled)
+    if candidates is not None:
+        assert matched <= candidates
+
+@pytest.mark.parametrize('old, new, expected', [
+    ('ca', 'cas', True),
+    ('ca', 'casa', True),
+    ('^ca', '^cas', True),
+    ('c[aeo]', 'c[aeo]s', True),
+    ('ca(sa)?', 'ca(sa)?s', True),
+    ('(?i)ca', '(?i)cas', True),
+    ('ca', 'ca', False),
+    ('ca', 'co', False),
+    # The suffix changes the end of the old pattern
+    ('cas', 'cas?', False),
+    ('ca', 'ca*', False),
+    ('a{2', 'a{2}', False),
+    ('ca|co', 'ca|cos', False),
+    ('ca(s', 'ca(s)', False),
+    # Not a literal
+    ('ca', 'ca.', False),
+    ('ca', 'ca\\w', False),
+    ('ca', 'ca[sz]', False),
+    # Invalid patterns
+    ('ca', 'ca\\', False),
+    ('ca[', 'ca[s', False),
+])
+def test_is_literal_extension(old, new, expected):
+    assert is_literal_extension(old, new) == expected
+    if expected:
+        # The texts that match the new pattern are a subset of the old ones
+        old_matches = {text for text in TEXTS if re.search(old, text)}
+        assert {text for text in TEXTS if re.search(new, text)} <= old_matches
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import sys
+from pathlib import Path
+
+package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
+sys.path.insert(0, str(package_dir))
+
+import os
+
+import pytest
+
+from textgrid_explorer.utils import find_textgrid_paths
+
+@pytest.fixture
+def corpus(tmp_path):
+    """
+    a.TextGrid, b.TEXTGRID, notes.txt, sub/c.TextGrid, sub/skip/d.TextGrid,
+    other/e.TextGrid, plus links: link.TextGrid to a.TextGrid, linked_dir to
+    other and sub/loop to the root.
+    """
+    for name in ['a.TextGrid', 'b.TEXTGRID', 'notes.txt', 'sub/c.TextGrid',
+                 'sub/skip/d.TextGrid', 'other/e.TextGrid']:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('')
+    try:
+        os.symlink(tmp_path / 'a.TextGrid', tmp_path / 'link.TextGrid')
+        os.symlink(tmp_path / 'other', tmp_path / 'linked_dir', target_is_directory=True)
+        os.symlink(tmp_path, tmp_path / 'sub' / 'loop', target_is_directory=True)
+    except OSError:
+        pytest.skip('Symbolic links are not supported')
+    return tmp_path
+
+def relative(paths, root):
+    return [path.relative_to(root).as_posix() for path in paths]
+
+def test_lists_textgrid_files_sorted(corpus):
+    assert relative(find_textgrid_paths(corpus), corpus) == [
+        'a.TextGrid', 'b.TEXTGRID', 'link.TextGrid', 'other/e.TextGrid',
+        'sub/c.TextGrid', 'sub/skip/d.TextGrid',
+    ]
+
+def test_include_and_exclude_globs(corpus):
+    assert relative(find_textgrid_paths(corpus, include=['B.*']), corpus) == ['b.TEXTGRID']
+    assert relative(find_textgrid_paths(corpus, include=['sub/*.textgrid']), corpus) == [
+        'sub/c.TextGrid', 'sub/skip/d.TextGrid',
+    ]
+    assert relative(find_textgrid_paths(corpus, exclude=['skip', 'other', '*/c.textgrid', 'l*']), corpus) == [
+        'a.TextGrid', 'b.TEXTGRID',
+    ]
+    assert relative(find_textgrid_paths(corpus, include=['*.textgrid'], exclude=['a.*']), corpus) == [
+        'b.TEXTGRID', 'link.TextGrid', 'other/e.TextGrid', 'sub/c.TextGrid', 'sub/skip/d.TextGrid',
+    ]
+
+def test_follows_symlinks_once(corpus):
+    paths = relative(find_textgrid_paths(corpus, follow_symlinks=True), corpus)
+    # The root is reached again through sub/loop and other through
+    # linked_dir, but each directory is walked once
+    assert sorted(path.rsplit('/', 1)[-1] for path in paths) == [
+        'a.TextGrid', 'b.TEXTGRID', 'c.TextGrid', 'd.TextGrid', 'e.TextGrid', 'link.TextGrid',
+    ]
+    assert 'a.TextGrid' in paths
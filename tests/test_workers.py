@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+#   textgrid_explorer - A TextGrid editing tool with a spreadsheet interface
+#   Copyright (C) 2025 Rolando Muñoz <rolando.muar@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+import sys
+from pathlib import Path
+
+package_dir = Path(__file__).parent.joinpath('..', 'src').resolve()
+sys.path.insert(0, str(package_dir))
+
+from textgrid_explorer import utils
+from textgrid_explorer.workers import SaveWorker
+
+def test_save_worker_reports_every_file(monkeypatch):
+    def write_textgrid_labels(path, cells, encoding=None):
+        if path.name == 'bug.TextGrid':
+            raise RuntimeError('unexpected')
+        if path.name == 'gone.TextGrid':
+            raise FileNotFoundError(f'{path} does not exist')
+
+    monkeypatch.setattr(utils, 'write_textgrid_labels', write_textgrid_labels)
+    names = ['a.TextGrid', 'bug.TextGrid', 'gone.TextGrid', 'b.TextGrid']
+    worker = SaveWorker(None, {Path(name): [] for name in names})
+    progress = []
+    worker.progress_changed.connect(lambda done, total: progress.append(done))
+
+    worker.run()
+
+    assert sorted(path.name for path in worker.saved) == ['a.TextGrid', 'b.TextGrid']
+    assert sorted(worker.errors) == [
+        'Could not save bug.TextGrid: unexpected',
+        'gone.TextGrid does not exist',
+    ]
+    assert progress == [0, 1, 2, 3, 4]
+
+def test_save_worker_passes_encodings(monkeypatch):
+    written = {}
+    def write_textgrid_labels(path, cells, encoding=None):
+        written[path.name] = encoding
+
+    monkeypatch.setattr(utils, 'write_textgrid_labels', write_textgrid_labels)
+    changes = {Path('a.TextGrid'): [], Path('b.TextGrid'): []}
+    worker = SaveWorker(None, changes, {Path('a.TextGrid'): 'latin-1'})
+    worker.run()
+
+    assert written == {'a.TextGrid': 'latin-1', 'b.TextGrid': None}